@@ -0,0 +1,154 @@
+import argparse
+import glob
+import os
+
+import numpy as np
+
+import telemetry
+
+# Offline analytics over telemetry logs
+#
+# Log files are memory-mapped as NumPy structured arrays, so nothing is copied
+# or parsed record by record. Aggregations walk the mapped records in fixed
+# size chunks, which keeps memory use flat for datasets larger than RAM: the OS
+# pages chunks in and drops them again as the scan moves on.
+
+TELEMETRY_DTYPE = np.dtype([
+    ('run', '<u4'),
+    ('tick', '<u4'),
+    ('event', 'u1'),
+    ('kind', 'u1'),
+    ('cause', 'u1'),
+    ('pad', 'u1'),
+    ('score', '<u4'),
+    ('game_speed', '<f4'),
+    ('player_y', '<f4'),
+    ('player_velocity', '<f4'),
+    ('obstacle_x', '<f4'),
+])
+assert TELEMETRY_DTYPE.itemsize == telemetry.RECORD_SIZE
+
+# Record dtypes by file magic, so other fixed-record logs can share the reader
+LOG_DTYPES = {
+    telemetry.MAGIC: TELEMETRY_DTYPE,
+}
+
+CHUNK_RECORDS = 1 << 20
+PLAYER_X = 80  # Player.x never changes during a run
+
+
+def find_logs(paths, pattern=telemetry.FILE_PREFIX + '-*' + telemetry.FILE_SUFFIX):
+    # Expand directories into the log files they contain, in write order
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, pattern))))
+        else:
+            files.append(path)
+    return files
+
+
+def map_log(path):
+    # Memory-map a log file as a read-only structured array (no copy)
+    with open(path, 'rb') as f:
+        header = f.read(telemetry.HEADER.size)
+    if len(header) < telemetry.HEADER.size:
+        raise ValueError(f"{path}: truncated header")
+    magic, version, record_size, _ = telemetry.HEADER.unpack(header)
+    dtype = LOG_DTYPES.get(magic)
+    if dtype is None:
+        raise ValueError(f"{path}: unknown log type {magic!r}")
+    if record_size != dtype.itemsize:
+        raise ValueError(f"{path}: record size {record_size}, expected {dtype.itemsize}")
+
+    # Ignore a partially written trailing record
+    count = (os.path.getsize(path) - telemetry.HEADER.size) // record_size
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=telemetry.HEADER.size, shape=(count,))
+
+
+def iter_chunks(paths, chunk_records=CHUNK_RECORDS):
+    # Yield zero-copy views over every record in the given logs
+    for path in find_logs(paths):
+        records = map_log(path)
+        for start in range(0, len(records), chunk_records):
+            yield records[start:start + chunk_records]
+        del records
+
+
+def death_heatmap(paths, speed_bins=np.arange(5.0, 15.5, 0.5), chunk_records=CHUNK_RECORDS):
+    # Deaths counted by obstacle kind (rows) and game speed bin (columns)
+    num_kinds = len(telemetry.load_obstacle_kinds())
+    num_bins = len(speed_bins) - 1
+    counts = np.zeros(num_kinds * num_bins, dtype=np.int64)
+    for chunk in iter_chunks(paths, chunk_records):
+        deaths = chunk[chunk['event'] == telemetry.EVENT_DEATH]
+        deaths = deaths[deaths['kind'] < num_kinds]
+        speed_bin = np.clip(np.searchsorted(speed_bins, deaths['game_speed'], side='right') - 1,
+                            0, num_bins - 1)
+        counts += np.bincount(deaths['kind'].astype(np.int64) * num_bins + speed_bin,
+                              minlength=counts.size)
+    return counts.reshape(num_kinds, num_bins)
+
+
+def survival_curve(paths, bin_size=100, chunk_records=CHUNK_RECORDS):
+    # Fraction of runs still alive at the start of each score bin
+    deaths_per_bin = np.zeros(0, dtype=np.int64)
+    for chunk in iter_chunks(paths, chunk_records):
+        scores = chunk['score'][chunk['event'] == telemetry.EVENT_DEATH]
+        binned = np.bincount(scores // bin_size)
+        if len(binned) > len(deaths_per_bin):
+            binned[:len(deaths_per_bin)] += deaths_per_bin
+            deaths_per_bin = binned
+        else:
+            deaths_per_bin[:len(binned)] += binned
+    total = deaths_per_bin.sum()
+    if total == 0:
+        return np.arange(0), np.ones(0)
+    alive = 1.0 - np.concatenate(([0], np.cumsum(deaths_per_bin)[:-1])) / total
+    return np.arange(len(deaths_per_bin)) * bin_size, alive
+
+
+def jump_timing(paths, distance_bins=np.arange(-50, 810, 10), chunk_records=CHUNK_RECORDS):
+    # Histogram of the gap between the player and the next obstacle at each
+    # jump, one row per obstacle kind
+    num_kinds = len(telemetry.load_obstacle_kinds())
+    num_bins = len(distance_bins) - 1
+    counts = np.zeros((num_kinds, num_bins), dtype=np.int64)
+    for chunk in iter_chunks(paths, chunk_records):
+        jumps = chunk[chunk['event'] == telemetry.EVENT_JUMP]
+        jumps = jumps[jumps['kind'] < num_kinds]
+        gaps = jumps['obstacle_x'] - PLAYER_X
+        for kind in range(num_kinds):
+            counts[kind] += np.histogram(gaps[jumps['kind'] == kind], distance_bins)[0]
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize Cherry Runner telemetry logs")
+    parser.add_argument('paths', nargs='+', help="log files or directories of logs")
+    args = parser.parse_args()
+
+    speed_bins = np.arange(5.0, 16.0, 1.0)
+    heatmap = death_heatmap(args.paths, speed_bins)
+    print("Deaths by obstacle and speed")
+    print("        " + "".join(f"{s:>6.0f}" for s in speed_bins[:-1]))
+    for kind, row in zip(telemetry.load_obstacle_kinds(), heatmap):
+        print(f"{kind:>6}  " + "".join(f"{n:>6d}" for n in row))
+
+    scores, alive = survival_curve(args.paths)
+    print("\nSurvival by score")
+    for score, fraction in zip(scores, alive):
+        print(f"{score:>8d}  {fraction:6.1%}")
+
+    distance_bins = np.arange(0, 450, 50)
+    timing = jump_timing(args.paths, distance_bins)
+    print("\nJumps by distance to next obstacle")
+    print("        " + "".join(f"{d:>6d}" for d in distance_bins[:-1]))
+    for kind, row in zip(telemetry.load_obstacle_kinds(), timing):
+        print(f"{kind:>6}  " + "".join(f"{n:>6d}" for n in row))
+
+
+if __name__ == "__main__":
+    main()
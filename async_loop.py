@@ -0,0 +1,227 @@
+import asyncio
+import atexit
+import selectors
+import time
+
+import pacing
+
+# Asyncio entry point: runs the game with an event loop for background I/O
+# (spectator sockets, ghost replay loading, anything spawned with
+# FrameScheduler.spawn) that only ever runs in the idle time between frames.
+#
+#   python3 async_loop.py [game options] [--loop-stats] [--task-margin MS]
+#
+# The scheduler stands in for runner_game.clock, like soak's clock does. At
+# every frame boundary it works out when the next frame is due and runs the
+# event loop until margin before then, as the frame's gap coroutine. Then
+# the pacer waits out the rest as usual. Background code awaits next_step()
+# between steps of work: it yields to the loop, and while the gap has no
+# time left it waits on an event set when the next gap opens.
+#
+# A step that has started isn't interrupted, so margin only protects frames
+# from steps shorter than it. A longer step that starts just before the gap
+# ends still makes that frame late (3 ms steps with the 2 ms margin made 2
+# frames in 120 late), and --loop-stats counts those. Keep steps short, and
+# put longer blocking calls in asyncio.to_thread.
+#
+# --loop-stats prints at exit how much of each frame's idle time background
+# work used. The loop's selector counts the time it spent waiting, and the
+# remainder of each gap was spent running callbacks and task steps.
+
+DEFAULT_MARGIN = 0.002  # Seconds before a frame is due that no task step starts in
+TIMER_SLACK = 0.001  # Selectors take millisecond timeouts, so wake up this much early
+
+schedulers = {}  # Event loop: the FrameScheduler running it
+
+
+class IdleSelector(selectors.DefaultSelector):
+    # Counts the time the event loop spends waiting for I/O and timers, and
+    # notes a wait that was still going when the frame came due
+    waited = 0.0
+    due = None
+    overslept = False
+
+    def select(self, timeout=None):
+        started = time.perf_counter()
+        try:
+            return super().select(timeout)
+        finally:
+            woke = time.perf_counter()
+            self.waited += woke - started
+            if self.due is not None and started < self.due < woke:
+                self.overslept = True
+
+
+class FrameScheduler:
+    # Drop-in for runner_game.clock (tick, get_fps) around a FramePacer
+    def __init__(self, pacer, margin=DEFAULT_MARGIN):
+        self.pacer = pacer
+        self.margin = margin
+        self.selector = IdleSelector()
+        self.loop = asyncio.SelectorEventLoop(self.selector)
+        schedulers[self.loop] = self
+        self.gap_end = None  # No deadline when the loop runs outside a gap
+        self.gap_opened = asyncio.Event()  # Set when the next gap starts
+        self.background = set()
+
+        # Instrumentation, in the same histograms as frame intervals
+        self.idle = pacing.FrameStats()  # Time to spare before each frame was due
+        self.used = pacing.FrameStats()  # How much of it the event loop was busy
+        self.pushed = 0  # Gaps where loop work ran on past the frame's deadline
+        self.overslept = 0  # Gaps where the OS woke the loop too late
+        self.deferred = 0  # Task steps put off to a later gap
+
+    def spawn(self, coro):
+        # Run a coroutine in the frame gaps from now on
+        task = self.loop.create_task(coro)
+        self.background.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def tick(self, framerate=0):
+        started = time.perf_counter()
+        due = self._due(started, framerate)
+        waited = self.selector.waited
+        self.selector.overslept = False
+        if due - self.margin > started:
+            self.gap_end = due - self.margin
+            self.selector.due = due
+            self.loop.run_until_complete(self._gap())
+            self.gap_end = self.selector.due = None
+        ended = time.perf_counter()
+        self.idle.add(max(0.0, due - started), 0)
+        self.used.add(ended - started - (self.selector.waited - waited), 0)
+        # A frame already due when the tick started had no gap, so the loop
+        # didn't make it late
+        if started < due < ended:
+            # Late by oversleeping only if the loop was already asleep when
+            # the frame came due, not if work ran past it first
+            if self.selector.overslept:
+                self.overslept += 1
+            else:
+                self.pushed += 1
+        return self.pacer.tick(framerate)
+
+    def get_fps(self):
+        return self.pacer.get_fps()
+
+    def has_time(self):
+        return self.gap_end is None or time.perf_counter() < self.gap_end
+
+    async def wait_for_time(self):
+        # Return once the current gap has time left, counting each gap the
+        # caller has to wait for
+        while not self.has_time():
+            self.deferred += 1
+            await self.gap_opened.wait()
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.loop.run_until_complete(self._cancel_background())
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+        del schedulers[self.loop]
+
+    def report(self):
+        idle, used = self.idle, self.used
+        share = used.total / idle.total if idle.total else 0.0
+        return (f"frame gaps: {idle.frames} frames, idle mean {idle.mean:.2f} ms, "
+                f"background work mean {used.mean:.3f} ms ({share:.1%} of idle time), "
+                f"p99 {used.percentile(0.99):.1f} ms, longest {used.longest:.2f} ms, "
+                f"{self.deferred} steps deferred; frames made late by work {self.pushed}, "
+                f"by oversleeping {self.overslept}")
+
+    async def _gap(self):
+        # The event loop's turn between two frames: wake the tasks waiting
+        # for it, then sleep until the gap ends while ready tasks and I/O are
+        # handled. Tasks that miss this gap wait on a fresh event
+        self.gap_opened.set()
+        self.gap_opened = asyncio.Event()
+        while True:
+            left = self.gap_end - time.perf_counter()
+            if left <= TIMER_SLACK:
+                return
+            await asyncio.sleep(left - TIMER_SLACK)
+
+    async def _cancel_background(self):
+        tasks = list(self.background)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _due(self, now, framerate):
+        # When the pacer is going to end its wait for the next frame
+        if not framerate:
+            return now
+        period = 1.0 / framerate
+        pacer = self.pacer
+        if pacer.strategy == pacing.HYBRID and pacer.deadline is not None:
+            return pacer.deadline + period
+        if pacer.last is not None:
+            return pacer.last + period
+        return now
+
+    def _finished(self, task):
+        self.background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+
+
+async def next_step():
+    # Await this between steps of background work. It always lets the loop
+    # run other work; on a FrameScheduler's loop it also holds the caller
+    # back until a frame gap has time left
+    await asyncio.sleep(0)
+    scheduler = schedulers.get(asyncio.get_running_loop())
+    if scheduler is not None:
+        await scheduler.wait_for_time()
+
+
+async def load_ghosts(paths):
+    import ghosts  # Needs numpy, so only imported when asked for
+    import runner_game
+
+    race = await ghosts.GhostRace.load_async(paths, runner_game.Player())
+    if race is None:
+        print("No ghost replays found")
+    else:
+        print(f"Racing {race.count} ghosts on seed {race.seed}")
+        runner_game.ghost_race = race
+
+
+def main():
+    import runner_game
+    import spectator
+
+    parser = runner_game.build_parser()
+    parser.description = "Cherry Runner, with background I/O on an asyncio event loop"
+    parser.add_argument('--task-margin', type=float, default=DEFAULT_MARGIN * 1000, metavar='MS',
+                        help="milliseconds before each frame no background step may start in "
+                             "(default: %(default)s)")
+    parser.add_argument('--loop-stats', action='store_true',
+                        help="print how much of each frame's idle time background work used, at exit")
+    args = parser.parse_args()
+
+    # The spectator server and ghost loading move onto the event loop
+    spectator_port, spectator_socket, ghost_paths = args.spectator_port, args.spectator_socket, args.ghosts
+    args.spectator_port = args.spectator_socket = args.ghosts = None
+    runner_game.setup(args)
+
+    scheduler = FrameScheduler(runner_game.clock, args.task_margin / 1000)
+    runner_game.clock = scheduler
+    atexit.register(scheduler.close)
+    if args.loop_stats:
+        atexit.register(lambda: print(scheduler.report()))
+    if spectator_port is not None or spectator_socket:
+        runner_game.spectator_server = spectator.SpectatorServer(
+            port=spectator_port, unix_path=spectator_socket).attach(scheduler.loop)
+        atexit.register(runner_game.spectator_server.close)
+    if ghost_paths:
+        # The race starts with the first run after loading finishes
+        scheduler.spawn(load_ghosts(ghost_paths))
+    runner_game.main()
+
+
+if __name__ == "__main__":
+    main()
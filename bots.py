@@ -0,0 +1,82 @@
+import random
+
+import runner_game
+
+# Scripted reference players for headless runs. A bot looks at a GameState
+# before each tick and presses keys through the same GameState methods the
+# game loop uses (jump, duck, stop_duck), so everything it does could have
+# been done from the keyboard.
+#
+# They are deliberately simple and stable, so that a change in their results
+# means the game changed, not the bot. reaction_jitter adds a seeded random
+# delay to every decision to stand in for human timing.
+
+GROUND_Y = runner_game.SCREEN_HEIGHT - runner_game.GROUND_HEIGHT
+JUMP_LEAD = 14  # Jump when the next obstacle is this many ticks away
+DUCK_LEAD = 8  # Duck when a flying obstacle is this many ticks away
+
+
+def next_obstacle(state):
+    # The nearest obstacle not yet fully behind the player, even once it
+    # stands up from a duck
+    player = state.player
+    behind = player.x - player.normal_radius
+    for obstacle in state.obstacles:
+        if obstacle.x + obstacle.width >= behind:
+            return obstacle
+    return None
+
+
+def is_flying(obstacle, player):
+    # Flying obstacles clear a ducking player
+    return obstacle.y + obstacle.height <= GROUND_Y - 2 * player.duck_radius
+
+
+class JumpBot:
+    # Jumps over everything, flying obstacles included
+    name = 'jump'
+
+    def __init__(self, seed=0, reaction_jitter=0):
+        self.rng = random.Random(seed)
+        self.reaction_jitter = reaction_jitter
+
+    def within(self, state, obstacle, lead):
+        # Is the obstacle close enough to react to, `lead` ticks ahead give
+        # or take the jitter
+        if self.reaction_jitter:
+            lead += self.rng.randint(-self.reaction_jitter, self.reaction_jitter)
+        return obstacle.x - state.player.x <= lead * state.game_speed
+
+    def act(self, state):
+        obstacle = next_obstacle(state)
+        if obstacle is None:
+            return
+        if self.within(state, obstacle, JUMP_LEAD):
+            state.jump()
+
+
+class DuckBot(JumpBot):
+    # Ducks under bees and birds, jumps over everything else
+    name = 'duck'
+
+    def act(self, state):
+        player = state.player
+        obstacle = next_obstacle(state)
+        if obstacle is None or not is_flying(obstacle, player):
+            if player.is_ducking:
+                state.stop_duck()
+            if obstacle is not None:
+                super().act(state)
+        elif not player.is_ducking and self.within(state, obstacle, DUCK_LEAD):
+            state.duck()
+
+
+BOTS = {bot.name: bot for bot in (JumpBot, DuckBot)}
+
+
+def play(state, bot, max_ticks):
+    # Run one game to the end or to max_ticks
+    while not state.game_over and state.tick < max_ticks:
+        bot.act(state)
+        state.step()
+    return state
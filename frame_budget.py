@@ -0,0 +1,175 @@
+import collections
+import gc
+import time
+import tracemalloc
+
+# Keeping garbage collection and allocation out of the way of frames
+#
+# GCController moves cyclic garbage collection off the active-play path: the
+# objects that exist after setup are frozen so collections never scan them
+# again, automatic collection is off while a run is being played, and the
+# collector runs instead on idle frames (game over screen). A run that
+# allocates far more than usual still gets young-generation collections so
+# memory can't run away.
+#
+# AllocationMeter uses tracemalloc to measure how much memory each frame
+# allocates: the traced-memory peak reached during the frame above what was
+# allocated when it started. Any short-lived object counts even if it is freed
+# again before the frame ends. Only memory from Python's allocators is traced
+# (SDL's pixel buffers are not), and allocations on other threads, like the
+# chunk worker, count toward whichever frame they happen in.
+#
+# Prewarmer fills caches on frames that have time to spare (the start screen):
+# it runs a queue of tasks a few per frame, within a time budget, so that
+# nothing is created for the first time once play has started. A task that is
+# waiting on another thread returns WAIT and is run again on the next frame.
+
+PLAY_COLLECT_THRESHOLD = 100_000  # Pending young objects that force a collection during play
+WAIT = object()  # Returned by a Prewarmer task that isn't ready to run yet
+
+
+class GCController:
+    def __init__(self, play_threshold=PLAY_COLLECT_THRESHOLD):
+        self.play_threshold = play_threshold
+        self.idle_frames = 0
+        self.play_collections = 0
+        self.idle_collections = 0
+        self.was_enabled = gc.isenabled()  # Restored by stop()
+        self.thresholds = gc.get_threshold()
+
+    def freeze(self):
+        # Call once setup is done: everything alive now is moved out of the
+        # collector's reach
+        gc.collect()
+        gc.freeze()
+
+    def play_started(self):
+        gc.disable()
+        self.idle_frames = 0
+
+    def play_frame(self):
+        if gc.get_count()[0] > self.play_threshold:
+            gc.collect(0)
+            self.play_collections += 1
+
+    def idle_frame(self):
+        # The first idle frame after a run gets a full collection, later ones
+        # only sweep the youngest generation
+        gc.collect(2 if self.idle_frames == 0 else 0)
+        self.idle_frames += 1
+        self.idle_collections += 1
+
+    def stop(self):
+        # Put the collector back the way it was found
+        if self.was_enabled:
+            gc.enable()
+        gc.set_threshold(*self.thresholds)
+        gc.unfreeze()
+
+
+class AllocationMeter:
+    def __init__(self, budget_bytes=None, frames_per_trace=1):
+        self.budget = budget_bytes
+        self.frames = 0
+        self.total = 0
+        self.worst = 0
+        self.over_budget = 0  # Frames that allocated more than the budget
+        self.last = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames_per_trace)
+        self.skip()
+
+    def skip(self):
+        # Don't charge what was allocated since the last frame to the next one
+        # (loading, setting up a new run)
+        self.baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def frame(self):
+        # Call once per frame; returns the bytes allocated since the last call
+        current, peak = tracemalloc.get_traced_memory()
+        allocated = max(0, peak - self.baseline)
+        self.last = allocated
+        self.frames += 1
+        self.total += allocated
+        self.worst = max(self.worst, allocated)
+        if self.budget is not None and allocated > self.budget:
+            self.over_budget += 1
+        self.baseline = current
+        tracemalloc.reset_peak()
+        return allocated
+
+    @property
+    def average(self):
+        return self.total / self.frames if self.frames else 0.0
+
+    def assert_within_budget(self):
+        if self.over_budget:
+            raise AssertionError(f"{self.over_budget} of {self.frames} frames allocated more than "
+                                 f"{self.budget} bytes (worst {self.worst})")
+
+    def report(self):
+        return (f"allocated per frame: average {self.average / 1024:.1f} KiB, "
+                f"worst {self.worst / 1024:.1f} KiB, {self.over_budget} of {self.frames} over budget")
+
+    def stop(self):
+        tracemalloc.stop()
+
+
+class Prewarmer:
+    def __init__(self, tasks):
+        # tasks: (name, callable) pairs, run in order
+        self.tasks = collections.deque(tasks)
+        self.total = len(self.tasks)
+        self.done = 0
+        self.frames = 0
+        self.spent = 0.0  # Seconds spent in run()
+        self.left_at_finish = None  # Tasks still queued when finish() was called
+        self.finish_time = 0.0
+
+    @property
+    def finished(self):
+        return not self.tasks
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    def run(self, budget):
+        # Run tasks until `budget` seconds are used up. At least one task runs
+        # per call, so a task longer than the budget still gets its frame.
+        # Returns True once everything has run
+        if not self.tasks:
+            return True
+        started = time.perf_counter()
+        self.frames += 1
+        while self.tasks:
+            name, task = self.tasks[0]
+            if task() is WAIT:
+                break
+            self.tasks.popleft()
+            self.done += 1
+            if time.perf_counter() - started >= budget:
+                break
+        self.spent += time.perf_counter() - started
+        return not self.tasks
+
+    def finish(self):
+        # Run whatever is left straight away (the player didn't wait)
+        self.left_at_finish = [name for name, _ in self.tasks]
+        started = time.perf_counter()
+        while self.tasks:
+            if self.tasks[0][1]() is WAIT:
+                time.sleep(0.001)
+                continue
+            self.tasks.popleft()
+            self.done += 1
+        self.finish_time = time.perf_counter() - started
+
+    def report(self):
+        summary = f"{self.total} tasks in {self.spent * 1000:.1f} ms over {self.frames} frames"
+        if not self.left_at_finish:
+            return f"prewarm: ready before play started ({summary})"
+        return (f"prewarm: {len(self.left_at_finish)} of {self.total} tasks not ready when play started, "
+                f"finished them in {self.finish_time * 1000:.1f} ms "
+                f"({', '.join(self.left_at_finish)}; {summary})")
@@ -0,0 +1,229 @@
+import argparse
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pygame
+
+# Shared-memory framebuffer: the game mirrors each rendered frame into a ring of
+# frame slots that other processes can map and read in place.
+#
+# Layout: a 32 byte header, one (sequence, tick) pair of uint64 per slot, then
+# the slots themselves as rows of native 32-bit pixels. The writer copies the
+# screen straight from its surfarray view into the next slot; nothing is
+# serialised and the render thread never waits on a reader.
+#
+# Each slot is guarded by its sequence number (a seqlock): it is odd while the
+# slot is being written and 2 * frame number once the frame is complete. A
+# reader takes the newest frame, works on the pixels in place, and can call
+# valid() afterwards to check the writer hasn't lapped it. With N slots a
+# reader has N - 1 frame times before its frame is reused.
+
+MAGIC = b'CRFB'
+VERSION = 1
+# magic, version, slots, width, height, red/green/blue byte offsets, pad, frames written
+HEADER = struct.Struct('<4sHHHHBBBBQ')
+HEADER_BYTES = 32
+FRAMES_WRITTEN = 3  # Index of the frames written counter in the header as uint64s
+DEFAULT_NAME = 'cherry-runner-frames'
+DEFAULT_SLOTS = 4
+
+
+def channel_offsets(surface):
+    # Byte offset of red, green and blue within a little-endian pixel
+    return tuple(shift // 8 for shift in surface.get_shifts()[:3])
+
+
+def rgb_view(pixels, offsets):
+    # (height, width, 3) RGB view of (height, width, 4) pixel bytes; only
+    # copies for channel orders a stride can't express
+    if offsets == (2, 1, 0):
+        return pixels[..., 2::-1]
+    if offsets == (0, 1, 2):
+        return pixels[..., :3]
+    return pixels[..., list(offsets)]
+
+
+class SharedFramebuffer:
+    # Common mapping of the header, slot sequence numbers and pixel slots
+    def _map(self):
+        buf = self.shm.buf
+        self.counters = np.ndarray((HEADER_BYTES // 8,), dtype=np.uint64, buffer=buf)
+        self.slot_info = np.ndarray((self.slots, 2), dtype=np.uint64, buffer=buf, offset=HEADER_BYTES)
+        self.frames = np.ndarray((self.slots, self.height, self.width), dtype=np.uint32, buffer=buf,
+                                 offset=HEADER_BYTES + self.slot_info.nbytes)
+
+    @staticmethod
+    def size(slots, width, height):
+        return HEADER_BYTES + slots * 16 + slots * width * height * 4
+
+    @property
+    def frames_written(self):
+        return int(self.counters[FRAMES_WRITTEN])
+
+    def close(self):
+        # Views have to go before the mapping can be closed
+        self.counters = self.slot_info = self.frames = None
+        self.shm.close()
+
+
+class FramebufferWriter(SharedFramebuffer):
+    def __init__(self, surface, slots=DEFAULT_SLOTS, name=DEFAULT_NAME):
+        if surface.get_bytesize() != 4:
+            raise ValueError("the shared framebuffer needs a 32-bit surface")
+        self.width, self.height = surface.get_size()
+        self.slots = slots
+        self.offsets = channel_offsets(surface)
+        size = self.size(slots, self.width, self.height)
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a game that didn't shut down cleanly
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.name = self.shm.name
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, slots, self.width, self.height,
+                         *self.offsets, 0, 0)
+        self._map()
+        self.publish_seconds = 0.0
+
+    def publish(self, surface, tick=0):
+        start = time.perf_counter()
+        sequence = self.frames_written + 1
+        slot = (sequence - 1) % self.slots
+        self.slot_info[slot, 0] = 2 * sequence - 1
+        # pixels2d is a (width, height) view of the surface, so its transpose
+        # lines up row for row with the slot and the copy is a straight memcpy
+        np.copyto(self.frames[slot], pygame.surfarray.pixels2d(surface).T)
+        self.slot_info[slot, 1] = tick
+        self.slot_info[slot, 0] = 2 * sequence
+        self.counters[FRAMES_WRITTEN] = sequence
+        self.publish_seconds += time.perf_counter() - start
+        return sequence
+
+    def close(self):
+        super().close()
+        self.shm.unlink()
+
+
+class Frame:
+    def __init__(self, sequence, tick, pixels, rgb):
+        self.sequence = sequence
+        self.tick = tick
+        self.pixels = pixels  # (height, width) uint32, mapped in place
+        self.rgb = rgb  # (height, width, 3) uint8 view of the same memory
+
+
+class FramebufferReader(SharedFramebuffer):
+    def __init__(self, name=DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name)
+        # Attaching registers the segment with this process's resource tracker,
+        # which would unlink it from under the game when the reader exits
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        magic, version, self.slots, self.width, self.height, r, g, b, _, _ = \
+            HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"{name}: not a version {VERSION} framebuffer")
+        self.offsets = (r, g, b)
+        self._map()
+
+    def latest(self):
+        # Newest complete frame, or None before the first one
+        while True:
+            sequence = self.frames_written
+            if sequence == 0:
+                return None
+            slot = (sequence - 1) % self.slots
+            tick = int(self.slot_info[slot, 1])
+            if self.slot_info[slot, 0] == 2 * sequence:
+                pixels = self.frames[slot]
+                rgb = rgb_view(pixels.view(np.uint8).reshape(self.height, self.width, 4),
+                               self.offsets)
+                return Frame(sequence, tick, pixels, rgb)
+            # Lapped between reading the counter and the slot; try the newer frame
+
+    def wait(self, after=0, timeout=None, poll=0.001):
+        # Block until a frame newer than `after` is published
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.frames_written <= after:
+            if deadline is not None and time.monotonic() > deadline:
+                return None
+            time.sleep(poll)
+        return self.latest()
+
+    def valid(self, frame):
+        # True if the frame's slot hasn't been reused since it was read
+        slot = (frame.sequence - 1) % self.slots
+        return self.slot_info[slot, 0] == 2 * frame.sequence
+
+
+def read(name, seconds):
+    # Headless reader example: follow the game's frames and report throughput
+    reader = FramebufferReader(name)
+    print(f"{reader.width}x{reader.height}, {reader.slots} slots")
+    received = skipped = torn = 0
+    brightness = 0.0
+    last = reader.frames_written
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        frame = reader.wait(last, timeout=1.0)
+        if frame is None:
+            continue
+        skipped += frame.sequence - last - 1 if last else 0
+        last = frame.sequence
+        brightness = frame.rgb.mean()  # Stand-in for real per-frame work
+        if not reader.valid(frame):
+            torn += 1
+            continue
+        received += 1
+    elapsed = time.monotonic() - start
+    print(f"read {received} frames in {elapsed:.1f}s ({received / elapsed:.1f} fps), "
+          f"{skipped} skipped, {torn} overwritten while reading, last brightness {brightness:.1f}")
+    reader.close()
+
+
+def benchmark(frames, fps, width=800, height=400, slots=DEFAULT_SLOTS):
+    # Publish cost of the mirror alone, uncapped or paced to `fps`
+    surface = pygame.Surface((width, height), 0, 32)
+    writer = FramebufferWriter(surface, slots, name=f"{DEFAULT_NAME}-bench")
+    try:
+        clock = pygame.time.Clock()
+        start = time.perf_counter()
+        for tick in range(frames):
+            surface.fill((tick % 256, 80, 160))
+            writer.publish(surface, tick)
+            if fps:
+                clock.tick(fps)
+        elapsed = time.perf_counter() - start
+    finally:
+        writer.close()
+    mode = f"{fps} FPS" if fps else "uncapped"
+    frame_mb = width * height * 4 / 1e6
+    print(f"{mode:>9}: {frames / elapsed:8.1f} frames/s, "
+          f"publish {writer.publish_seconds / frames * 1000:.3f} ms/frame, "
+          f"{frame_mb * frames / writer.publish_seconds / 1000:.2f} GB/s copied")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cherry Runner shared-memory framebuffer tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    read_parser = sub.add_parser('read', help="follow a running game's frames")
+    read_parser.add_argument('--name', default=DEFAULT_NAME)
+    read_parser.add_argument('--seconds', type=float, default=10.0)
+    bench_parser = sub.add_parser('bench', help="measure publish throughput")
+    bench_parser.add_argument('--frames', type=int, default=600)
+    args = parser.parse_args()
+
+    if args.command == 'read':
+        read(args.name, args.seconds)
+    else:
+        benchmark(args.frames, 60)
+        benchmark(args.frames, 0)
+
+
+if __name__ == "__main__":
+    main()
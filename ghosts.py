@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import glob
+import os
+import tempfile
+import time
+
+import numpy as np
+import pygame
+
+import async_loop
+import replay
+import surface_format
+
+# Ghost races: the live run shares its seed with recorded runs, whose players
+# are replayed alongside it as translucent ghosts.
+#
+# The obstacles, the speed and the score of a run depend only on the seed and
+# the tick, never on the player, so every run on a seed sees the same world.
+# A ghost is therefore nothing but a player's physics fed from its recorded
+# inputs. All ghosts are stepped together as NumPy arrays, and a ghost leaves
+# the race at the tick its recording ended, with no collision tests needed.
+#
+# Drawing is one translucent ball sprite per radius. Ghosts hidden behind the
+# live player are culled, and ghosts within GHOST_LOD_STEP pixels of each
+# other are drawn as one blit, made more opaque the more ghosts it stands for.
+
+GHOST_COLOR = (255, 255, 255)
+GHOST_ALPHA = 70  # Opacity of a single ghost
+GHOST_LOD_STEP = 3  # Pixels; ghosts this close together share a blit
+
+
+def read_run(path):
+    # (seed, end tick, inputs as an (n, 2) array) of a replay file, or None
+    # if it can't be read
+    try:
+        recording = replay.Replay(path)
+    except (OSError, ValueError) as error:
+        print(f"Skipping ghost {path}: {error}")
+        return None
+    try:
+        inputs = np.array(list(recording.inputs()), dtype=np.int64).reshape(-1, 2)
+        return recording.seed, recording.end_tick, inputs
+    finally:
+        recording.close()
+
+
+def find_replays(paths):
+    # Replay files named directly or found in directories
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*' + replay.FILE_SUFFIX))))
+        else:
+            files.append(path)
+    return files
+
+
+class GhostRace:
+    def __init__(self, runs, player, seed):
+        # runs: (end tick, inputs) per ghost, inputs being [(tick, action),
+        # ...] or the same as an (n, 2) array. player: a fresh Player, for
+        # the physics constants
+        self.seed = seed
+        self.count = len(runs)
+        self.gravity = player.gravity
+        self.normal_radius = player.normal_radius
+        self.duck_radius = player.duck_radius
+        self.ground = player.y + player.radius
+        self.start_y = player.y
+        self.end_ticks = np.array([end_tick for end_tick, _ in runs], dtype=np.int64)
+
+        # Every ghost's inputs merged into one schedule, by tick, then ghost,
+        # then recording order
+        inputs = [np.asarray(inputs, dtype=np.int64).reshape(-1, 2) for _, inputs in runs]
+        events = np.concatenate(inputs) if inputs else np.zeros((0, 2), dtype=np.int64)
+        ghosts = np.repeat(np.arange(self.count), [len(ghost_inputs) for ghost_inputs in inputs])
+        order = np.lexsort((ghosts, events[:, 0]))  # Stable, so recording order is kept
+        self.event_ticks = events[order, 0]
+        self.event_ghosts = ghosts[order]
+        self.event_actions = events[order, 1]
+        self.sprites = {}
+        self.start_run()
+
+    @classmethod
+    def from_runs(cls, runs, player):
+        # runs: (seed, end tick, inputs) per replay. Races the ghosts of the
+        # seed most of them share, breaking ties by the longest run. Returns
+        # None if there is nothing to race
+        by_seed = {}
+        for seed, end_tick, inputs in runs:
+            by_seed.setdefault(seed, []).append((end_tick, inputs))
+        if not by_seed:
+            return None
+        seed = max(by_seed, key=lambda seed: (len(by_seed[seed]), max(end for end, _ in by_seed[seed])))
+        return cls(by_seed[seed], player, seed)
+
+    @classmethod
+    def load(cls, paths, player):
+        runs = (read_run(path) for path in find_replays(paths))
+        return cls.from_runs([run for run in runs if run is not None], player)
+
+    @classmethod
+    async def load_async(cls, paths, player):
+        # Same as load, one replay per step, so an event loop can spread the
+        # loading over many frames (see async_loop)
+        runs = []
+        for path in find_replays(paths):
+            await async_loop.next_step()
+            run = read_run(path)
+            if run is not None:
+                runs.append(run)
+        # Sorting the merged schedule is the one long step; NumPy does it
+        # without holding the GIL
+        return await asyncio.to_thread(cls.from_runs, runs, player)
+
+    def start_run(self):
+        count = self.count
+        self.tick = 0
+        self.next_event = 0
+        self.y = np.full(count, float(self.start_y))
+        self.velocity = np.zeros(count)
+        self.radius = np.full(count, self.normal_radius, dtype=np.int64)
+        self.jumping = np.zeros(count, dtype=bool)
+        self.ducking = np.zeros(count, dtype=bool)
+
+    @property
+    def alive(self):
+        return self.tick < self.end_ticks
+
+    def step(self, jump_power):
+        # Advance every ghost one tick. Call before the live GameState.step,
+        # with the live player's jump_power, which every run shares
+        self._apply_inputs(jump_power)
+
+        # Player.update for all ghosts at once
+        jumping = self.jumping
+        self.y[jumping] += self.velocity[jumping]
+        self.velocity[jumping] += self.gravity
+        landed = jumping & (self.y >= self.ground - self.radius)
+        self.y[landed] = self.ground - self.radius[landed]
+        self.jumping[landed] = False
+        self.velocity[landed] = 0
+        self.tick += 1
+
+    def _apply_inputs(self, jump_power):
+        # Same rules as Player.jump, duck and stop_duck; a ghost never falls,
+        # since falling ends its run
+        end = int(self.event_ticks.searchsorted(self.tick, side='right'))
+        if end == self.next_event:
+            return
+        ghosts = self.event_ghosts[self.next_event:end].tolist()
+        actions = self.event_actions[self.next_event:end].tolist()
+        self.next_event = end
+        for ghost, action in zip(ghosts, actions):
+            if self.tick >= self.end_ticks[ghost]:
+                continue
+            if action == replay.ACTION_JUMP:
+                if not self.jumping[ghost] and not self.ducking[ghost]:
+                    self.jumping[ghost] = True
+                    self.velocity[ghost] = jump_power
+            elif action == replay.ACTION_DUCK:
+                if not self.jumping[ghost]:
+                    self.ducking[ghost] = True
+                    self.radius[ghost] = self.duck_radius
+                    self.y[ghost] = self.ground - self.duck_radius
+            elif self.ducking[ghost]:
+                self.ducking[ghost] = False
+                self.radius[ghost] = self.normal_radius
+                self.y[ghost] = self.ground - self.normal_radius
+
+    def get_sprite(self, radius):
+        sprite = self.sprites.get(radius)
+        if sprite is None:
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, GHOST_COLOR + (255,), (radius, radius), radius)
+            sprite = surface_format.for_display(sprite)
+            self.sprites[radius] = sprite
+        return sprite
+
+    def draw(self, surface, player):
+        # Returns the number of blits, for benchmarking
+        visible = self.alive
+        # Culled: entirely behind the live player, which is drawn over them
+        distance = np.abs(self.y - player.y)
+        visible &= distance + self.radius > player.radius
+        if not visible.any():
+            return 0
+        radius = self.radius[visible]
+        row = self.y[visible].astype(np.int64) // GHOST_LOD_STEP
+        buckets, first, counts = np.unique(radius * 10000 + row, return_index=True, return_counts=True)
+        ys = self.y[visible][first]
+        # n stacked ghosts let (1 - a)^n of the background through
+        alphas = 255 - 255 * (1 - GHOST_ALPHA / 255) ** counts
+        x = int(player.x)
+        for bucket_radius, y, alpha in zip(radius[first].tolist(), ys.tolist(), alphas.tolist()):
+            sprite = self.get_sprite(bucket_radius)
+            sprite.set_alpha(int(alpha))
+            surface.blit(sprite, (x - bucket_radius, int(y) - bucket_radius))
+        return len(buckets)
+
+
+def record_bot_runs(directory, count, seed, max_ticks, jitter):
+    # Record `count` jittery bot runs on one seed, as test ghosts
+    import bots
+    import runner_game
+
+    for index in range(count):
+        state = runner_game.GameState(seed)
+        path = os.path.join(directory, f"{replay.FILE_PREFIX}-bot-{index:04d}{replay.FILE_SUFFIX}")
+        state.replay = replay.ReplayWriter(path, state)
+        bots.play(state, bots.DuckBot(index, jitter), max_ticks)
+        state.replay.close(state)
+
+
+def bench(count, frames, seed=7, jitter=3):
+    # Time spent per frame stepping and drawing `count` ghosts
+    import bots
+    import runner_game
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        record_bot_runs(directory, count, seed, frames, jitter)
+        recorded = time.perf_counter() - started
+        started = time.perf_counter()
+        race = GhostRace.load([directory], runner_game.Player())
+        loaded = time.perf_counter() - started
+
+    # The live run is the unjittered bot, which survives the whole benchmark
+    state = runner_game.GameState(seed)
+    bot = bots.JumpBot()
+    step_time = draw_time = 0.0
+    blits = alive = 0
+    for _ in range(frames):
+        bot.act(state)
+        started = time.perf_counter()
+        race.step(state.player.jump_power)
+        step_time += time.perf_counter() - started
+        state.step()
+        runner_game.screen.fill(runner_game.BLUE)
+        started = time.perf_counter()
+        blits += race.draw(runner_game.screen, state.player)
+        draw_time += time.perf_counter() - started
+        alive += int(race.alive.sum())
+    print(f"{count} ghosts: recorded in {recorded:.1f}s, loaded in {loaded * 1000:.0f} ms")
+    print(f"per frame: step {step_time / frames * 1000:.3f} ms, draw {draw_time / frames * 1000:.3f} ms, "
+          f"{alive / frames:.0f} ghosts alive, {blits / frames:.1f} blits")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ghost races with recorded bot runs")
+    parser.add_argument('--ghosts', type=int, default=500)
+    parser.add_argument('--frames', type=int, default=3600)
+    args = parser.parse_args()
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    bench(args.ghosts, args.frames)
+
+
+if __name__ == "__main__":
+    main()
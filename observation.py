@@ -0,0 +1,86 @@
+import numpy as np
+
+import runner_game
+
+# Compact observations for control agents: a fixed-length float32 vector built
+# from a GameState instead of screen pixels.
+#
+# Layout (with the default K = 3 obstacles, 35 values):
+#   0  game speed / max game speed
+#   1  player y / screen height
+#   2  player velocity / jump speed
+#   3  is jumping
+#   4  is ducking
+#   5  player radius / normal radius
+#   then for each of the next K obstacles ahead of the player, nearest first:
+#   +0 present (0 for unused slots, whose other values are also 0)
+#   +1 one-hot obstacle type (NUM_KINDS values)
+#   +1+NUM_KINDS  (obstacle x - player x) / screen width
+#   +2+NUM_KINDS  (obstacle y - player y) / screen height
+#   +3+NUM_KINDS  width / screen width
+#   +4+NUM_KINDS  height / screen height
+#
+# The vector depends only on the GameState fields, which evolve identically
+# live and headless, and every value is computed with the same float64 steps
+# before being rounded to float32, so the same run always encodes to the same
+# bits.
+
+# Scales come from the game, so a change there can't skew the encoding. The
+# jump speed and normal radius are a new player's
+SCREEN_WIDTH = runner_game.SCREEN_WIDTH
+SCREEN_HEIGHT = runner_game.SCREEN_HEIGHT
+JUMP_SPEED = -runner_game.Player().jump_power
+NORMAL_RADIUS = runner_game.Player().normal_radius
+
+NUM_KINDS = len(runner_game.OBSTACLE_TYPES)
+PLAYER_VALUES = 6
+OBSTACLE_VALUES = 1 + NUM_KINDS + 4
+
+
+class ObservationEncoder:
+    def __init__(self, k=3):
+        self.k = k
+        self.size = PLAYER_VALUES + k * OBSTACLE_VALUES
+
+    def empty(self, batch=None):
+        # Preallocate an output buffer for encode() or encode_batch()
+        shape = (self.size,) if batch is None else (batch, self.size)
+        return np.zeros(shape, dtype=np.float32)
+
+    def encode(self, state, out):
+        # Write the observation for one GameState into out (a float32 vector
+        # of length size) without allocating a new buffer
+        player = state.player
+        out.fill(0.0)
+        out[0] = state.game_speed / state.max_game_speed
+        out[1] = player.y / SCREEN_HEIGHT
+        out[2] = player.velocity / JUMP_SPEED
+        out[3] = player.is_jumping
+        out[4] = player.is_ducking
+        out[5] = player.radius / NORMAL_RADIUS
+
+        # Spawn order isn't always left-to-right (a slower obstacle can fall
+        # behind a later one), so sort by x to find the nearest
+        behind = player.x - player.radius
+        base = PLAYER_VALUES
+        end = self.size
+        for obstacle in sorted(state.obstacles, key=lambda o: o.x):
+            if base == end:
+                break
+            if obstacle.x + obstacle.width < behind:
+                continue
+            out[base] = 1.0
+            out[base + 1 + obstacle.type_id] = 1.0
+            geometry = base + 1 + NUM_KINDS
+            out[geometry] = (obstacle.x - player.x) / SCREEN_WIDTH
+            out[geometry + 1] = (obstacle.y - player.y) / SCREEN_HEIGHT
+            out[geometry + 2] = obstacle.width / SCREEN_WIDTH
+            out[geometry + 3] = obstacle.height / SCREEN_HEIGHT
+            base += OBSTACLE_VALUES
+        return out
+
+    def encode_batch(self, states, out):
+        # Encode many states into the rows of out, shape (len(states), size)
+        for row, state in enumerate(states):
+            self.encode(state, out[row])
+        return out
@@ -0,0 +1,193 @@
+import argparse
+import math
+import random
+import time
+
+import pygame
+
+# Frame pacing: a drop-in for pygame.time.Clock (tick, get_fps) with a choice
+# of how the wait for the next frame is done, and statistics about how evenly
+# frames actually came out.
+#
+#   sleep   pygame's Clock.tick: sleeps, cheap on CPU, but the OS wakes it up
+#           late by anything up to a few milliseconds
+#   busy    Clock.tick_busy_loop: spins the whole wait, exact but burns a core
+#   hybrid  sleeps until spin_window before the frame is due, then spins; as
+#           even as busy for the cost of spin_window of spinning per frame
+#
+# hybrid schedules frames on a fixed grid of deadlines rather than a period
+# after the last frame, so a late frame doesn't push every later one back.
+# After falling more than a frame behind it starts a new grid instead of
+# rushing to catch up.
+
+SLEEP = 'sleep'
+BUSY = 'busy'
+HYBRID = 'hybrid'
+STRATEGIES = [SLEEP, BUSY, HYBRID]
+
+DEFAULT_SPIN_WINDOW = 0.002  # Seconds
+HISTOGRAM_BIN = 0.5  # Milliseconds per histogram bin
+HISTOGRAM_BINS = 100  # The last bin holds everything longer
+DROPPED_FRAME = 1.5  # An interval this many frame periods long drops a frame
+
+
+class FrameStats:
+    # Histogram of frame intervals and dropped frame counts
+    def __init__(self):
+        self.bins = [0] * HISTOGRAM_BINS
+        self.frames = 0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.dropped = 0
+        self.longest = 0.0
+
+    def add(self, interval, period):
+        milliseconds = interval * 1000
+        self.bins[min(int(milliseconds / HISTOGRAM_BIN), HISTOGRAM_BINS - 1)] += 1
+        self.frames += 1
+        self.total += milliseconds
+        self.total_squares += milliseconds * milliseconds
+        self.longest = max(self.longest, milliseconds)
+        if period and interval > DROPPED_FRAME * period:
+            self.dropped += round(interval / period) - 1
+
+    @property
+    def mean(self):
+        return self.total / self.frames if self.frames else 0.0
+
+    @property
+    def jitter(self):
+        # Standard deviation of the frame interval in milliseconds
+        if not self.frames:
+            return 0.0
+        return math.sqrt(max(0.0, self.total_squares / self.frames - self.mean ** 2))
+
+    def percentile(self, fraction):
+        # Upper edge of the histogram bin the fraction falls in
+        wanted = fraction * self.frames
+        seen = 0
+        for index, count in enumerate(self.bins):
+            seen += count
+            if seen >= wanted and count:
+                return (index + 1) * HISTOGRAM_BIN
+        return 0.0
+
+    def histogram(self, width=40):
+        # Text histogram of the bins that were hit
+        used = [index for index, count in enumerate(self.bins) if count]
+        if not used:
+            return ""
+        peak = max(self.bins)
+        lines = []
+        for index in range(used[0], used[-1] + 1):
+            label = f"{index * HISTOGRAM_BIN:5.1f} ms"
+            if index == HISTOGRAM_BINS - 1:
+                label = f"{index * HISTOGRAM_BIN:5.1f}+ms"
+            count = self.bins[index]
+            lines.append(f"{label} {count:>7d} {'#' * math.ceil(count / peak * width)}")
+        return "\n".join(lines)
+
+
+class FramePacer:
+    def __init__(self, strategy=SLEEP, spin_window=DEFAULT_SPIN_WINDOW):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown pacing strategy {strategy!r}")
+        self.strategy = strategy
+        self.spin_window = spin_window
+        self.clock = pygame.time.Clock()
+        self.stats = FrameStats()
+        self.deadline = None
+        self.last = None
+        self.cpu_started = time.process_time()
+        self.wall_started = time.perf_counter()
+
+    def tick(self, framerate=0):
+        # Wait for the next frame like Clock.tick; returns the milliseconds
+        # since the previous call
+        period = 1.0 / framerate if framerate else 0.0
+        if self.strategy == SLEEP:
+            self.clock.tick(framerate)
+        elif self.strategy == BUSY:
+            self.clock.tick_busy_loop(framerate)
+        else:
+            self._wait_hybrid(period)
+
+        now = time.perf_counter()
+        interval = 0.0 if self.last is None else now - self.last
+        if self.last is not None:
+            self.stats.add(interval, period)
+        self.last = now
+        return int(interval * 1000)
+
+    def get_fps(self):
+        mean = self.stats.mean
+        return 1000.0 / mean if mean else 0.0
+
+    def _wait_hybrid(self, period):
+        now = time.perf_counter()
+        if not period:
+            self.deadline = None
+            return
+        if self.deadline is None or now - self.deadline > period:
+            # First frame, or more than a frame behind: start a new grid
+            self.deadline = now + period
+        else:
+            self.deadline += period
+        sleep_for = self.deadline - now - self.spin_window
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+        while time.perf_counter() < self.deadline:
+            time.sleep(0)  # Lets other threads (the chunk worker) have the GIL while spinning
+
+    @property
+    def cpu_load(self):
+        # Share of one core used by this process since the pacer was made
+        wall = time.perf_counter() - self.wall_started
+        return (time.process_time() - self.cpu_started) / wall if wall else 0.0
+
+    def report(self):
+        stats = self.stats
+        title = self.strategy
+        if self.strategy == HYBRID:
+            title += f" (spin window {self.spin_window * 1000:g} ms)"
+        return (f"frame pacing {title}: {stats.frames} frames, interval mean {stats.mean:.2f} ms, "
+                f"jitter {stats.jitter:.2f} ms, p99 {stats.percentile(0.99):.1f} ms, "
+                f"longest {stats.longest:.1f} ms, {stats.dropped} dropped, "
+                f"CPU {self.cpu_load:.0%}\n{stats.histogram()}")
+
+
+def bench(strategies, frames, fps, work_ms, spin_window):
+    # Pace `frames` frames of simulated work (a random 0 to work_ms of
+    # spinning per frame) with each strategy
+    rng = random.Random(0)
+    pacers = []
+    for strategy in strategies:
+        pacer = FramePacer(strategy, spin_window)
+        for _ in range(frames):
+            end = time.perf_counter() + rng.uniform(0, work_ms) / 1000
+            while time.perf_counter() < end:
+                pass
+            pacer.tick(fps)
+        pacers.append(pacer)
+    return pacers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare frame pacing strategies")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES))
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--work', type=float, default=8.0, metavar='MS',
+                        help="most simulated work per frame (default: %(default)s)")
+    parser.add_argument('--spin-window', type=float, default=DEFAULT_SPIN_WINDOW * 1000, metavar='MS')
+    parser.add_argument('--histogram', action='store_true', help="print each strategy's histogram")
+    args = parser.parse_args()
+
+    pacers = bench(args.strategies.split(','), args.frames, args.fps, args.work, args.spin_window / 1000)
+    for pacer in pacers:
+        report = pacer.report()
+        print(report if args.histogram else report.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+import argparse
+import atexit
+import math
+import os
+import struct
+import time
+
+import telemetry
+
+# Replays: the run's seed, every player input, and a full GameState snapshot
+# every KEYFRAME_INTERVAL ticks, with an index of the keyframes at the end.
+#
+# Seeking reads the index entry for the target tick directly, restores that
+# keyframe and simulates headlessly to the exact tick. The catch-up never runs
+# for more than one keyframe interval, so seek time does not grow with the
+# length of the run.
+#
+# File layout:
+#   header   magic, version, flags, keyframe interval, seed
+#   records  (kind, tick, payload length) + payload, in the order they happened
+#   index    (tick, file offset) per keyframe, in tick order
+#   trailer  index offset, keyframe count, index magic
+# A file without a trailer (the game was killed) is still readable; its index
+# is rebuilt by scanning the records.
+#
+# Keyframe payloads are the snapshot's fields packed one by one (game state,
+# player, obstacle count, then each obstacle), never anything executable, and
+# a payload that doesn't unpack to a sane snapshot is rejected.
+
+MAGIC = b'CRRP'
+INDEX_MAGIC = b'CRRI'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIQ')  # magic, version, flags, keyframe interval, seed
+RECORD = struct.Struct('<BII')  # kind, tick, payload length
+INDEX_ENTRY = struct.Struct('<IQ')  # tick, offset
+TRAILER = struct.Struct('<QI4s')  # index offset, keyframe count, index magic
+
+# Keyframe payload, in GameState.snapshot() order
+# tick, score, game speed, obstacle timer, obstacle frequency, game over, hit obstacle, seed, spawn count
+SNAPSHOT = struct.Struct('<qqdddBiQq')
+# x, y, velocity, jump power, jumping, ducking, radius, rotation, falling (GameState.PLAYER_FIELDS)
+SNAPSHOT_PLAYER = struct.Struct('<ddddBBqqB')
+SNAPSHOT_COUNT = struct.Struct('<H')
+SNAPSHOT_OBSTACLE = struct.Struct('<BddI')  # type id, x, game speed, serial
+
+# Record kinds
+RECORD_INPUT = 0
+RECORD_KEYFRAME = 1
+RECORD_END = 2
+
+# Inputs, named after the GameState method that applies them
+ACTION_JUMP = 0
+ACTION_DUCK = 1
+ACTION_STOP_DUCK = 2
+ACTIONS = ['jump', 'duck', 'stop_duck']
+
+# Header flags: gameplay settings the run depends on
+FLAG_PRECISE_COLLISION = 1
+
+KEYFRAME_INTERVAL = 300  # Ticks (5 seconds at 60 FPS)
+FILE_PREFIX = 'replay'
+FILE_SUFFIX = '.crr'
+
+
+class ReplayWriter:
+    def __init__(self, path, state, flags=0, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.index = []
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, flags, keyframe_interval, state.seed))
+        self.keyframe(state)
+        atexit.register(self.close, state)
+
+    def input(self, tick, action):
+        if self.file is None:
+            return  # Keys pressed on the game over screen
+        self._write(RECORD_INPUT, tick, bytes((action,)))
+
+    def keyframe(self, state):
+        self.index.append((state.tick, self.file.tell()))
+        self._write(RECORD_KEYFRAME, state.tick, pack_snapshot(state.snapshot()))
+
+    def after_step(self, state):
+        # Called by GameState.step once the tick has been simulated
+        if state.game_over:
+            self.close(state)
+        elif state.tick % self.keyframe_interval == 0 and state.tick != self.index[-1][0]:
+            self.keyframe(state)
+
+    def close(self, state=None):
+        if self.file is None:
+            return
+        self._write(RECORD_END, state.tick if state is not None else self.index[-1][0], b'')
+        index_offset = self.file.tell()
+        for tick, offset in self.index:
+            self.file.write(INDEX_ENTRY.pack(tick, offset))
+        self.file.write(TRAILER.pack(index_offset, len(self.index), INDEX_MAGIC))
+        self.file.close()
+        self.file = None
+        atexit.unregister(self.close)
+
+    def _write(self, kind, tick, payload):
+        self.file.write(RECORD.pack(kind, tick, len(payload)))
+        self.file.write(payload)
+
+
+def pack_snapshot(snapshot):
+    *fields, player, obstacles = snapshot
+    parts = [SNAPSHOT.pack(*fields), SNAPSHOT_PLAYER.pack(*player), SNAPSHOT_COUNT.pack(len(obstacles))]
+    parts.extend(SNAPSHOT_OBSTACLE.pack(*obstacle) for obstacle in obstacles)
+    return b''.join(parts)
+
+
+def unpack_snapshot(payload):
+    # The snapshot tuple back from pack_snapshot(); ValueError unless the
+    # payload is exactly one well-formed snapshot
+    fixed = SNAPSHOT.size + SNAPSHOT_PLAYER.size + SNAPSHOT_COUNT.size
+    if len(payload) < fixed:
+        raise ValueError("keyframe too short")
+    (tick, score, game_speed, obstacle_timer, obstacle_frequency, game_over, hit, seed,
+     spawn_count) = SNAPSHOT.unpack_from(payload)
+    (x, y, velocity, jump_power, is_jumping, is_ducking, radius, rotation,
+     falling) = SNAPSHOT_PLAYER.unpack_from(payload, SNAPSHOT.size)
+    (count,) = SNAPSHOT_COUNT.unpack_from(payload, fixed - SNAPSHOT_COUNT.size)
+    if len(payload) != fixed + count * SNAPSHOT_OBSTACLE.size:
+        raise ValueError("keyframe length doesn't match its obstacle count")
+    obstacles = tuple(SNAPSHOT_OBSTACLE.iter_unpack(payload[fixed:]))
+
+    num_kinds = len(telemetry.load_obstacle_kinds())
+    numbers = [game_speed, obstacle_frequency, x, y, velocity, jump_power]
+    numbers.extend(value for obstacle in obstacles for value in obstacle[1:3])
+    if (tick < 0 or score < 0 or spawn_count < 0 or radius <= 0 or math.isnan(obstacle_timer)
+            or not all(math.isfinite(value) for value in numbers)
+            or any(flag > 1 for flag in (game_over, is_jumping, is_ducking, falling))
+            or not -1 <= hit < count
+            or any(obstacle[0] >= num_kinds for obstacle in obstacles)):
+        raise ValueError("keyframe holds an invalid game state")
+    player = (x, y, velocity, jump_power, bool(is_jumping), bool(is_ducking), radius, rotation,
+              bool(falling))
+    return (tick, score, game_speed, obstacle_timer, obstacle_frequency, bool(game_over), hit, seed,
+            spawn_count, player, obstacles)
+
+
+class ReplayRecorder:
+    # Writes one replay file per run into a directory
+    def __init__(self, directory, flags=0, keyframe_interval=KEYFRAME_INTERVAL):
+        self.directory = directory
+        self.flags = flags
+        self.keyframe_interval = keyframe_interval
+        self.session = time.strftime('%Y%m%d-%H%M%S')
+        self.run_id = 0
+        self.writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start_run(self, state):
+        if self.writer is not None:
+            self.writer.close()
+        self.run_id += 1
+        name = f"{FILE_PREFIX}-{self.session}-{self.run_id:04d}{FILE_SUFFIX}"
+        self.writer = ReplayWriter(os.path.join(self.directory, name), state, self.flags,
+                                   self.keyframe_interval)
+        state.replay = self.writer
+        return self.writer
+
+
+class Replay:
+    # Read side: header and keyframe index, with records read on demand
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic, version, self.flags, self.keyframe_interval, self.seed = \
+            HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} replay")
+        self.index = self._read_index()
+        if not self.index:
+            raise ValueError(f"{path}: no keyframes")
+        self.end_tick = self._read_end_tick()
+
+    @property
+    def precise_collision(self):
+        return bool(self.flags & FLAG_PRECISE_COLLISION)
+
+    def read_record(self, offset):
+        # (kind, tick, payload, next offset), or None past the last record
+        self.file.seek(offset)
+        header = self.file.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None
+        kind, tick, length = RECORD.unpack(header)
+        payload = self.file.read(length)
+        if len(payload) < length:
+            return None
+        return kind, tick, payload, offset + RECORD.size + length
+
+    def keyframe_at(self, tick):
+        # Index position of the last keyframe at or before tick; keyframes
+        # are evenly spaced, so it is found directly
+        position = min(max(tick, 0) // self.keyframe_interval, len(self.index) - 1)
+        while position > 0 and self.index[position][0] > tick:
+            position -= 1  # Only reached for a run that ended between keyframes
+        return position
+
+    def load_keyframe(self, position):
+        # (snapshot, offset of the record after it)
+        kind, tick, payload, next_offset = self.read_record(self.index[position][1])
+        try:
+            snapshot = unpack_snapshot(payload)
+        except ValueError as error:
+            raise ValueError(f"{self.path}: keyframe {position}: {error}") from None
+        if kind != RECORD_KEYFRAME or snapshot[0] != tick:
+            raise ValueError(f"{self.path}: keyframe {position} is damaged")
+        return snapshot, next_offset
+
+    def inputs(self):
+        # Every recorded input as (tick, action), in the order they happened
+        offset = HEADER.size
+        while offset < self.records_end:
+            record = self.read_record(offset)
+            if record is None:
+                return
+            kind, tick, payload, offset = record
+            if kind == RECORD_INPUT:
+                yield tick, payload[0]
+
+    def close(self):
+        self.file.close()
+
+    def _read_index(self):
+        size = os.fstat(self.file.fileno()).st_size
+        if size >= HEADER.size + TRAILER.size:
+            self.file.seek(size - TRAILER.size)
+            index_offset, count, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+            if magic == INDEX_MAGIC and index_offset + count * INDEX_ENTRY.size == size - TRAILER.size:
+                self.file.seek(index_offset)
+                data = self.file.read(count * INDEX_ENTRY.size)
+                self.records_end = index_offset
+                return [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(count)]
+
+        # No trailer: recover the index from the records
+        index = []
+        offset = HEADER.size
+        while True:
+            record = self.read_record(offset)
+            if record is None:
+                break
+            kind, tick, _, next_offset = record
+            if kind == RECORD_KEYFRAME:
+                index.append((tick, offset))
+            offset = next_offset
+        self.records_end = offset
+        return index
+
+    def _read_end_tick(self):
+        # The END record is the last one when the replay was closed properly
+        record = self.read_record(self.records_end - RECORD.size)
+        if record is not None and record[0] == RECORD_END and record[2] == b'':
+            return record[1]
+        # Otherwise scan forward from the last keyframe
+        tick, offset = self.index[-1]
+        while offset < self.records_end:
+            kind, tick, _, offset = self.read_record(offset)
+        return tick
+
+
+class ReplayPlayer:
+    # Drives a GameState through a replay: seek() jumps anywhere, advance()
+    # plays forward. Rendering is up to the caller, which only needs to draw
+    # the state after the last tick of each advance()
+    def __init__(self, replay, state):
+        self.replay = replay
+        self.state = state
+        self.offset = None  # Next unread record
+        self.pending = None  # That record, once read
+        self.seek(0)
+
+    @property
+    def finished(self):
+        return self.state.game_over or self.state.tick >= self.replay.end_tick
+
+    def seek(self, tick):
+        tick = min(max(tick, 0), self.replay.end_tick)
+        position = self.replay.keyframe_at(tick)
+        if self.offset is None or not self.index_tick(position) <= self.state.tick <= tick:
+            # Restore the keyframe unless we are already between it and the target
+            snapshot, self.offset = self.replay.load_keyframe(position)
+            self.state.restore(snapshot)
+            self.pending = None
+        self.advance(tick - self.state.tick)
+
+    def index_tick(self, position):
+        return self.replay.index[position][0]
+
+    def advance(self, ticks):
+        # Simulate up to `ticks` ticks headlessly, applying recorded inputs
+        state = self.state
+        for _ in range(ticks):
+            if self.finished:
+                break
+            self._apply_inputs()
+            state.step()
+
+    def _apply_inputs(self):
+        # Apply every input recorded for the current tick; inputs come before
+        # that tick's step, exactly as the game loop handles key events
+        state = self.state
+        while True:
+            if self.pending is None:
+                self.pending = self.replay.read_record(self.offset)
+                if self.pending is None:
+                    return
+            kind, tick, payload, next_offset = self.pending
+            if tick > state.tick:
+                return
+            if kind == RECORD_INPUT and tick == state.tick:
+                getattr(state, ACTIONS[payload[0]])()
+            self.offset = next_offset
+            self.pending = None
+
+
+def play(path, start=0.0, speed=1.0):
+    # Render a replay in a window. Left/Right seek 10 seconds, Up/Down change
+    # the playback speed, Escape quits
+    import random
+    import pygame
+    import runner_game as game
+
+    replay = Replay(path)
+    game.PRECISE_COLLISION = replay.precise_collision
+    game.load_sprite_caches()
+    state = game.GameState(replay.seed)
+    player = ReplayPlayer(replay, state)
+    game.obstacles = state.obstacles
+    game.mountains = [game.Mountain(layer) for layer in range(3) for _ in range(3)]
+    game.cherry_blossoms = [game.CherryBlossom() for _ in range(30)]
+    clouds = [game.Cloud() for _ in range(4)]
+    for cloud in clouds:
+        cloud.x = random.randint(0, game.SCREEN_WIDTH)
+
+    started = time.perf_counter()
+    player.seek(int(start * game.FPS))
+    print(f"seek to {start:.0f}s took {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    carry = 0.0
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    step = 10 * game.FPS if event.key == pygame.K_RIGHT else -10 * game.FPS
+                    player.seek(state.tick + step)
+                elif event.key == pygame.K_UP:
+                    speed = min(speed * 2, 64.0)
+                elif event.key == pygame.K_DOWN:
+                    speed = max(speed / 2, 0.25)
+
+        # Skip drawing the ticks in between when playing faster than 1x
+        carry += speed
+        ticks = int(carry)
+        carry -= ticks
+        player.advance(ticks)
+
+        game.screen.fill(game.BLUE)
+        game.draw_background(state.game_speed)
+        for cloud in clouds:
+            cloud.update()
+            if cloud.is_off_screen():
+                cloud.x = game.SCREEN_WIDTH
+            cloud.draw(game.screen)
+        game.draw_ground()
+        for obstacle in state.obstacles:
+            obstacle.draw(game.screen, obstacle.animation_frame(state.tick))
+        state.player.draw(game.screen)
+        game.show_score(state.score)
+        if player.finished:
+            game.show_game_over(state.score)
+        pygame.display.set_caption(f"Replay {state.tick / game.FPS:6.1f}s  x{speed:g}")
+        pygame.display.update()
+        game.clock.tick(game.FPS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back a Cherry Runner replay")
+    parser.add_argument('path')
+    parser.add_argument('--start', type=float, default=0.0, metavar='SECONDS',
+                        help="seek to this point before playing")
+    parser.add_argument('--speed', type=float, default=1.0, help="playback speed multiplier")
+    parser.add_argument('--info', action='store_true', help="print the replay's summary and exit")
+    args = parser.parse_args()
+
+    if args.info:
+        replay = Replay(args.path)
+        print(f"seed {replay.seed}, {replay.end_tick} ticks, {len(replay.index)} keyframes "
+              f"every {replay.keyframe_interval} ticks, precise collision {replay.precise_collision}")
+        return
+    play(args.path, args.start, args.speed)
+
+
+if __name__ == "__main__":
+    main()
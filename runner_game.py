@@ -2,6 +2,25 @@ import pygame
 import random
 import sys
 import math
+import os
+import argparse
+import atexit
+import bisect
+import functools
+import hashlib
+import inspect
+import itertools
+import queue
+import threading
+
+import telemetry
+import spectator
+import replay
+import scores
+import sprite_atlas
+import frame_budget
+import pacing
+import surface_format
 
 # Initialize pygame
 pygame.init()
@@ -12,6 +31,49 @@ SCREEN_HEIGHT = 400
 GROUND_HEIGHT = 50
 FPS = 60
 
+# Difficulty settings; every GameState starts from these, and headless tools
+# can override them per run with GameState.configure
+MAX_GAME_SPEED = 15
+SPEED_STEP = 0.1  # Speed gained every SPEED_STEP_SCORE points
+SPEED_STEP_SCORE = 200
+OBSTACLE_FREQUENCY = 1500  # Milliseconds between spawns at the start of a run
+OBSTACLE_FREQUENCY_STEP = 10  # Taken off the spawn interval at every spawn
+MIN_OBSTACLE_FREQUENCY = 1000
+
+# Collision settings
+PRECISE_COLLISION = False  # Pixel-exact obstacle masks instead of rectangles (see --precise-collision)
+SPRITE_PADDING = 20  # Room around obstacle sprites for parts drawn outside the obstacle rect
+SWEEP_SLACK = 2  # Pixels swept steps grow collision shapes by, to cover whole-pixel rounding
+
+# Sprite cache settings
+PETAL_ROTATION_STEP = 5  # Degrees between cached petal rotations
+CHERRY_BLOSSOM_COUNT = 30  # Petals during play (see --petals)
+CLOUD_WIDTH_STEP = 10  # Cloud sizes are snapped to a grid so every cloud sprite can be cached
+CLOUD_HEIGHT_STEP = 5
+CLOUD_PADDING = 15  # Room around cloud sprites for puffs outside the cloud rect
+SPRITE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cherry-runner')  # None disables it
+
+# High scores and run history (see --scores)
+SCORES_PATH = os.path.join(os.path.expanduser('~'), '.local', 'share', 'cherry-runner', 'scores.sqlite3')
+
+# Petal rendering: blit each petal, or composite them all in one NumPy pass
+# (petal_raster.py). Auto picks raster from PETAL_RASTER_THRESHOLD petals up
+PETAL_BLIT = 'blit'
+PETAL_RASTER = 'raster'
+PETAL_AUTO = 'auto'
+PETAL_MODE = PETAL_AUTO
+PETAL_RASTER_THRESHOLD = 500
+
+# Start screen cache prewarming
+PREWARM_FRAME_BUDGET = 0.008  # Seconds per start screen frame spent filling caches
+PREWARM_STATS = False  # Print how prewarming went when play starts (see --prewarm-stats)
+
+# Background chunk generation
+CHUNK_BUFFER_DEPTH = 2  # Chunks generated ahead per slot (double-buffered)
+MOUNTAINS_PER_LAYER = 3  # A new scene takes this many mountain chunks from each layer at once
+SCENE_CLOUDS = 5  # ... and up to this many clouds
+GRASS_STRIP_HEIGHT = 12  # Grass and flowers reach 10px above the ground line
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -36,13 +98,35 @@ ground_patches = []
 mountains = []
 cherry_blossoms = []
 
+# Optional gameplay telemetry channel (see --telemetry)
+game_telemetry = None
+
+# Optional live spectator feed (see --spectator-port and --spectator-socket)
+spectator_server = None
+
+# Optional per-run replay recording (see --record-replay)
+replay_recorder = None
+
+# Optional garbage collector control and per-frame allocation measurement
+# (see --gc-control and --alloc-budget)
+gc_controller = None
+allocation_meter = None
+
+# Optional shared-memory copy of every rendered frame (see --framebuffer)
+frame_export = None
+
+# Persistent high scores, set up in __main__ unless --no-scores
+score_store = None
+
+# Optional race against recorded runs (see --ghosts)
+ghost_race = None
+
 # Mountain class for background
 class Mountain:
     def __init__(self, layer):
         self.layer = layer  # 0 = farthest, 2 = closest
         self.color = MOUNTAIN_COLORS[layer]
-        self.height = random.randint(80, 150) + (layer * 30)
-        self.width = random.randint(200, 400) + (layer * 50)
+        self.width, self.height, self.sprite = mountain_chunks[layer].take()
         self.x = random.randint(-100, SCREEN_WIDTH)
         self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
         self.speed = 0.2 + (layer * 0.2)  # Parallax effect - closer mountains move faster
@@ -51,30 +135,12 @@ class Mountain:
         self.x -= self.speed * game_speed
         if self.x + self.width < -100:
             self.x = SCREEN_WIDTH + random.randint(0, 100)
-            self.height = random.randint(80, 150) + (self.layer * 30)
-            self.width = random.randint(200, 400) + (self.layer * 50)
+            # Swap in the next mountain, already scaled by the chunk worker
+            self.width, self.height, self.sprite = mountain_chunks[self.layer].take()
             self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
     
     def draw(self, screen):
-        # Draw mountain silhouette
-        points = [
-            (self.x, SCREEN_HEIGHT - GROUND_HEIGHT),  # Bottom left
-            (self.x + self.width * 0.2, self.y + self.height * 0.7),  # First bump
-            (self.x + self.width * 0.4, self.y + self.height * 0.3),  # Second bump
-            (self.x + self.width * 0.6, self.y),  # Peak
-            (self.x + self.width * 0.8, self.y + self.height * 0.5),  # Fourth bump
-            (self.x + self.width, SCREEN_HEIGHT - GROUND_HEIGHT)  # Bottom right
-        ]
-        pygame.draw.polygon(screen, self.color, points)
-        
-        # Add snow caps on distant mountains
-        if self.layer == 0:
-            snow_points = [
-                (self.x + self.width * 0.5, self.y + 5),
-                (self.x + self.width * 0.6, self.y),
-                (self.x + self.width * 0.7, self.y + 5)
-            ]
-            pygame.draw.polygon(screen, WHITE, snow_points)
+        screen.blit(self.sprite, (self.x, self.y))
 
 # Cherry Blossom petal class
 class CherryBlossom:
@@ -107,14 +173,9 @@ class CherryBlossom:
         self.alpha = random.randint(150, 255)
     
     def draw(self, screen):
-        # Create a surface for the petal with transparency
-        petal_surface = pygame.Surface((self.size * 2, self.size), pygame.SRCALPHA)
-        
-        # Draw a petal shape (oval)
-        pygame.draw.ellipse(petal_surface, (*self.color, self.alpha), (0, 0, self.size * 2, self.size))
-        
-        # Rotate the petal
-        rotated_petal = pygame.transform.rotate(petal_surface, self.rotation)
+        # Use the cached petal at the nearest rotation, faded to this petal's alpha
+        rotated_petal = get_petal_sprite(self.size, self.rotation)
+        rotated_petal.set_alpha(self.alpha)
         
         # Get the rect of the rotated surface
         rect = rotated_petal.get_rect(center=(self.x, self.y))
@@ -125,8 +186,7 @@ class CherryBlossom:
 # Cloud class for background
 class Cloud:
     def __init__(self):
-        self.width = random.randint(60, 120)
-        self.height = random.randint(30, 50)
+        self.width, self.height, self.sprite = cloud_chunks.take()
         self.x = SCREEN_WIDTH + random.randint(0, 100)
         self.y = random.randint(20, 150)
         self.speed = random.uniform(0.5, 1.5)
@@ -135,34 +195,51 @@ class Cloud:
         self.x -= self.speed
         
     def draw(self, screen):
-        # Draw a fluffy cloud using multiple circles
-        center_x = self.x + self.width // 2
-        center_y = self.y + self.height // 2
-        
-        # Draw main cloud body
-        pygame.draw.ellipse(screen, CLOUD_WHITE, 
-                          (center_x - self.width//2, center_y - self.height//2, 
-                           self.width, self.height))
-        
-        # Draw additional cloud puffs
-        puff_radius = self.height // 2
-        pygame.draw.circle(screen, CLOUD_WHITE, 
-                         (center_x - self.width//4, center_y), puff_radius)
-        pygame.draw.circle(screen, CLOUD_WHITE, 
-                         (center_x + self.width//4, center_y), puff_radius)
-        pygame.draw.circle(screen, CLOUD_WHITE, 
-                         (center_x, center_y - self.height//4), puff_radius)
+        screen.blit(self.sprite, (self.x - CLOUD_PADDING, self.y - CLOUD_PADDING))
         
     def is_off_screen(self):
         return self.x + self.width < 0
 # Set up the display
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("2D Runner Game")
-clock = pygame.time.Clock()
+clock = pacing.FramePacer()  # Same as pygame's Clock unless --pacing says otherwise
 
 # Font setup
 font = pygame.font.SysFont('Arial', 30)
 
+# UI fonts by (size, bold). SysFont looks the font up and loads it from disk,
+# so each one is created once
+ui_fonts = {}
+UI_FONTS = [(20, False), (24, False), (28, False), (48, True)]
+
+def get_font(size, bold=False):
+    key = (size, bold)
+    ui_font = ui_fonts.get(key)
+    if ui_font is None:
+        ui_font = pygame.font.SysFont('Arial', size, bold=bold)
+        ui_fonts[key] = ui_font
+    return ui_font
+
+# Translucent UI panels by size, fill and border colour, made once
+ui_panels = {}
+UI_PANEL = (400, 200, (0, 0, 0, 150), (255, 255, 255, 100))  # Start and game over screens
+
+def get_panel(width, height, fill, border=None, border_width=2):
+    key = (width, height, fill, border)
+    panel = ui_panels.get(key)
+    if panel is None:
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(fill)
+        if border is not None:
+            pygame.draw.rect(panel, border, (border_width, border_width,
+                                             width - 2*border_width,
+                                             height - 2*border_width),
+                             border_width)
+        panel = surface_format.for_display(panel)
+        ui_panels[key] = panel
+    return panel
+
+
 class Player:
     def __init__(self):
         self.radius = 25
@@ -182,6 +259,8 @@ class Player:
         if not self.is_jumping and not self.is_ducking and not self.falling:
             self.is_jumping = True
             self.velocity = self.jump_power
+            return True
+        return False
     
     def duck(self):
         if not self.is_jumping and not self.falling:
@@ -189,6 +268,8 @@ class Player:
             self.radius = self.duck_radius
             # Adjust y position to keep the player on the ground
             self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.radius
+            return True
+        return False
     
     def stop_duck(self):
         if self.is_ducking and not self.falling:
@@ -223,323 +304,725 @@ class Player:
             end_y = self.y + self.radius * 0.8 * pygame.math.Vector2(1, 0).rotate(self.rotation).y
             pygame.draw.line(screen, BLACK, (self.x, self.y), (end_x, end_y), 3)
 
+class ObstacleType:
+    # Everything the game needs to know about one kind of obstacle. Types are
+    # declared once in OBSTACLE_TYPES and referred to by their index (type id)
+    def __init__(self, name, width, height, spawn_height, spawn_weight, shape, color, renderer,
+                 frames=1, frame_ms=0, sprite_cached=True):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.spawn_height = spawn_height  # Height of the obstacle's top above the ground
+        self.spawn_weight = spawn_weight  # Relative chance of being spawned
+        self.shape = shape  # SHAPE_RECT or SHAPE_HOLE, selects the collision test
+        self.color = color
+        self.renderer = renderer  # renderer(obstacle, screen, frame)
+        self.frames = frames  # Animation frames
+        self.frame_ms = frame_ms  # Time each animation frame is shown
+        self.sprite_cached = sprite_cached  # Drawn from a cached sprite per frame rather than every frame
+
+# Collision shapes
+SHAPE_RECT = 0
+SHAPE_HOLE = 1
+
 class Obstacle:
-    def __init__(self, game_speed):
+    def __init__(self, game_speed, type_id):
+        # Which type spawns is GameState.spawn_obstacle's choice
         self.game_speed = game_speed
-        self.type = random.choice(['box', 'tree', 'bee', 'bird', 'hole'])
+        kind = OBSTACLE_TYPES[type_id]
+        self.type_id = type_id
+        self.type = kind.name
+        self.serial = 0  # Spawn number within the run, set by GameState
         
         # Set dimensions and position based on type
-        if self.type == 'box':
-            self.width = 35
-            self.height = 35
-            self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
-            self.color = (200, 150, 100)  # Light brown/tan for house
-            self.is_house = True
-        elif self.type == 'tree':
-            self.width = 38  # Increased from 35
-            self.height = 75  # Increased from 70
-            self.y = SCREEN_HEIGHT - GROUND_HEIGHT - self.height
-            self.color = (100, 100, 150)  # Building color (grayish blue)
-            # Add window data
-            self.is_building = True
-            self.num_floors = 4  # Increased back to 4 floors
-            self.num_windows = 2
-        elif self.type == 'bee':
-            self.width = 60  # Wider
-            self.height = 30  # Taller
-            # Position at a height where player must duck (considering normal player radius)
-            self.y = SCREEN_HEIGHT - GROUND_HEIGHT - 60
-            self.color = YELLOW
-        elif self.type == 'bird':
-            self.width = 70  # Wider
-            self.height = 35  # Taller
-            # Position at a height where player must duck (considering normal player radius)
-            self.y = SCREEN_HEIGHT - GROUND_HEIGHT - 70
-            self.color = DARK_BLUE
-        elif self.type == 'hole':
-            self.width = 70  # Increased from 50
-            self.height = GROUND_HEIGHT  # Make hole as deep as the ground
-            self.y = SCREEN_HEIGHT - GROUND_HEIGHT  # Position at ground level
-            self.color = BLACK
-            self.is_hole = True
+        self.width = kind.width
+        self.height = kind.height
+        self.y = SCREEN_HEIGHT - GROUND_HEIGHT - kind.spawn_height
+        self.color = kind.color
+        self.shape = kind.shape
+        self.is_hole = kind.shape == SHAPE_HOLE
         
         self.x = SCREEN_WIDTH
     
     def update(self):
         self.x -= self.game_speed
     
-    def draw(self, screen):
-        # Draw the obstacle
-        if hasattr(self, 'is_hole') and self.is_hole:
-            # Draw a more realistic hole
-            
-            # Draw the main hole (black background)
-            pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-            
-            # Draw dirt texture on the sides of the hole
-            dirt_color = (101, 67, 33)  # Brown color for dirt
-            dark_dirt_color = (60, 40, 20)  # Darker brown for depth
-            
-            # Left edge of hole
-            pygame.draw.rect(screen, dirt_color, (self.x, self.y, 5, self.height))
-            # Right edge of hole
-            pygame.draw.rect(screen, dirt_color, (self.x + self.width - 5, self.y, 5, self.height))
-            
-            # Add some depth effect with darker color at the bottom
-            pygame.draw.rect(screen, dark_dirt_color, 
-                           (self.x + 5, self.y + 10, self.width - 10, self.height - 10))
-            
-            # Add some texture/detail to make the hole look deeper
-            for i in range(3):
-                depth_line_y = self.y + 15 + i * 10
-                if depth_line_y < self.y + self.height:
-                    # Draw horizontal lines with varying darkness
-                    line_color = (max(20, 40 - i * 10), max(20, 40 - i * 10), max(20, 40 - i * 10))
-                    pygame.draw.line(screen, line_color, 
-                                   (self.x + 10, depth_line_y),
-                                   (self.x + self.width - 10, depth_line_y), 2)
-            
-            # Add some small rocks/debris at the bottom
-            for _ in range(5):
-                rock_x = self.x + random.randint(10, self.width - 10)
-                rock_y = self.y + self.height - random.randint(5, 15)
-                rock_size = random.randint(1, 3)
-                rock_color = (100 + random.randint(-20, 20), 
-                             100 + random.randint(-20, 20), 
-                             100 + random.randint(-20, 20))  # Grayish with variation
-                pygame.draw.circle(screen, rock_color, (rock_x, rock_y), rock_size)
-            
-            # Add some grass hanging over the edges
-            for x_offset in range(0, self.width, 8):
-                if random.random() < 0.5:
-                    grass_x = self.x + x_offset
-                    grass_length = random.randint(2, 5)
-                    grass_color = (50, 205, 50) if random.random() > 0.3 else (34, 139, 34)
-                    
-                    if x_offset < 10 or x_offset > self.width - 10:  # Only at the edges
-                        pygame.draw.line(screen, grass_color, 
-                                       (grass_x, self.y),
-                                       (grass_x + random.choice([-1, 1]) * 2, self.y + grass_length), 1)
-        
-        elif self.type == 'bee':
-            # Draw a realistic bee
-            
-            # Body parts
-            body_color = (250, 217, 65)  # Yellow
-            stripe_color = (10, 10, 10)  # Black
-            wing_color = (240, 240, 255, 150)  # Transparent white
-            
-            # Calculate center points
-            center_x = self.x + self.width // 2
-            center_y = self.y + self.height // 2
-            
-            # Draw the main body (ellipse)
-            body_rect = pygame.Rect(self.x + 10, center_y - 8, self.width - 20, 16)
-            pygame.draw.ellipse(screen, body_color, body_rect)
-            
-            # Draw black stripes
-            stripe_width = 4
-            for i in range(3):
-                stripe_x = self.x + 15 + i * 10
-                stripe_rect = pygame.Rect(stripe_x, center_y - 8, stripe_width, 16)
-                pygame.draw.ellipse(screen, stripe_color, stripe_rect)
-            
-            # Draw head (circle)
-            head_radius = 7
-            pygame.draw.circle(screen, stripe_color, (self.x + 8, center_y), head_radius)
-            
-            # Draw eyes
-            eye_color = (255, 255, 255)  # White
-            pygame.draw.circle(screen, eye_color, (self.x + 5, center_y - 3), 2)
-            pygame.draw.circle(screen, eye_color, (self.x + 5, center_y + 3), 2)
-            
-            # Draw wings (semi-transparent)
-            wing_surface = pygame.Surface((20, 15), pygame.SRCALPHA)
-            pygame.draw.ellipse(wing_surface, wing_color, (0, 0, 20, 15))
-            
-            # Draw top and bottom wings with slight angle
-            screen.blit(wing_surface, (center_x - 5, center_y - 15))
-            
-            # Flip the wing surface for bottom wing
-            bottom_wing = pygame.transform.flip(wing_surface, False, True)
-            screen.blit(bottom_wing, (center_x - 5, center_y))
-            
-            # Draw stinger
-            pygame.draw.polygon(screen, stripe_color, [
-                (self.x + self.width - 5, center_y),
-                (self.x + self.width + 3, center_y - 2),
-                (self.x + self.width + 3, center_y + 2)
-            ])
-            
-            # Add animation - make wings "flutter"
-            if pygame.time.get_ticks() % 200 < 100:  # Alternate every 100ms
-                flutter_wing = pygame.transform.rotate(wing_surface, 15)
-                screen.blit(flutter_wing, (center_x - 8, center_y - 15))
-                flutter_bottom = pygame.transform.rotate(bottom_wing, -15)
-                screen.blit(flutter_bottom, (center_x - 8, center_y))
+    def animation_frame(self, tick=None):
+        # Which animation frame is showing at a simulation tick. Play draws
+        # and collides with the same tick's frame, so what you see is what
+        # hits; without a tick it goes by the clock
+        kind = OBSTACLE_TYPES[self.type_id]
+        if kind.frames == 1:
+            return 0
+        if tick is None:
+            return pygame.time.get_ticks() // kind.frame_ms % kind.frames
+        return tick * 1000 // FPS // kind.frame_ms % kind.frames
+    
+    def draw(self, screen, frame=None):
+        if frame is None:
+            frame = self.animation_frame()
         
-        elif self.type == 'bird':
-            # Draw a realistic bird
-            
-            # Bird colors
-            body_color = (65, 105, 225)  # Royal blue
-            wing_color = (30, 70, 180)  # Darker blue
-            beak_color = (255, 165, 0)  # Orange
-            eye_color = (255, 255, 255)  # White
-            pupil_color = (0, 0, 0)  # Black
-            
-            # Calculate center points
-            center_x = self.x + self.width // 2
-            center_y = self.y + self.height // 2
-            
-            # Draw the main body (ellipse)
-            body_rect = pygame.Rect(self.x + 5, center_y - 10, self.width - 15, 20)
-            pygame.draw.ellipse(screen, body_color, body_rect)
-            
-            # Draw head
-            head_radius = 10
-            pygame.draw.circle(screen, body_color, (self.x + 15, center_y - 5), head_radius)
-            
-            # Draw eye
-            pygame.draw.circle(screen, eye_color, (self.x + 12, center_y - 8), 3)
-            pygame.draw.circle(screen, pupil_color, (self.x + 12, center_y - 8), 1)
-            
-            # Draw beak
-            pygame.draw.polygon(screen, beak_color, [
-                (self.x + 5, center_y - 5),
-                (self.x - 5, center_y),
-                (self.x + 5, center_y + 2)
-            ])
-            
-            # Draw tail
-            pygame.draw.polygon(screen, body_color, [
-                (self.x + self.width - 10, center_y - 5),
-                (self.x + self.width + 5, center_y),
-                (self.x + self.width - 10, center_y + 5)
-            ])
-            
-            # Draw wings
-            # Determine wing position based on time for flapping animation
-            wing_time = pygame.time.get_ticks() % 600
-            if wing_time < 200:  # Wings up
-                wing_y_offset = -10
-                wing_height = 15
-            elif wing_time < 400:  # Wings middle
-                wing_y_offset = -5
-                wing_height = 10
-            else:  # Wings down
-                wing_y_offset = 0
-                wing_height = 5
-                
-            # Draw the wing
-            pygame.draw.ellipse(screen, wing_color, 
-                              (center_x - 15, center_y + wing_y_offset, 
-                               30, wing_height))
-            
-            # Add some feather details
-            for i in range(3):
-                feather_x = center_x - 10 + i * 10
-                pygame.draw.line(screen, (50, 90, 200),
-                               (feather_x, center_y + wing_y_offset + wing_height - 2),
-                               (feather_x, center_y + wing_y_offset + wing_height + 3), 1)
-        
-        elif hasattr(self, 'is_house') and self.is_house:
-            # Draw the main house body first
-            pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-            
-            # Draw a roof (triangle)
-            roof_color = (180, 0, 0)  # Red roof
-            pygame.draw.polygon(screen, roof_color, [
-                (self.x - 5, self.y),
-                (self.x + self.width//2, self.y - 15),
-                (self.x + self.width + 5, self.y)
-            ])
-            
-            # Draw windows (2 small windows)
-            window_color = (200, 255, 255)  # Light blue windows
-            window_width = 8
-            window_height = 8
-            window_margin = 6
-            
-            # Left window
-            pygame.draw.rect(screen, window_color, 
-                            (self.x + window_margin, self.y + window_margin, 
-                             window_width, window_height))
-            pygame.draw.rect(screen, BLACK, 
-                            (self.x + window_margin, self.y + window_margin, 
-                             window_width, window_height), 1)
-            
-            # Right window
+        if OBSTACLE_SPRITE_CACHED[self.type_id]:
+            screen.blit(get_obstacle_sprite(self.type_id, frame),
+                        (int(self.x) - SPRITE_PADDING, int(self.y) - SPRITE_PADDING))
+        else:
+            OBSTACLE_RENDERERS[self.type_id](self, screen, frame)
+    
+    def is_off_screen(self):
+        return self.x < -self.width
+# Obstacle renderers, one per type
+
+def draw_hole(obstacle, screen, frame):
+    # Draw a more realistic hole
+    
+    # Draw the main hole (black background)
+    pygame.draw.rect(screen, obstacle.color, (obstacle.x, obstacle.y, obstacle.width, obstacle.height))
+    
+    # Draw dirt texture on the sides of the hole
+    dirt_color = (101, 67, 33)  # Brown color for dirt
+    dark_dirt_color = (60, 40, 20)  # Darker brown for depth
+    
+    # Left edge of hole
+    pygame.draw.rect(screen, dirt_color, (obstacle.x, obstacle.y, 5, obstacle.height))
+    # Right edge of hole
+    pygame.draw.rect(screen, dirt_color, (obstacle.x + obstacle.width - 5, obstacle.y, 5, obstacle.height))
+    
+    # Add some depth effect with darker color at the bottom
+    pygame.draw.rect(screen, dark_dirt_color, 
+                   (obstacle.x + 5, obstacle.y + 10, obstacle.width - 10, obstacle.height - 10))
+    
+    # Add some texture/detail to make the hole look deeper
+    for i in range(3):
+        depth_line_y = obstacle.y + 15 + i * 10
+        if depth_line_y < obstacle.y + obstacle.height:
+            # Draw horizontal lines with varying darkness
+            line_color = (max(20, 40 - i * 10), max(20, 40 - i * 10), max(20, 40 - i * 10))
+            pygame.draw.line(screen, line_color, 
+                           (obstacle.x + 10, depth_line_y),
+                           (obstacle.x + obstacle.width - 10, depth_line_y), 2)
+    
+    # Add some small rocks/debris at the bottom
+    for _ in range(5):
+        rock_x = obstacle.x + random.randint(10, obstacle.width - 10)
+        rock_y = obstacle.y + obstacle.height - random.randint(5, 15)
+        rock_size = random.randint(1, 3)
+        rock_color = (100 + random.randint(-20, 20), 
+                     100 + random.randint(-20, 20), 
+                     100 + random.randint(-20, 20))  # Grayish with variation
+        pygame.draw.circle(screen, rock_color, (rock_x, rock_y), rock_size)
+    
+    # Add some grass hanging over the edges
+    for x_offset in range(0, obstacle.width, 8):
+        if random.random() < 0.5:
+            grass_x = obstacle.x + x_offset
+            grass_length = random.randint(2, 5)
+            grass_color = (50, 205, 50) if random.random() > 0.3 else (34, 139, 34)
+    
+            if x_offset < 10 or x_offset > obstacle.width - 10:  # Only at the edges
+                pygame.draw.line(screen, grass_color, 
+                               (grass_x, obstacle.y),
+                               (grass_x + random.choice([-1, 1]) * 2, obstacle.y + grass_length), 1)
+
+def draw_bee(obstacle, screen, frame):
+    # Draw a realistic bee
+    
+    # Body parts
+    body_color = (250, 217, 65)  # Yellow
+    stripe_color = (10, 10, 10)  # Black
+    
+    # Calculate center points
+    center_x = obstacle.x + obstacle.width // 2
+    center_y = obstacle.y + obstacle.height // 2
+    
+    # Draw the main body (ellipse)
+    body_rect = pygame.Rect(obstacle.x + 10, center_y - 8, obstacle.width - 20, 16)
+    pygame.draw.ellipse(screen, body_color, body_rect)
+    
+    # Draw black stripes
+    stripe_width = 4
+    for i in range(3):
+        stripe_x = obstacle.x + 15 + i * 10
+        stripe_rect = pygame.Rect(stripe_x, center_y - 8, stripe_width, 16)
+        pygame.draw.ellipse(screen, stripe_color, stripe_rect)
+    
+    # Draw head (circle)
+    head_radius = 7
+    pygame.draw.circle(screen, stripe_color, (obstacle.x + 8, center_y), head_radius)
+    
+    # Draw eyes
+    eye_color = (255, 255, 255)  # White
+    pygame.draw.circle(screen, eye_color, (obstacle.x + 5, center_y - 3), 2)
+    pygame.draw.circle(screen, eye_color, (obstacle.x + 5, center_y + 3), 2)
+    
+    # Draw top and bottom wings (semi-transparent)
+    wing_surface, bottom_wing, flutter_wing, flutter_bottom = get_bee_wings()
+    screen.blit(wing_surface, (center_x - 5, center_y - 15))
+    screen.blit(bottom_wing, (center_x - 5, center_y))
+    
+    # Draw stinger
+    pygame.draw.polygon(screen, stripe_color, [
+        (obstacle.x + obstacle.width - 5, center_y),
+        (obstacle.x + obstacle.width + 3, center_y - 2),
+        (obstacle.x + obstacle.width + 3, center_y + 2)
+    ])
+    
+    # Add animation - make wings "flutter" on the first frame
+    if frame == 0:
+        screen.blit(flutter_wing, (center_x - 8, center_y - 15))
+        screen.blit(flutter_bottom, (center_x - 8, center_y))
+
+# Bee wings: top, bottom (flipped), and both tilted for the flutter frame
+bee_wings = None
+
+def get_bee_wings():
+    global bee_wings
+    if bee_wings is None:
+        wing_surface = pygame.Surface((20, 15), pygame.SRCALPHA)
+        pygame.draw.ellipse(wing_surface, (240, 240, 255, 150), (0, 0, 20, 15))  # Transparent white
+        bottom_wing = pygame.transform.flip(wing_surface, False, True)
+        bee_wings = tuple(surface_format.for_display(wing) for wing in
+                          (wing_surface, bottom_wing,
+                           pygame.transform.rotate(wing_surface, 15),
+                           pygame.transform.rotate(bottom_wing, -15)))
+    return bee_wings
+
+def draw_bird(obstacle, screen, frame):
+    # Draw a realistic bird
+    
+    # Bird colors
+    body_color = (65, 105, 225)  # Royal blue
+    wing_color = (30, 70, 180)  # Darker blue
+    beak_color = (255, 165, 0)  # Orange
+    eye_color = (255, 255, 255)  # White
+    pupil_color = (0, 0, 0)  # Black
+    
+    # Calculate center points
+    center_x = obstacle.x + obstacle.width // 2
+    center_y = obstacle.y + obstacle.height // 2
+    
+    # Draw the main body (ellipse)
+    body_rect = pygame.Rect(obstacle.x + 5, center_y - 10, obstacle.width - 15, 20)
+    pygame.draw.ellipse(screen, body_color, body_rect)
+    
+    # Draw head
+    head_radius = 10
+    pygame.draw.circle(screen, body_color, (obstacle.x + 15, center_y - 5), head_radius)
+    
+    # Draw eye
+    pygame.draw.circle(screen, eye_color, (obstacle.x + 12, center_y - 8), 3)
+    pygame.draw.circle(screen, pupil_color, (obstacle.x + 12, center_y - 8), 1)
+    
+    # Draw beak
+    pygame.draw.polygon(screen, beak_color, [
+        (obstacle.x + 5, center_y - 5),
+        (obstacle.x - 5, center_y),
+        (obstacle.x + 5, center_y + 2)
+    ])
+    
+    # Draw tail
+    pygame.draw.polygon(screen, body_color, [
+        (obstacle.x + obstacle.width - 10, center_y - 5),
+        (obstacle.x + obstacle.width + 5, center_y),
+        (obstacle.x + obstacle.width - 10, center_y + 5)
+    ])
+    
+    # Draw wings
+    # Determine wing position from the flapping animation frame
+    if frame == 0:  # Wings up
+        wing_y_offset = -10
+        wing_height = 15
+    elif frame == 1:  # Wings middle
+        wing_y_offset = -5
+        wing_height = 10
+    else:  # Wings down
+        wing_y_offset = 0
+        wing_height = 5
+    
+    # Draw the wing
+    pygame.draw.ellipse(screen, wing_color, 
+                      (center_x - 15, center_y + wing_y_offset, 
+                       30, wing_height))
+    
+    # Add some feather details
+    for i in range(3):
+        feather_x = center_x - 10 + i * 10
+        pygame.draw.line(screen, (50, 90, 200),
+                       (feather_x, center_y + wing_y_offset + wing_height - 2),
+                       (feather_x, center_y + wing_y_offset + wing_height + 3), 1)
+
+def draw_house(obstacle, screen, frame):
+    # Draw the main house body first
+    pygame.draw.rect(screen, obstacle.color, (obstacle.x, obstacle.y, obstacle.width, obstacle.height))
+    
+    # Draw a roof (triangle)
+    roof_color = (180, 0, 0)  # Red roof
+    pygame.draw.polygon(screen, roof_color, [
+        (obstacle.x - 5, obstacle.y),
+        (obstacle.x + obstacle.width//2, obstacle.y - 15),
+        (obstacle.x + obstacle.width + 5, obstacle.y)
+    ])
+    
+    # Draw windows (2 small windows)
+    window_color = (200, 255, 255)  # Light blue windows
+    window_width = 8
+    window_height = 8
+    window_margin = 6
+    
+    # Left window
+    pygame.draw.rect(screen, window_color, 
+                    (obstacle.x + window_margin, obstacle.y + window_margin, 
+                     window_width, window_height))
+    pygame.draw.rect(screen, BLACK, 
+                    (obstacle.x + window_margin, obstacle.y + window_margin, 
+                     window_width, window_height), 1)
+    
+    # Right window
+    pygame.draw.rect(screen, window_color, 
+                    (obstacle.x + obstacle.width - window_margin - window_width, 
+                     obstacle.y + window_margin, window_width, window_height))
+    pygame.draw.rect(screen, BLACK, 
+                    (obstacle.x + obstacle.width - window_margin - window_width, 
+                     obstacle.y + window_margin, window_width, window_height), 1)
+    
+    # Draw a door
+    door_width = 10
+    door_height = 15
+    door_x = obstacle.x + (obstacle.width - door_width) // 2
+    door_y = obstacle.y + obstacle.height - door_height
+    
+    pygame.draw.rect(screen, (101, 67, 33), (door_x, door_y, door_width, door_height))
+    pygame.draw.rect(screen, BLACK, (door_x, door_y, door_width, door_height), 1)
+    
+    # Door knob
+    pygame.draw.circle(screen, YELLOW, (door_x + door_width - 3, door_y + door_height//2), 2)
+
+def draw_building(obstacle, screen, frame):
+    # Draw the main building body first (solid color)
+    pygame.draw.rect(screen, obstacle.color, (obstacle.x, obstacle.y, obstacle.width, obstacle.height))
+    
+    # Draw a roof
+    roof_color = (160, 82, 45)  # Brown roof
+    pygame.draw.polygon(screen, roof_color, [
+        (obstacle.x - 5, obstacle.y),
+        (obstacle.x + obstacle.width//2, obstacle.y - 15),
+        (obstacle.x + obstacle.width + 5, obstacle.y)
+    ])
+    
+    # Window properties
+    window_width = 8
+    window_height = 10
+    window_color = (200, 255, 255)  # Light blue windows
+    window_margin = 4
+    num_floors = 4
+    num_windows = 2
+    
+    # Draw windows on each floor
+    floor_height = (obstacle.height - (num_floors + 1) * window_margin) / num_floors
+    
+    for floor in range(num_floors):
+        for window in range(num_windows):
+            window_x = obstacle.x + window_margin + window * (window_width + window_margin)
+            window_y = obstacle.y + window_margin + floor * (floor_height)
+    
+            # Draw the window
             pygame.draw.rect(screen, window_color, 
-                            (self.x + self.width - window_margin - window_width, 
-                             self.y + window_margin, window_width, window_height))
+                            (window_x, window_y, window_width, window_height))
+    
+            # Draw window frame
             pygame.draw.rect(screen, BLACK, 
-                            (self.x + self.width - window_margin - window_width, 
-                             self.y + window_margin, window_width, window_height), 1)
-            
-            # Draw a door
-            door_width = 10
-            door_height = 15
-            door_x = self.x + (self.width - door_width) // 2
-            door_y = self.y + self.height - door_height
-            
-            pygame.draw.rect(screen, (101, 67, 33), (door_x, door_y, door_width, door_height))
-            pygame.draw.rect(screen, BLACK, (door_x, door_y, door_width, door_height), 1)
-            
-            # Door knob
-            pygame.draw.circle(screen, YELLOW, (door_x + door_width - 3, door_y + door_height//2), 2)
-            
-        elif hasattr(self, 'is_building') and self.is_building:
-            # Draw the main building body first (solid color)
-            pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-            
-            # Draw a roof
-            roof_color = (160, 82, 45)  # Brown roof
-            pygame.draw.polygon(screen, roof_color, [
-                (self.x - 5, self.y),
-                (self.x + self.width//2, self.y - 15),
-                (self.x + self.width + 5, self.y)
-            ])
-            
-            # Window properties
-            window_width = 8
-            window_height = 10
-            window_color = (200, 255, 255)  # Light blue windows
-            window_margin = 4
-            
-            # Draw windows on each floor
-            floor_height = (self.height - (self.num_floors + 1) * window_margin) / self.num_floors
-            
-            for floor in range(self.num_floors):
-                for window in range(self.num_windows):
-                    window_x = self.x + window_margin + window * (window_width + window_margin)
-                    window_y = self.y + window_margin + floor * (floor_height)
-                    
-                    # Draw the window
-                    pygame.draw.rect(screen, window_color, 
-                                    (window_x, window_y, window_width, window_height))
-                    
-                    # Draw window frame
-                    pygame.draw.rect(screen, BLACK, 
-                                    (window_x, window_y, window_width, window_height), 1)
+                            (window_x, window_y, window_width, window_height), 1)
+    
+    # Draw a door at the bottom
+    door_width = 12
+    door_height = 20
+    door_x = obstacle.x + (obstacle.width - door_width) // 2
+    door_y = obstacle.y + obstacle.height - door_height
+    
+    pygame.draw.rect(screen, (101, 67, 33), (door_x, door_y, door_width, door_height))
+    pygame.draw.rect(screen, BLACK, (door_x, door_y, door_width, door_height), 1)
+    
+    # Door knob
+    pygame.draw.circle(screen, YELLOW, (door_x + door_width - 3, door_y + door_height//2), 2)
+
+# Obstacle registry, indexed by type id. Spawn weights, collision and drawing
+# all go through tables built from it, so adding a type doesn't add per-frame
+# work. The order is also the telemetry kind code, so new types go at the end
+OBSTACLE_TYPES = [
+    # A small house with a roof overhanging the rectangle
+    ObstacleType('house', 35, 35, 35, 1, SHAPE_RECT, (200, 150, 100), draw_house),
+    # A tall building (grayish blue)
+    ObstacleType('building', 38, 75, 75, 1, SHAPE_RECT, (100, 100, 150), draw_building),
+    # Flies at a height where the player must duck (considering normal player radius)
+    ObstacleType('bee', 60, 30, 60, 1, SHAPE_RECT, YELLOW, draw_bee, frames=2, frame_ms=100),
+    ObstacleType('bird', 70, 35, 70, 1, SHAPE_RECT, DARK_BLUE, draw_bird, frames=3, frame_ms=200),
+    # As deep as the ground, at ground level
+    # Rocks and grass are re-randomised as it's drawn, so it isn't cached
+    ObstacleType('hole', 70, GROUND_HEIGHT, 0, 1, SHAPE_HOLE, BLACK, draw_hole, sprite_cached=False),
+]
+OBSTACLE_TYPE_IDS = {kind.name: type_id for type_id, kind in enumerate(OBSTACLE_TYPES)}
+OBSTACLE_RENDERERS = [kind.renderer for kind in OBSTACLE_TYPES]
+OBSTACLE_SPRITE_CACHED = [kind.sprite_cached for kind in OBSTACLE_TYPES]
+OBSTACLE_SPAWN_WEIGHTS = list(itertools.accumulate(kind.spawn_weight for kind in OBSTACLE_TYPES))
+telemetry.OBSTACLE_KINDS[:] = OBSTACLE_TYPE_IDS
+
+# Sprite caches. Everything here is drawn on first use, or loaded up front
+# from the on-disk atlas by load_sprite_caches()
+obstacle_sprites = {}
+petal_sprites = {}
+mountain_templates = {}
+cloud_sprites = {}
+
+def get_obstacle_sprite(type_id, frame):
+    # Render one animation frame of an obstacle type onto a padded transparent
+    # surface; the obstacle's own (x, y) sits at (SPRITE_PADDING, SPRITE_PADDING)
+    key = (type_id, frame)
+    sprite = obstacle_sprites.get(key)
+    if sprite is None:
+        template = Obstacle(0, type_id)
+        template.x = SPRITE_PADDING
+        template.y = SPRITE_PADDING
+        sprite = pygame.Surface((template.width + 2 * SPRITE_PADDING,
+                                 template.height + 2 * SPRITE_PADDING), pygame.SRCALPHA)
+        OBSTACLE_RENDERERS[type_id](template, sprite, frame)
+        sprite = surface_format.for_display(sprite)
+        obstacle_sprites[key] = sprite
+    return sprite
+
+def render_petal(size, rotation):
+    # Create a surface for the petal with transparency
+    petal_surface = pygame.Surface((size * 2, size), pygame.SRCALPHA)
+    
+    # Draw a petal shape (oval) at full opacity; each petal fades it with set_alpha
+    pygame.draw.ellipse(petal_surface, CHERRY_BLOSSOM, (0, 0, size * 2, size))
+    
+    # Rotate the petal
+    return pygame.transform.rotate(petal_surface, rotation)
+
+def get_petal_sprite(size, rotation):
+    step = round(rotation / PETAL_ROTATION_STEP) % (360 // PETAL_ROTATION_STEP)
+    key = (size, step)
+    sprite = petal_sprites.get(key)
+    if sprite is None:
+        sprite = surface_format.for_display(render_petal(size, step * PETAL_ROTATION_STEP))
+        petal_sprites[key] = sprite
+    return sprite
+
+# Built on first raster draw; False if NumPy isn't available
+petal_rasterizer = None
+
+def get_petal_rasterizer():
+    global petal_rasterizer
+    if petal_rasterizer is None:
+        try:
+            import petal_raster
+        except ImportError:
+            petal_rasterizer = False
+        else:
+            steps = 360 // PETAL_ROTATION_STEP
+            sprites = [get_petal_sprite(size, step * PETAL_ROTATION_STEP)
+                       for size in range(3, 7) for step in range(steps)]
+            petal_rasterizer = petal_raster.PetalRasterizer(sprites, CHERRY_BLOSSOM, 3, PETAL_ROTATION_STEP)
+    return petal_rasterizer or None
+
+def draw_blossoms(blossoms, surface, mode=None):
+    mode = mode or PETAL_MODE
+    if mode == PETAL_AUTO:
+        mode = PETAL_RASTER if len(blossoms) >= PETAL_RASTER_THRESHOLD else PETAL_BLIT
+    rasterizer = get_petal_rasterizer() if mode == PETAL_RASTER else None
+    if rasterizer is not None:
+        rasterizer.draw_petals(surface, blossoms)
+    else:
+        for blossom in blossoms:
+            blossom.draw(surface)
+
+def render_mountain(layer, width, height):
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    
+    # Draw mountain silhouette
+    points = [
+        (0, height),  # Bottom left
+        (width * 0.2, height * 0.7),  # First bump
+        (width * 0.4, height * 0.3),  # Second bump
+        (width * 0.6, 0),  # Peak
+        (width * 0.8, height * 0.5),  # Fourth bump
+        (width, height)  # Bottom right
+    ]
+    pygame.draw.polygon(surface, MOUNTAIN_COLORS[layer], points)
+    
+    # Add snow caps on distant mountains
+    if layer == 0:
+        snow_points = [
+            (width * 0.5, 5),
+            (width * 0.6, 0),
+            (width * 0.7, 5)
+        ]
+        pygame.draw.polygon(surface, WHITE, snow_points)
+    return surface
+
+def get_mountain_sprite(layer, width, height):
+    # Mountains are drawn once per layer at the largest size and scaled down;
+    # the silhouette is defined in proportions so scaling doesn't change it
+    template = mountain_templates.get(layer)
+    if template is None:
+        template = surface_format.for_display(render_mountain(layer, 400 + layer * 50, 150 + layer * 30))
+        mountain_templates[layer] = template
+    return pygame.transform.scale(template, (width, height))
+
+def render_cloud(width, height):
+    surface = pygame.Surface((width + 2 * CLOUD_PADDING, height + 2 * CLOUD_PADDING), pygame.SRCALPHA)
+    
+    # Draw a fluffy cloud using multiple circles
+    center_x = CLOUD_PADDING + width // 2
+    center_y = CLOUD_PADDING + height // 2
+    
+    # Draw main cloud body
+    pygame.draw.ellipse(surface, CLOUD_WHITE, 
+                      (center_x - width//2, center_y - height//2, 
+                       width, height))
+    
+    # Draw additional cloud puffs
+    puff_radius = height // 2
+    pygame.draw.circle(surface, CLOUD_WHITE, 
+                     (center_x - width//4, center_y), puff_radius)
+    pygame.draw.circle(surface, CLOUD_WHITE, 
+                     (center_x + width//4, center_y), puff_radius)
+    pygame.draw.circle(surface, CLOUD_WHITE, 
+                     (center_x, center_y - height//4), puff_radius)
+    return surface
+
+def render_grass_strip():
+    # Draw more realistic grass along the whole width of the ground
+    strip = pygame.Surface((SCREEN_WIDTH, GRASS_STRIP_HEIGHT), pygame.SRCALPHA)
+    ground_y = GRASS_STRIP_HEIGHT - 2  # Ground line within the strip
+    grass_color = (50, 205, 50)  # Bright green for grass
+    dark_grass_color = (34, 139, 34)  # Darker green for variation
+    
+    # Draw a base layer of grass (short blades)
+    for x in range(0, SCREEN_WIDTH, 4):
+        # Vary the height slightly for a more natural look
+        blade_height = random.randint(1, 4)
+        
+        # Alternate between light and dark green
+        color = grass_color if random.random() > 0.3 else dark_grass_color
+        
+        # Draw a simple grass blade (line)
+        pygame.draw.line(strip, color, (x, ground_y), (x, ground_y - blade_height), 1)
+    
+    # Draw taller grass blades less frequently
+    for x in range(0, SCREEN_WIDTH, 10):
+        if random.random() < 0.7:  # 70% chance for tall grass
+            # Vary the height for a more natural look
+            height = random.randint(4, 8)
             
-            # Draw a door at the bottom
-            door_width = 12
-            door_height = 20
-            door_x = self.x + (self.width - door_width) // 2
-            door_y = self.y + self.height - door_height
+            # Alternate between light and dark green
+            color = grass_color if random.random() > 0.3 else dark_grass_color
             
-            pygame.draw.rect(screen, (101, 67, 33), (door_x, door_y, door_width, door_height))
-            pygame.draw.rect(screen, BLACK, (door_x, door_y, door_width, door_height), 1)
+            # Draw a slightly curved grass blade
+            curve = random.choice([-1, 1]) * random.random() * 2
             
-            # Door knob
-            pygame.draw.circle(screen, YELLOW, (door_x + door_width - 3, door_y + door_height//2), 2)
-        
-        else:
-            pygame.draw.rect(screen, self.color, (self.x, self.y, self.width, self.height))
-    
-    def is_off_screen(self):
-        return self.x < -self.width
+            # Draw a curved blade using multiple short lines
+            blade_x = x
+            for h in range(height):
+                pygame.draw.line(strip, color, 
+                               (blade_x, ground_y - h),
+                               (blade_x + curve, ground_y - h - 1), 2)
+                blade_x += curve * 0.5
+                
+    # Add some small flowers occasionally
+    for x in range(0, SCREEN_WIDTH, 30):
+        if random.random() < 0.15:  # 15% chance for a flower
+            flower_y = ground_y - 6
+            flower_color = random.choice([(255, 255, 0), (255, 192, 203), (255, 255, 255)])  # Yellow, pink, or white
+            pygame.draw.circle(strip, flower_color, (x, flower_y), 2)
+            # Draw small petals
+            for angle in range(0, 360, 90):
+                petal_x = x + 2 * pygame.math.Vector2(1, 0).rotate(angle).x
+                petal_y = flower_y + 2 * pygame.math.Vector2(1, 0).rotate(angle).y
+                pygame.draw.circle(strip, flower_color, (int(petal_x), int(petal_y)), 1)
+    return surface_format.for_display(strip)
+
+def get_cloud_sprite(width, height):
+    key = (width, height)
+    sprite = cloud_sprites.get(key)
+    if sprite is None:
+        sprite = surface_format.for_display(render_cloud(width, height))
+        cloud_sprites[key] = sprite
+    return sprite
+
+# Every cacheable sprite, as (atlas key, cache, cache key, render)
+def sprite_cache_entries():
+    for type_id, kind in enumerate(OBSTACLE_TYPES):
+        if kind.sprite_cached:
+            for frame in range(kind.frames):
+                yield (f"obstacle/{type_id}/{frame}", obstacle_sprites, (type_id, frame),
+                       lambda type_id=type_id, frame=frame: get_obstacle_sprite(type_id, frame))
+    for size in range(3, 7):
+        for step in range(360 // PETAL_ROTATION_STEP):
+            yield (f"petal/{size}/{step}", petal_sprites, (size, step),
+                   lambda size=size, step=step: render_petal(size, step * PETAL_ROTATION_STEP))
+    for layer in range(len(MOUNTAIN_COLORS)):
+        yield (f"mountain/{layer}", mountain_templates, layer,
+               lambda layer=layer: render_mountain(layer, 400 + layer * 50, 150 + layer * 30))
+    for width in range(60, 121, CLOUD_WIDTH_STEP):
+        for height in range(30, 51, CLOUD_HEIGHT_STEP):
+            yield (f"cloud/{width}/{height}", cloud_sprites, (width, height),
+                   lambda width=width, height=height: render_cloud(width, height))
+
+def sprite_cache_sources():
+    # The functions whose code draws cached sprites
+    return OBSTACLE_RENDERERS + [get_bee_wings, render_petal, render_mountain, render_cloud,
+                                 get_obstacle_sprite, get_mountain_sprite, sprite_cache_entries]
+
+@functools.cache
+def function_source(function):
+    return inspect.getsource(function)
+
+@functools.cache
+def sprite_cache_version():
+    # Changes whenever the code or parameters that draw cached sprites change.
+    # Reading the sources takes a while, so it is worked out once
+    sources = [function_source(f) for f in sprite_cache_sources()]
+    parameters = [(kind.name, kind.width, kind.height, kind.color, kind.frames, kind.sprite_cached)
+                  for kind in OBSTACLE_TYPES]
+    parameters += [SPRITE_PADDING, PETAL_ROTATION_STEP, CLOUD_WIDTH_STEP, CLOUD_HEIGHT_STEP,
+                   CLOUD_PADDING, MOUNTAIN_COLORS, CHERRY_BLOSSOM, CLOUD_WHITE, pygame.version.ver]
+    digest = hashlib.sha256("\n".join(sources + [repr(parameters)]).encode())
+    return digest.hexdigest()[:16]
+
+def load_sprite_caches(directory=None):
+    # Fill every sprite cache from the on-disk atlas, rebuilding the atlas if
+    # it is missing or stale. Returns True if it was loaded from disk
+    loader = SpriteCacheLoader(directory)
+    frame_budget.Prewarmer(loader.tasks()).finish()
+    return loader.loaded
+
+class SpriteCacheLoader:
+    # load_sprite_caches() split into steps that each fit in a start screen
+    # frame: read the atlas, fill the caches one sprite at a time (drawing the
+    # ones the atlas doesn't have), then save a new atlas if any were drawn.
+    # Decoding and encoding the atlas PNG take tens of milliseconds, but don't
+    # hold the GIL, so they happen on threads
+    def __init__(self, directory=None):
+        self.directory = directory or SPRITE_CACHE_DIR
+        self.atlas = {}  # key: sprite read from disk
+        self.drawn = {}  # key: sprite drawn because the atlas was missing or stale
+        self.reader = None
+    
+    @property
+    def loaded(self):
+        return bool(self.atlas) and not self.drawn
+    
+    def tasks(self):
+        # (name, task) pairs, for frame_budget.Prewarmer
+        tasks = [("sprite atlas", self.read), ("sprite atlas wait", self.wait)]
+        for key, cache, cache_key, render in sprite_cache_entries():
+            tasks.append((key, functools.partial(self.fill, key, cache, cache_key, render)))
+        tasks.append(("sprite atlas save", self.save))
+        return tasks
+    
+    def read(self):
+        if self.directory is not None:
+            self.reader = threading.Thread(target=self.read_atlas, daemon=True)
+            self.reader.start()
+    
+    def read_atlas(self):
+        self.atlas = sprite_atlas.load(self.directory, 'sprites', sprite_cache_version(), convert=False) or {}
+    
+    def wait(self):
+        if self.reader is not None and self.reader.is_alive():
+            return frame_budget.WAIT
+    
+    def fill(self, key, cache, cache_key, render):
+        sprite = self.atlas.get(key)
+        if sprite is None:
+            sprite = self.drawn[key] = render()
+        cache[cache_key] = surface_format.for_display(sprite)
+    
+    def save(self):
+        if self.directory is not None and self.drawn:
+            threading.Thread(target=self.save_atlas, args=({**self.atlas, **self.drawn},)).start()
+    
+    def save_atlas(self, sprites):
+        try:
+            sprite_atlas.save(self.directory, 'sprites', sprite_cache_version(), sprites)
+        except (OSError, pygame.error):
+            pass  # A read-only cache directory just means drawing them again next launch
+
+
+# Background chunk generation. Scenery that is regenerated while the game runs
+# (the next mountain of each layer, the next cloud, each frame's grass) is built
+# ahead of need on a worker thread and handed over through small buffers, so
+# the render thread only swaps a finished chunk in. If the worker has fallen
+# behind, the chunk is built on the render thread instead and counted
+class ChunkSlot:
+    def __init__(self, name, build, depth=CHUNK_BUFFER_DEPTH):
+        self.name = name
+        self.build = build
+        self.ready = queue.Queue(depth)
+        self.worker = None
+        self.fallbacks = 0  # Chunks the render thread had to build itself
+    
+    def take(self):
+        try:
+            chunk = self.ready.get_nowait()
+        except queue.Empty:
+            if self.worker is not None:
+                self.fallbacks += 1
+            return self.build()
+        self.worker.wakeup.set()
+        return chunk
+
+class ChunkWorker:
+    def __init__(self, slots):
+        self.slots = slots
+        self.wakeup = threading.Event()
+        for slot in slots:
+            slot.worker = self
+        self.thread = threading.Thread(target=self._run, name='chunk-worker', daemon=True)
+        self.thread.start()
+    
+    @property
+    def fallbacks(self):
+        return sum(slot.fallbacks for slot in self.slots)
+    
+    def _run(self):
+        while True:
+            # Top up every slot, then sleep until the render thread takes a chunk
+            idle = True
+            for slot in self.slots:
+                if not slot.ready.full():
+                    slot.ready.put(slot.build())
+                    idle = False
+            if idle:
+                self.wakeup.wait()
+                self.wakeup.clear()
+
+def build_mountain_chunk(layer):
+    height = random.randint(80, 150) + (layer * 30)
+    width = random.randint(200, 400) + (layer * 50)
+    return width, height, get_mountain_sprite(layer, width, height)
+
+def build_cloud_chunk():
+    width = round(random.randint(60, 120) / CLOUD_WIDTH_STEP) * CLOUD_WIDTH_STEP
+    height = round(random.randint(30, 50) / CLOUD_HEIGHT_STEP) * CLOUD_HEIGHT_STEP
+    return width, height, get_cloud_sprite(width, height)
+
+# Mountain and cloud slots hold enough chunks to set up a whole new scene
+mountain_chunks = [ChunkSlot(f"mountain {layer}", lambda layer=layer: build_mountain_chunk(layer),
+                             MOUNTAINS_PER_LAYER)
+                   for layer in range(len(MOUNTAIN_COLORS))]
+cloud_chunks = ChunkSlot("cloud", build_cloud_chunk, SCENE_CLOUDS)
+grass_chunks = ChunkSlot("grass", render_grass_strip)
+
+# Started by main(); without it every chunk is built when it is needed
+chunk_worker = None
+
+def start_chunk_worker():
+    global chunk_worker
+    if chunk_worker is None:
+        chunk_worker = ChunkWorker(mountain_chunks + [cloud_chunks, grass_chunks])
+    return chunk_worker
+
 def draw_background(game_speed):
     # Draw sky gradient
     sky_rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT - GROUND_HEIGHT)
@@ -552,11 +1035,14 @@ def draw_background(game_speed):
     # Draw cherry blossoms
     for blossom in cherry_blossoms:
         blossom.update()
-        blossom.draw(screen)
+    draw_blossoms(cherry_blossoms, screen)
 
 def draw_ground():
     # Draw the ground, but with gaps for holes
-    holes = [obstacle for obstacle in obstacles if hasattr(obstacle, 'is_hole') and obstacle.is_hole]
+    holes = [obstacle for obstacle in obstacles if obstacle.is_hole]
+    
+    # Grass is re-randomised every frame; the strips come pre-drawn from the chunk worker
+    grass = grass_chunks.take()
     
     # Draw ground in segments, skipping the holes
     current_x = 0
@@ -566,7 +1052,7 @@ def draw_ground():
             draw_ground_segment(current_x, hole.x)
             
             # Add grass on top of this ground segment
-            draw_grass(current_x, hole.x)
+            draw_grass(current_x, hole.x, grass)
             
         # Skip the hole
         current_x = hole.x + hole.width
@@ -576,7 +1062,7 @@ def draw_ground():
         draw_ground_segment(current_x, SCREEN_WIDTH)
         
         # Add grass on top of this ground segment
-        draw_grass(current_x, SCREEN_WIDTH)
+        draw_grass(current_x, SCREEN_WIDTH, grass)
 
 def draw_ground_segment(start_x, end_x):
     # Draw a more realistic ground segment with texture
@@ -598,71 +1084,25 @@ def draw_ground_segment(start_x, end_x):
         if start_x <= x <= end_x:
             pygame.draw.circle(screen, color, (int(x), int(y)), size)
 
-def draw_grass(start_x, end_x):
-    # Draw more realistic grass on top of the ground
-    grass_color = (50, 205, 50)  # Bright green for grass
-    dark_grass_color = (34, 139, 34)  # Darker green for variation
-    
-    # Draw a base layer of grass (short blades)
-    for x in range(int(start_x), int(end_x), 4):
-        # Vary the height slightly for a more natural look
-        height_variation = random.randint(1, 4)
-        blade_height = height_variation
-        
-        # Alternate between light and dark green
-        color = grass_color if random.random() > 0.3 else dark_grass_color
-        
-        # Draw a simple grass blade (line)
-        pygame.draw.line(screen, color, 
-                       (x, SCREEN_HEIGHT - GROUND_HEIGHT),
-                       (x, SCREEN_HEIGHT - GROUND_HEIGHT - blade_height), 1)
-    
-    # Draw taller grass blades less frequently
-    for x in range(int(start_x), int(end_x), 10):
-        if random.random() < 0.7:  # 70% chance for tall grass
-            # Vary the height for a more natural look
-            height = random.randint(4, 8)
-            
-            # Alternate between light and dark green
-            color = grass_color if random.random() > 0.3 else dark_grass_color
-            
-            # Draw a slightly curved grass blade
-            curve = random.choice([-1, 1]) * random.random() * 2
-            
-            # Draw a curved blade using multiple short lines
-            blade_x = x
-            for h in range(height):
-                pygame.draw.line(screen, color, 
-                               (blade_x, SCREEN_HEIGHT - GROUND_HEIGHT - h),
-                               (blade_x + curve, SCREEN_HEIGHT - GROUND_HEIGHT - h - 1), 2)
-                blade_x += curve * 0.5
-                
-    # Add some small flowers occasionally
-    for x in range(int(start_x), int(end_x), 30):
-        if random.random() < 0.15:  # 15% chance for a flower
-            flower_y = SCREEN_HEIGHT - GROUND_HEIGHT - 6
-            flower_color = random.choice([(255, 255, 0), (255, 192, 203), (255, 255, 255)])  # Yellow, pink, or white
-            pygame.draw.circle(screen, flower_color, (x, flower_y), 2)
-            # Draw small petals
-            for angle in range(0, 360, 90):
-                petal_x = x + 2 * pygame.math.Vector2(1, 0).rotate(angle).x
-                petal_y = flower_y + 2 * pygame.math.Vector2(1, 0).rotate(angle).y
-                pygame.draw.circle(screen, flower_color, (int(petal_x), int(petal_y)), 1)
+def draw_grass(start_x, end_x, strip):
+    # Blit the part of a grass strip that lies over this ground segment
+    top = SCREEN_HEIGHT - GROUND_HEIGHT - GRASS_STRIP_HEIGHT + 2
+    area = pygame.Rect(int(start_x), 0, int(end_x) - int(start_x), GRASS_STRIP_HEIGHT)
+    screen.blit(strip, (area.x, top), area)
 
-def show_score(score):
+def show_score(score, label="Score"):
     # Create a semi-transparent score display
-    score_font = pygame.font.SysFont('Arial', 28)
-    speed_font = pygame.font.SysFont('Arial', 20)
+    score_font = get_font(28)
+    speed_font = get_font(20)
     
     # Render score with shadow
-    score_shadow = score_font.render(f"Score: {score}", True, (20, 20, 20))
-    score_text = score_font.render(f"Score: {score}", True, WHITE)
+    score_shadow = score_font.render(f"{label}: {score}", True, (20, 20, 20))
+    score_text = score_font.render(f"{label}: {score}", True, WHITE)
     
     # Create a small panel for the score
     panel_width = score_text.get_width() + 20
     panel_height = score_text.get_height() + 10
-    panel = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
-    panel.fill((0, 0, 0, 100))  # Very transparent black
+    panel = get_panel(panel_width, panel_height, (0, 0, 0, 100))  # Very transparent black
     
     # Add the panel and score
     screen.blit(panel, (SCREEN_WIDTH - panel_width - 10, 10))
@@ -671,29 +1111,19 @@ def show_score(score):
     
     return panel_height  # Return the height for positioning other UI elements
 
-def show_game_over(score):
-    # Create a semi-transparent panel for the game over UI
-    panel_width = 400
-    panel_height = 200
+def show_game_over(score, new_best=False):
+    # Semi-transparent black panel with a border for the game over UI
+    panel = get_panel(*UI_PANEL)
+    panel_width, panel_height = panel.get_size()
     panel_x = (SCREEN_WIDTH - panel_width) // 2
     panel_y = (SCREEN_HEIGHT - panel_height) // 2
     
-    panel = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
-    panel.fill((0, 0, 0, 150))  # Semi-transparent black
-    
-    # Create a border for the panel
-    border_width = 2
-    pygame.draw.rect(panel, (255, 255, 255, 100), (border_width, border_width, 
-                                                  panel_width - 2*border_width, 
-                                                  panel_height - 2*border_width), 
-                    border_width)
-    
     # Add the panel to the screen
     screen.blit(panel, (panel_x, panel_y))
     
     # Create fonts for the game over screen
-    title_font = pygame.font.SysFont('Arial', 48, bold=True)
-    regular_font = pygame.font.SysFont('Arial', 24)
+    title_font = get_font(48, bold=True)
+    regular_font = get_font(24)
     
     # Render text with a subtle shadow effect
     title_shadow = title_font.render("GAME OVER", True, (20, 20, 20))
@@ -710,6 +1140,19 @@ def show_game_over(score):
     score_y = panel_y + 110
     restart_y = panel_y + 150
     
+    # Best score from the score store's cache, when it has loaded
+    best = score_store.best if score_store is not None else None
+    if new_best or best is not None:
+        best_label = "New high score!" if new_best else f"Best: {best}"
+        best_font = get_font(20)
+        best_shadow = best_font.render(best_label, True, (20, 20, 20))
+        best_text = best_font.render(best_label, True, CHERRY_BLOSSOM)
+        score_y = panel_y + 98
+        best_y = panel_y + 126
+        restart_y = panel_y + 156
+        screen.blit(best_shadow, (SCREEN_WIDTH // 2 - best_shadow.get_width() // 2 + 1, best_y + 1))
+        screen.blit(best_text, (SCREEN_WIDTH // 2 - best_text.get_width() // 2, best_y))
+    
     # Draw text shadows (slightly offset)
     screen.blit(title_shadow, (SCREEN_WIDTH // 2 - title_shadow.get_width() // 2 + 2, title_y + 2))
     screen.blit(score_shadow, (SCREEN_WIDTH // 2 - score_shadow.get_width() // 2 + 1, score_y + 1))
@@ -719,27 +1162,40 @@ def show_game_over(score):
     screen.blit(title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, title_y))
     screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, score_y))
     screen.blit(restart_text, (SCREEN_WIDTH // 2 - restart_text.get_width() // 2, restart_y))
-def check_collision(player, obstacle):
-    # Special case for holes - player falls in if they're not jumping over it
-    if hasattr(obstacle, 'is_hole') and obstacle.is_hole:
-        # Check if player is above the hole (horizontally aligned)
-        if (player.x + player.radius > obstacle.x + 5 and 
-            player.x - player.radius < obstacle.x + obstacle.width - 5):  # Slightly reduced collision area
-            # Check if player is not jumping high enough
-            if player.y + player.radius >= obstacle.y:
-                player.falling = True  # Set falling state
-                return True
-        return False
-    
-    # Use circle collision for player
-    player_center = (player.x, player.y)
+def check_collision(player, obstacle, tick=0):
+    # Dispatch on the obstacle's collision shape. tick is the simulation
+    # tick, which picks the animation frame precise collision tests against
+    return COLLIDERS[obstacle.shape](player, obstacle, tick)
+
+def check_hole_collision(player, obstacle, tick=0):
+    # Player falls in if they're not jumping over it
+    # Check if player is above the hole (horizontally aligned)
+    if (player.x + player.radius > obstacle.x + 5 and 
+        player.x - player.radius < obstacle.x + obstacle.width - 5):  # Slightly reduced collision area
+        # Check if player is not jumping high enough
+        if player.y + player.radius >= obstacle.y:
+            player.falling = True  # Set falling state
+            return True
+    return False
+
+def check_rect_collision(player, obstacle, tick=0):
+    if PRECISE_COLLISION:
+        return check_precise_collision(player, obstacle, obstacle.animation_frame(tick))
     
     # Create rectangle for obstacle
     obstacle_rect = pygame.Rect(obstacle.x, obstacle.y, obstacle.width, obstacle.height)
+    return circle_hits_rect(player, obstacle_rect)
+
+# Collision tests, indexed by shape
+COLLIDERS = [check_rect_collision, check_hole_collision]
+
+def circle_hits_rect(player, rect):
+    # Use circle collision for player
+    player_center = (player.x, player.y)
     
     # Calculate closest point on rectangle to circle center
-    closest_x = max(obstacle_rect.left, min(player_center[0], obstacle_rect.right))
-    closest_y = max(obstacle_rect.top, min(player_center[1], obstacle_rect.bottom))
+    closest_x = max(rect.left, min(player_center[0], rect.right))
+    closest_y = max(rect.top, min(player_center[1], rect.bottom))
     
     # Calculate distance between closest point and circle center
     distance_x = player_center[0] - closest_x
@@ -749,16 +1205,481 @@ def check_collision(player, obstacle):
     # Collision if distance is less than circle radius
     return distance < player.radius
 
+# Mask caches for precise collision
+obstacle_masks = {}
+player_masks = {}
+
+def get_obstacle_mask(type_id, frame):
+    # Mask of the drawn pixels plus their bounding box, relative to the sprite
+    key = (type_id, frame)
+    entry = obstacle_masks.get(key)
+    if entry is None:
+        mask = pygame.mask.from_surface(get_obstacle_sprite(type_id, frame))
+        bounds = mask.get_bounding_rects()
+        entry = (mask, bounds[0].unionall(bounds[1:]) if bounds else pygame.Rect(0, 0, 0, 0))
+        obstacle_masks[key] = entry
+    return entry
+
+def get_player_mask(radius):
+    # Mask of the ball as Player.draw renders it at this radius
+    mask = player_masks.get(radius)
+    if mask is None:
+        surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surface, RED, (radius, radius), radius)
+        mask = pygame.mask.from_surface(surface)
+        player_masks[radius] = mask
+    return mask
+
+def check_precise_collision(player, obstacle, frame):
+    mask, bounds = get_obstacle_mask(obstacle.type_id, frame)
+    sprite_x = int(obstacle.x) - SPRITE_PADDING
+    sprite_y = int(obstacle.y) - SPRITE_PADDING
+    
+    # Broad phase: the cheap circle test against the drawn pixels' bounding box,
+    # so masks are only compared on near hits
+    if not circle_hits_rect(player, bounds.move(sprite_x, sprite_y)):
+        return False
+    
+    radius = int(player.radius)
+    offset = (int(player.x) - radius - sprite_x, int(player.y) - radius - sprite_y)
+    return mask.overlap(get_player_mask(radius), offset) is not None
+
+# Collision boxes for swept steps, by type id
+collision_boxes = {}
+
+def get_collision_box(obstacle):
+    # (left, top, width, height) relative to the obstacle's position that
+    # every collision with it lies within: its rectangle, or with precise
+    # collision the drawn pixels of all its animation frames
+    if not PRECISE_COLLISION:
+        return (0, 0, obstacle.width, obstacle.height)
+    box = collision_boxes.get(obstacle.type_id)
+    if box is None:
+        bounds = [get_obstacle_mask(obstacle.type_id, frame)[1]
+                  for frame in range(OBSTACLE_TYPES[obstacle.type_id].frames)]
+        union = bounds[0].unionall(bounds[1:]).move(-SPRITE_PADDING, -SPRITE_PADDING)
+        box = collision_boxes[obstacle.type_id] = (union.x, union.y, union.width, union.height)
+    return box
+
+def nearest_obstacle(player, obstacles):
+    # The closest obstacle the player has not yet passed
+    nearest = None
+    for obstacle in obstacles:
+        if obstacle.x + obstacle.width > player.x - player.radius:
+            if nearest is None or obstacle.x < nearest.x:
+                nearest = obstacle
+    return nearest
+
+def linear_interval(a, b, t0, t1, open0=False, open1=False, strict=True):
+    # Narrow the span from t0 to t1 to the part where a + b * t > 0 (>= 0 if
+    # not strict). open0 and open1 say whether each end is excluded: strict
+    # bounds exclude their root, and a span that shrinks to an excluded point
+    # is empty. Returns (t0, t1, open0, open1) or None
+    if b == 0:
+        if not (a > 0 if strict else a >= 0):
+            return None
+    else:
+        root = -a / b
+        if b > 0:
+            if root > t0:
+                t0, open0 = root, strict
+            elif root == t0:
+                open0 = open0 or strict
+        else:
+            if root < t1:
+                t1, open1 = root, strict
+            elif root == t1:
+                open1 = open1 or strict
+    if t0 > t1 or (t0 == t1 and (open0 or open1)):
+        return None
+    return (t0, t1, open0, open1)
+
+def segment_box_entry(x0, y0, dx, dy, left, top, right, bottom):
+    # Earliest t in [0, 1] at which the point (x0, y0) + t * (dx, dy) is inside the box
+    span = (0.0, 1.0, False, False)
+    for a, b in ((x0 - left, dx), (right - x0, -dx), (y0 - top, dy), (bottom - y0, -dy)):
+        span = linear_interval(a, b, *span)
+        if span is None:
+            return None
+    return span[0]
+
+def segment_disc_entry(x0, y0, dx, dy, cx, cy, radius):
+    # Earliest t in [0, 1] at which the moving point is closer than radius to (cx, cy)
+    fx = x0 - cx
+    fy = y0 - cy
+    c = fx * fx + fy * fy - radius * radius
+    if c < 0:
+        return 0.0
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    discriminant = b * b - 4 * a * c
+    # Grazing at exactly the radius isn't a hit (check_collision tests distance < radius),
+    # so allow for rounding when the path is tangent to the disc
+    if a == 0 or discriminant <= 4e-6 * a:
+        return None
+    t = (-b - math.sqrt(discriminant)) / (2 * a)
+    return t if 0 <= t <= 1 else None
+
+def swept_circle_rect(player_x, y0, y1, radius, left0, left1, top, width, height):
+    # First contact between a circle moving vertically from y0 to y1 and a
+    # rectangle sliding horizontally from left0 to left1 over the same interval.
+    # Works in the rectangle's frame, where the circle's centre moves in a
+    # straight line and touching means entering the rectangle grown by radius.
+    x0 = player_x - left0
+    dx = left0 - left1
+    dy = y1 - y0
+    bottom = top + height
+    hits = [
+        segment_box_entry(x0, y0, dx, dy, -radius, top, width + radius, bottom),
+        segment_box_entry(x0, y0, dx, dy, 0, top - radius, width, bottom + radius),
+    ]
+    for cx in (0, width):
+        for cy in (top, bottom):
+            hits.append(segment_disc_entry(x0, y0, dx, dy, cx, cy, radius))
+    hits = [t for t in hits if t is not None]
+    return min(hits) if hits else None
+
+def swept_hole(player_x, y0, y1, radius, left0, left1, hole):
+    # First moment over the interval at which check_collision's hole test
+    # (horizontally over the hole and not high enough to clear it) holds
+    span = (0.0, 1.0, False, False)
+    dx = left1 - left0
+    for a, b, strict in ((player_x + radius - left0 - 5, -dx, True),
+                         (left0 + hole.width - 5 - player_x + radius, dx, True),
+                         (y0 + radius - hole.y, y1 - y0, False)):
+        span = linear_interval(a, b, *span, strict=strict)
+        if span is None:
+            return None
+    return span[0]
+
+class GameState:
+    # Gameplay state of one run. game_loop steps it once per frame; headless
+    # rollouts can step it several ticks at a time (see step)
+    
+    # Player attributes that change during a run, in snapshot order
+    PLAYER_FIELDS = ('x', 'y', 'velocity', 'jump_power', 'is_jumping', 'is_ducking',
+                     'radius', 'rotation', 'falling')
+    
+    def __init__(self, seed=None):
+        # Gameplay draws from its own generator, so cosmetic effects that use
+        # the global random module can't change what happens in a run. It is
+        # reseeded from (seed, spawn number) at every spawn, which makes the
+        # whole RNG position a single counter
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.spawn_count = 0
+        self.rng = random.Random()
+        self.player = Player()
+        self.obstacles = []
+        self.score = 0
+        self.tick = 0  # Ticks of active play
+        self.game_speed = 5  # Starting speed
+        self.max_game_speed = MAX_GAME_SPEED  # Maximum speed cap
+        self.speed_step = SPEED_STEP
+        self.speed_step_score = SPEED_STEP_SCORE
+        self.obstacle_timer = float('-inf')  # Spawn the first obstacle straight away
+        self.obstacle_frequency = OBSTACLE_FREQUENCY  # milliseconds
+        self.obstacle_frequency_step = OBSTACLE_FREQUENCY_STEP
+        self.min_obstacle_frequency = MIN_OBSTACLE_FREQUENCY
+        self.spawn_weights = OBSTACLE_SPAWN_WEIGHTS  # Cumulative, by type id
+        self.game_over = False
+        self.hit_obstacle = None  # The obstacle that ended the run
+        self.telemetry = None  # Optional telemetry.TelemetryWriter
+        self.replay = None  # Optional replay.ReplayWriter
+    
+    # Difficulty settings configure() accepts besides spawn_weights; they stay
+    # fixed during a run, so snapshots leave them out
+    SETTINGS = ('max_game_speed', 'speed_step', 'speed_step_score', 'obstacle_frequency',
+                'obstacle_frequency_step', 'min_obstacle_frequency')
+    
+    def configure(self, spawn_weights=None, **settings):
+        # Override difficulty settings before the run starts. spawn_weights
+        # maps obstacle type names to relative weights; missing types get 0
+        for name, value in settings.items():
+            if name not in self.SETTINGS:
+                raise ValueError(f"unknown difficulty setting {name!r}")
+            setattr(self, name, value)
+        if spawn_weights is not None:
+            unknown = set(spawn_weights) - set(OBSTACLE_TYPE_IDS)
+            if unknown:
+                raise ValueError(f"unknown obstacle types {sorted(unknown)}")
+            self.spawn_weights = list(itertools.accumulate(spawn_weights.get(kind.name, 0)
+                                                           for kind in OBSTACLE_TYPES))
+            if self.spawn_weights[-1] <= 0:
+                raise ValueError("spawn weights must not all be zero")
+        return self
+    
+    def snapshot(self):
+        # Capture everything that affects gameplay as a flat tuple of plain
+        # values, cheap enough to take thousands of times per decision.
+        # Cosmetic state (petals, clouds, grass) is not included
+        player = self.player
+        obstacles = self.obstacles
+        hit = obstacles.index(self.hit_obstacle) if self.hit_obstacle in obstacles else -1
+        return (self.tick, self.score, self.game_speed, self.obstacle_timer,
+                self.obstacle_frequency, self.game_over, hit, self.seed, self.spawn_count,
+                tuple([getattr(player, field) for field in self.PLAYER_FIELDS]),
+                tuple([(obstacle.type_id, obstacle.x, obstacle.game_speed, obstacle.serial)
+                       for obstacle in obstacles]))
+    
+    def restore(self, snapshot):
+        # Return to a state captured by snapshot()
+        (self.tick, self.score, self.game_speed, self.obstacle_timer, self.obstacle_frequency,
+         self.game_over, hit, self.seed, self.spawn_count, player_values, obstacle_values) = snapshot
+        player = self.player
+        for field, value in zip(self.PLAYER_FIELDS, player_values):
+            setattr(player, field, value)
+        
+        # Rebuild the list in place so anything holding it (the global obstacles) stays in sync
+        obstacles = []
+        for type_id, x, game_speed, serial in obstacle_values:
+            obstacle = Obstacle(game_speed, type_id)
+            obstacle.x = x
+            obstacle.serial = serial
+            obstacles.append(obstacle)
+        self.obstacles[:] = obstacles
+        self.hit_obstacle = obstacles[hit] if hit >= 0 else None
+    
+    def time_ms(self, tick):
+        # Gameplay runs on simulated time so headless runs match live ones
+        return tick * 1000 / FPS
+    
+    def jump(self):
+        self.record_input(replay.ACTION_JUMP)
+        if self.player.jump():
+            self.record(telemetry.EVENT_JUMP)
+            return True
+        return False
+    
+    def duck(self):
+        self.record_input(replay.ACTION_DUCK)
+        if self.player.duck():
+            self.record(telemetry.EVENT_DUCK)
+            return True
+        return False
+    
+    def stop_duck(self):
+        self.record_input(replay.ACTION_STOP_DUCK)
+        self.player.stop_duck()
+    
+    def record_input(self, action):
+        # Inputs are applied before the tick's step, so they carry the tick they precede
+        if self.replay is not None:
+            self.replay.input(self.tick, action)
+    
+    def record(self, event, obstacle=None, cause=telemetry.CAUSE_NONE):
+        # Push a telemetry record; a no-op unless telemetry is enabled
+        if self.telemetry is None:
+            return
+        if obstacle is None:
+            obstacle = nearest_obstacle(self.player, self.obstacles)
+        if obstacle is None:
+            kind, obstacle_x = telemetry.KIND_NONE, 0.0
+        else:
+            kind, obstacle_x = obstacle.type_id, obstacle.x
+        self.telemetry.record(event, self.tick, self.score, self.game_speed, self.player.y,
+                              self.player.velocity, kind, cause, obstacle_x)
+    
+    def spawn_obstacle(self, tick):
+        self.rng.seed((self.seed << 32) | self.spawn_count)
+        weights = self.spawn_weights
+        type_id = bisect.bisect(weights, self.rng.random() * weights[-1])
+        obstacle = Obstacle(self.game_speed, type_id)
+        obstacle.serial = self.spawn_count
+        self.spawn_count += 1
+        self.obstacles.append(obstacle)
+        self.obstacle_timer = self.time_ms(tick)
+        self.record(telemetry.EVENT_SPAWN, obstacle)
+        # Gradually decrease obstacle frequency (increase difficulty)
+        self.obstacle_frequency = max(self.min_obstacle_frequency,
+                                      self.obstacle_frequency - self.obstacle_frequency_step)
+        return obstacle
+    
+    def add_score(self):
+        self.score += 1
+        # Increase game speed gradually based on score
+        # More frequent small increases for smoother acceleration
+        if self.score % self.speed_step_score == 0 and self.game_speed < self.max_game_speed:
+            self.game_speed += self.speed_step
+            # Also adjust player jump power to match increased speed
+            self.player.jump_power = min(-18, self.player.jump_power - 0.05)
+    
+    def end_run(self, obstacle):
+        if not self.game_over:
+            is_hole = obstacle.is_hole
+            self.record(telemetry.EVENT_DEATH, obstacle,
+                        telemetry.CAUSE_HOLE if is_hole else telemetry.CAUSE_IMPACT)
+            self.game_over = True
+            self.hit_obstacle = obstacle
+    
+    def step(self, ticks=1, swept=False):
+        # Advance the run, checking collisions at the end of every tick exactly
+        # like the original per-frame loop. swept=True sweeps player and
+        # obstacles over the whole interval instead, to find the few ticks
+        # that could hit without testing every one. The result is the same
+        # tick for tick, but the sweep only pays off from about 16 ticks per
+        # step (see step_bench.py)
+        if self.game_over:
+            return
+        if swept:
+            self.step_swept(ticks)
+        else:
+            for _ in range(ticks):
+                self.step_tick()
+                if self.game_over:
+                    break
+        if self.replay is not None:
+            self.replay.after_step(self)
+    
+    def step_tick(self):
+        self.tick += 1
+        
+        # Update player
+        self.player.update()
+        
+        # Generate obstacles
+        if self.time_ms(self.tick) - self.obstacle_timer > self.obstacle_frequency:
+            self.spawn_obstacle(self.tick)
+        
+        # Update obstacles
+        for obstacle in self.obstacles[:]:
+            obstacle.update()
+            
+            # Remove off-screen obstacles
+            if obstacle.is_off_screen():
+                self.obstacles.remove(obstacle)
+            
+            # Check for collision
+            if check_collision(self.player, obstacle, self.tick):
+                self.end_run(obstacle)
+        
+        self.add_score()
+    
+    def step_swept(self, ticks):
+        player = self.player
+        start = self.snapshot()
+        start_tick = self.tick
+        
+        # Run the per-tick bookkeeping without collision tests, sampling the
+        # player's path and every obstacle's positions (from the tick before
+        # its first move). Telemetry is held back until the step is known to
+        # have hit nothing
+        writer = self.telemetry
+        if writer is not None:
+            self.telemetry = held = HeldRecords()
+        tracks = [(obstacle, 0, [obstacle.x]) for obstacle in self.obstacles]
+        positions = {id(obstacle): xs for obstacle, _, xs in tracks}
+        path = [player.y]
+        for k in range(1, ticks + 1):
+            self.tick += 1
+            player.update()
+            path.append(player.y)
+            if self.time_ms(self.tick) - self.obstacle_timer > self.obstacle_frequency:
+                obstacle = self.spawn_obstacle(self.tick)
+                tracks.append((obstacle, k - 1, [obstacle.x]))
+                positions[id(obstacle)] = tracks[-1][2]
+            for obstacle in self.obstacles[:]:
+                obstacle.update()
+                positions[id(obstacle)].append(obstacle.x)
+                if obstacle.is_off_screen():
+                    self.obstacles.remove(obstacle)
+            self.add_score()
+        self.telemetry = writer
+        
+        # Collapse ticks where the player doesn't change speed into single segments
+        segments = []
+        k0 = 0
+        for k in range(1, ticks + 1):
+            if k == ticks or path[k + 1] - path[k] != path[k] - path[k - 1]:
+                segments.append((k0, k))
+                k0 = k
+        
+        # The earliest tick at which any obstacle hits
+        hit_tick = None
+        for obstacle, first, xs in tracks:
+            hit_tick = self.first_hit(obstacle, first, xs, path, segments, start_tick, hit_tick)
+        player.y = path[-1]
+        
+        if hit_tick is None:
+            if writer is not None:
+                for fields in held.records:
+                    writer.record(*fields)
+            return
+        
+        # The run ended part way through: replay the ticks up to the hit one
+        # by one, which leaves exactly the state (and telemetry) of per-tick play
+        self.restore(start)
+        for _ in range(hit_tick):
+            self.step_tick()
+    
+    def first_hit(self, obstacle, first, xs, path, segments, start_tick, limit):
+        # The first tick of the step before limit (if any) at which the
+        # obstacle collides, or limit. xs are its positions from tick first
+        # on, path the player's height at every tick. The sweep is
+        # widened by SWEEP_SLACK, and candidate ticks from where it enters on
+        # get the same collision test as per-tick play
+        player = self.player
+        last = first + len(xs) - 1
+        radius = player.radius
+        left, top, width, height = get_collision_box(obstacle)
+        hit = limit
+        for k0, k1 in segments:
+            k0 = max(k0, first)
+            k1 = min(k1, last)
+            if hit is not None and k0 + 1 >= hit:
+                break
+            if k1 <= k0:
+                continue
+            left0 = xs[k0 - first]
+            left1 = xs[k1 - first]
+            if obstacle.is_hole:
+                t = swept_hole(player.x, path[k0], path[k1], radius + SWEEP_SLACK, left0, left1, obstacle)
+            else:
+                t = swept_circle_rect(player.x, path[k0], path[k1], radius + SWEEP_SLACK,
+                                      left0 + left, left1 + left, obstacle.y + top, width, height)
+            if t is None:
+                continue
+            for k in range(max(k0 + 1, k0 + math.floor(t * (k1 - k0))), k1 + 1):
+                if hit is not None and k >= hit:
+                    break
+                player.y = path[k]
+                obstacle.x = xs[k - first]
+                if check_collision(player, obstacle, start_tick + k):
+                    hit = k
+                    break
+        obstacle.x = xs[-1]
+        return hit
+
+
+class HeldRecords:
+    # Stands in for a TelemetryWriter, keeping records to pass on later
+    def __init__(self):
+        self.records = []
+    
+    def record(self, *fields):
+        self.records.append(fields)
+
 def game_loop():
-    player = Player()
+    # A ghost race is run on the ghosts' seed. Ghosts that finish loading in
+    # the background during a run join the next one
+    ghosts = ghost_race
+    state = GameState(ghosts.seed if ghosts is not None else None)
+    player = state.player
     global obstacles, mountains, cherry_blossoms
-    obstacles = []
-    score = 0
-    game_speed = 5  # Starting speed
-    max_game_speed = 15  # Maximum speed cap
-    obstacle_timer = 0
-    obstacle_frequency = 1500  # milliseconds
-    game_over = False
+    obstacles = state.obstacles
+    
+    if game_telemetry is not None:
+        state.telemetry = game_telemetry
+        game_telemetry.start_run()
+    if replay_recorder is not None:
+        replay_recorder.start_run(state)
+    if ghosts is not None:
+        ghosts.start_run()
+    if gc_controller is not None:
+        gc_controller.play_started()
+    if allocation_meter is not None:
+        allocation_meter.skip()
+    
+    new_best = False
     
     # Create initial clouds
     clouds = [Cloud() for _ in range(4)]
@@ -771,7 +1692,7 @@ def game_loop():
             mountains.append(Mountain(layer))
     
     # Create cherry blossoms
-    cherry_blossoms = [CherryBlossom() for _ in range(30)]
+    cherry_blossoms = [CherryBlossom() for _ in range(CHERRY_BLOSSOM_COUNT)]
     
     # Generate random grass positions for static grass
     grass_positions = [(x, random.randint(-2, 3)) for x in range(0, SCREEN_WIDTH, 10)]
@@ -795,23 +1716,23 @@ def game_loop():
             
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    if game_over:
+                    if state.game_over:
                         # Restart game
                         return
                     else:
-                        player.jump()
+                        state.jump()
                 elif event.key == pygame.K_DOWN:
-                    player.duck()
+                    state.duck()
             
             if event.type == pygame.KEYUP:
                 if event.key == pygame.K_DOWN:
-                    player.stop_duck()
+                    state.stop_duck()
         
         # Fill background with sky color
         screen.fill(BLUE)
         
         # Draw background elements (mountains, clouds, cherry blossoms)
-        draw_background(game_speed)
+        draw_background(state.game_speed)
         
         # Update and draw clouds
         for cloud in clouds[:]:
@@ -831,58 +1752,48 @@ def game_loop():
         # Draw ground
         draw_ground()
         
-        if not game_over:
-            # Update player
-            player.update()
-            
-            # Generate obstacles
-            current_time = pygame.time.get_ticks()
-            if current_time - obstacle_timer > obstacle_frequency:
-                obstacles.append(Obstacle(game_speed))
-                obstacle_timer = current_time
-                # Gradually decrease obstacle frequency (increase difficulty)
-                obstacle_frequency = max(1000, obstacle_frequency - 10)
+        if not state.game_over:
+            if gc_controller is not None:
+                gc_controller.play_frame()
+            
+            # Update player, obstacles and score; ghosts take the tick's
+            # inputs first, like the live player
+            if ghosts is not None:
+                ghosts.step(player.jump_power)
+            state.step()
+            
+            # Hand the finished run to the score store; it is saved in the
+            # background
+            if state.game_over and score_store is not None:
+                cause = state.hit_obstacle.type if state.hit_obstacle is not None else None
+                new_best = score_store.record_run(state.score, state.tick, state.seed, cause)
+            
+            # Draw obstacles, in the animation frame collision tested
+            for obstacle in obstacles:
+                obstacle.draw(screen, obstacle.animation_frame(state.tick))
             
-            # Update and draw obstacles
-            for obstacle in obstacles[:]:
-                obstacle.update()
-                obstacle.draw(screen)
-                
-                # Remove off-screen obstacles
-                if obstacle.is_off_screen():
-                    obstacles.remove(obstacle)
-                
-                # Check for collision
-                if check_collision(player, obstacle):
-                    game_over = True
-                    # If player fell in a hole, animate falling
-                    if hasattr(obstacle, 'is_hole') and obstacle.is_hole:
-                        fall_animation(player, obstacle)
+            # If player fell in a hole, animate falling
+            hole = state.hit_obstacle
+            if hole is not None and hole.is_hole:
+                fall_animation(player, hole, state.tick)
             
-            # Draw player
+            # Draw ghosts, then the player over them
+            if ghosts is not None:
+                ghosts.draw(screen, player)
             player.draw(screen)
             
-        # Update score
-            score += 1
-            score_panel_height = show_score(score)
-            
-            # Increase game speed gradually based on score
-            # More frequent small increases for smoother acceleration
-            if score % 200 == 0 and game_speed < max_game_speed:
-                game_speed += 0.1
-                # Also adjust player jump power to match increased speed
-                player.jump_power = min(-18, player.jump_power - 0.05)
+            score_panel_height = show_score(state.score)
+            game_speed = state.game_speed
                 
             # Display current speed (optional)
-            speed_font = pygame.font.SysFont('Arial', 20)
+            speed_font = get_font(20)
             speed_shadow = speed_font.render(f"Speed: {game_speed:.1f}", True, (20, 20, 20))
             speed_text = speed_font.render(f"Speed: {game_speed:.1f}", True, WHITE)
             
             # Create a small panel for the speed
             panel_width = speed_text.get_width() + 20
             panel_height = speed_text.get_height() + 10
-            panel = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
-            panel.fill((0, 0, 0, 100))  # Very transparent black
+            panel = get_panel(panel_width, panel_height, (0, 0, 0, 100))  # Very transparent black
             
             # Add the panel and speed
             screen.blit(panel, (10, 10))
@@ -913,14 +1824,25 @@ def game_loop():
         else:
             # Draw player and obstacles in their last positions
             for obstacle in obstacles:
-                obstacle.draw(screen)
+                obstacle.draw(screen, obstacle.animation_frame(state.tick))
             
             # Show game over screen
-            show_game_over(score)
+            show_game_over(state.score, new_best)
+            
+            # Nothing is moving, so this is when garbage gets collected
+            if gc_controller is not None:
+                gc_controller.idle_frame()
+        
+        if spectator_server is not None:
+            spectator_server.publish(state)
+        if frame_export is not None:
+            frame_export.publish(screen, state.tick)
+        if allocation_meter is not None:
+            allocation_meter.frame()
         
         pygame.display.update()
         clock.tick(FPS)
-def fall_animation(player, hole):
+def fall_animation(player, hole, tick):
     # Animate player falling into the hole with realistic physics
     gravity = 0.5  # Gravity acceleration for falling
     fall_velocity = 0  # Initial fall velocity
@@ -965,13 +1887,13 @@ def fall_animation(player, hole):
         # Draw cherry blossoms
         for blossom in current_blossoms:
             blossom.update()
-            blossom.draw(screen)
+        draw_blossoms(current_blossoms, screen)
         
         draw_ground()
         
-        # Draw all obstacles
+        # Draw all obstacles, held in the frame the run ended on
         for obstacle in obstacles:
-            obstacle.draw(screen)
+            obstacle.draw(screen, obstacle.animation_frame(tick))
         
         # Update fall velocity with gravity (accelerating)
         fall_velocity = min(fall_velocity + gravity, max_fall_velocity)
@@ -993,15 +1915,43 @@ def fall_animation(player, hole):
         
         # Draw player
         player.draw(screen)
+        if allocation_meter is not None:
+            allocation_meter.frame()
         
         # Update display
         pygame.display.update()
         clock.tick(FPS)
-        
-        # Add a small delay to make the animation more visible
-        pygame.time.delay(10)
+
+def prewarm_tasks():
+    # Everything the first frames of play would otherwise create, as
+    # (name, task) for frame_budget.Prewarmer
+    tasks = [(f"source of {f.__name__}", functools.partial(function_source, f)) for f in sprite_cache_sources()]
+    tasks.append(("sprite version", sprite_cache_version))
+    tasks += SpriteCacheLoader().tasks()
+    if PETAL_MODE == PETAL_RASTER or (PETAL_MODE == PETAL_AUTO and CHERRY_BLOSSOM_COUNT >= PETAL_RASTER_THRESHOLD):
+        tasks.append(("petal stamps", get_petal_rasterizer))
+    for size, bold in UI_FONTS:
+        tasks.append((f"font {size}", lambda size=size, bold=bold: get_font(size, bold).render("0", True, WHITE)))
+    tasks.append(("panels", lambda: get_panel(*UI_PANEL)))
+    if PRECISE_COLLISION:
+        for type_id, kind in enumerate(OBSTACLE_TYPES):
+            if kind.sprite_cached:
+                tasks.append((f"{kind.name} masks", lambda type_id=type_id, kind=kind:
+                              [get_obstacle_mask(type_id, frame) for frame in range(kind.frames)]))
+        player = Player()
+        tasks.append(("player masks", lambda: [get_player_mask(radius) for radius in
+                                               (player.normal_radius, player.duck_radius)]))
+    return tasks
 
 def main():
+    # Sprites, fonts and masks are filled in while the start screen waits
+    # for SPACE, a few per frame, so the first frames of play don't stall
+    # creating them
+    prewarmer = frame_budget.Prewarmer(prewarm_tasks())
+    start_chunk_worker()
+    if score_store is not None:
+        score_store.open()  # Loads in the background; the best score shows up once it has
+    
     # Show start screen with aesthetic UI
     screen.fill(BLUE)
     
@@ -1023,8 +1973,7 @@ def main():
     
     # Create cherry blossoms for start screen
     start_blossoms = [CherryBlossom() for _ in range(20)]
-    for blossom in start_blossoms:
-        blossom.draw(screen)
+    draw_blossoms(start_blossoms, screen)
     
     # Need to initialize obstacles as empty for the first draw_ground call
     global obstacles, ground_patches
@@ -1041,28 +1990,18 @@ def main():
     
     draw_ground()
     
-    # Create a semi-transparent panel for the UI
-    panel_width = 400
-    panel_height = 200
+    # Semi-transparent black panel with a border for the UI
+    panel = get_panel(*UI_PANEL)
+    panel_width, panel_height = panel.get_size()
     panel_x = (SCREEN_WIDTH - panel_width) // 2
     panel_y = (SCREEN_HEIGHT - panel_height) // 2
     
-    panel = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
-    panel.fill((0, 0, 0, 150))  # Semi-transparent black
-    
-    # Create a border for the panel
-    border_width = 2
-    pygame.draw.rect(panel, (255, 255, 255, 100), (border_width, border_width, 
-                                                  panel_width - 2*border_width, 
-                                                  panel_height - 2*border_width), 
-                    border_width)
-    
     # Add the panel to the screen
     screen.blit(panel, (panel_x, panel_y))
     
     # Create a larger, more elegant font for the title
-    title_font = pygame.font.SysFont('Arial', 48, bold=True)
-    regular_font = pygame.font.SysFont('Arial', 24)
+    title_font = get_font(48, bold=True)
+    regular_font = get_font(24)
     
     # Render text with a subtle shadow effect
     title_shadow = title_font.render("CHERRY RUNNER", True, (20, 20, 20))
@@ -1125,6 +2064,9 @@ def main():
             if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                 waiting = False
         
+        if waiting:
+            prewarmer.run(PREWARM_FRAME_BUDGET)
+        
         # Every 100ms, update the animation
         if elapsed_time % 100 < 20:
             # Update cherry blossoms
@@ -1143,8 +2085,7 @@ def main():
                 cloud.draw(screen)
             
             # Draw cherry blossoms
-            for blossom in start_blossoms:
-                blossom.draw(screen)
+            draw_blossoms(start_blossoms, screen)
             
             draw_ground()
             
@@ -1161,6 +2102,14 @@ def main():
             screen.blit(start_text, (SCREEN_WIDTH // 2 - start_text.get_width() // 2, start_y))
             screen.blit(controls_text, (SCREEN_WIDTH // 2 - controls_text.get_width() // 2, controls_y))
             
+            if score_store is not None and score_store.best is not None:
+                show_score(score_store.best, "Best")
+            
+            # Prewarm progress along the bottom of the panel
+            if not prewarmer.finished:
+                pygame.draw.rect(screen, CHERRY_BLOSSOM, (panel_x + 10, panel_y + panel_height - 12,
+                                                          int((panel_width - 20) * prewarmer.progress), 3))
+            
             # Update ball position for a subtle bounce effect
             bounce_offset = math.sin(elapsed_time * 0.005) * 5
             ball_y_pos = ball_y + bounce_offset
@@ -1184,9 +2133,110 @@ def main():
         
         clock.tick(FPS)
     
+    # Whatever wasn't ready yet is created now rather than during play
+    prewarmer.finish()
+    if PREWARM_STATS:
+        print(prewarmer.report())
+    if gc_controller is not None:
+        gc_controller.freeze()
+    
     # Start game loop
     while True:
         game_loop()
 
+def build_parser():
+    parser = argparse.ArgumentParser(description="Cherry Runner")
+    parser.add_argument('--telemetry', metavar='DIR',
+                        help="record gameplay telemetry to rotating binary logs in DIR")
+    parser.add_argument('--precise-collision', action='store_true',
+                        help="collide against the drawn obstacle pixels instead of their rectangles")
+    parser.add_argument('--spectator-port', type=int, metavar='PORT',
+                        help="stream live game state to spectators on localhost:PORT")
+    parser.add_argument('--spectator-socket', metavar='PATH',
+                        help="stream live game state to spectators on a Unix socket")
+    parser.add_argument('--sprite-cache', metavar='DIR', default=SPRITE_CACHE_DIR,
+                        help="directory for the generated sprite atlas (default: %(default)s)")
+    parser.add_argument('--no-sprite-cache', action='store_true',
+                        help="draw sprites at startup without reading or writing the atlas")
+    parser.add_argument('--framebuffer', nargs='?', const='cherry-runner-frames', metavar='NAME',
+                        help="mirror rendered frames into shared memory NAME for other processes")
+    parser.add_argument('--framebuffer-slots', type=int, default=4, metavar='N',
+                        help="frames kept in the shared-memory ring (default: %(default)s)")
+    parser.add_argument('--record-replay', metavar='DIR',
+                        help="save a seekable replay of every run to DIR")
+    parser.add_argument('--petals', type=int, default=CHERRY_BLOSSOM_COUNT, metavar='N',
+                        help="cherry blossom petals during play (default: %(default)s)")
+    parser.add_argument('--petal-mode', choices=[PETAL_AUTO, PETAL_BLIT, PETAL_RASTER], default=PETAL_MODE,
+                        help="blit petals one by one, or composite them in one NumPy pass "
+                             f"(auto: raster from {PETAL_RASTER_THRESHOLD} petals up)")
+    parser.add_argument('--scores', metavar='PATH', default=SCORES_PATH,
+                        help="SQLite database for high scores and run history (default: %(default)s)")
+    parser.add_argument('--no-scores', action='store_true',
+                        help="don't load or save high scores")
+    parser.add_argument('--ghosts', nargs='+', metavar='REPLAY',
+                        help="race against recorded runs (replay files or directories of them)")
+    parser.add_argument('--pacing', choices=pacing.STRATEGIES, default=pacing.SLEEP,
+                        help="how to wait for the next frame: sleep (default), busy (spin), "
+                             "or hybrid (sleep, then spin for the last --spin-window)")
+    parser.add_argument('--spin-window', type=float, default=pacing.DEFAULT_SPIN_WINDOW * 1000, metavar='MS',
+                        help="milliseconds hybrid pacing spins before each frame (default: %(default)s)")
+    parser.add_argument('--pacing-stats', action='store_true',
+                        help="print frame interval statistics and a histogram at exit")
+    parser.add_argument('--prewarm-stats', action='store_true',
+                        help="print whether the start screen had filled every cache when play started")
+    parser.add_argument('--gc-control', action='store_true',
+                        help="no automatic garbage collection during play; collect on idle frames instead")
+    parser.add_argument('--alloc-budget', type=int, metavar='BYTES',
+                        help="measure memory allocated per frame and report frames over BYTES at exit")
+    parser.add_argument('--blit-audit', action='store_true',
+                        help="count screen blits by pixel format pair and report slow-path call sites at exit")
+    return parser
+
+def setup(args):
+    # Turn on the optional features asked for on the command line
+    global game_telemetry, PRECISE_COLLISION, SPRITE_CACHE_DIR, CHERRY_BLOSSOM_COUNT, PETAL_MODE, PREWARM_STATS
+    global spectator_server, replay_recorder, score_store, ghost_race, clock
+    global gc_controller, allocation_meter, frame_export, screen
+    if args.blit_audit:
+        # First, so everything that draws to the screen gets the back buffer
+        blit_audit = surface_format.BlitAudit()
+        screen = blit_audit.back_buffer(screen)
+        atexit.register(lambda: print(blit_audit.report()))
+    if args.telemetry:
+        game_telemetry = telemetry.TelemetryWriter(args.telemetry)
+    PRECISE_COLLISION = args.precise_collision
+    SPRITE_CACHE_DIR = None if args.no_sprite_cache else args.sprite_cache
+    CHERRY_BLOSSOM_COUNT = args.petals
+    PETAL_MODE = args.petal_mode
+    PREWARM_STATS = args.prewarm_stats
+    if args.spectator_port is not None or args.spectator_socket:
+        spectator_server = spectator.SpectatorServer(port=args.spectator_port,
+                                                     unix_path=args.spectator_socket).start()
+    if args.record_replay:
+        replay_recorder = replay.ReplayRecorder(
+            args.record_replay, replay.FLAG_PRECISE_COLLISION if PRECISE_COLLISION else 0)
+    if not args.no_scores:
+        score_store = scores.ScoreStore(args.scores)
+    if args.ghosts:
+        import ghosts  # Needs numpy, so only imported when asked for
+        ghost_race = ghosts.GhostRace.load(args.ghosts, Player())
+        if ghost_race is None:
+            print("No ghost replays found")
+        else:
+            print(f"Racing {ghost_race.count} ghosts on seed {ghost_race.seed}")
+    clock = pacing.FramePacer(args.pacing, args.spin_window / 1000)
+    if args.pacing_stats:
+        atexit.register(lambda pacer=clock: print(pacer.report()))
+    if args.gc_control:
+        gc_controller = frame_budget.GCController()
+    if args.alloc_budget is not None:
+        allocation_meter = frame_budget.AllocationMeter(args.alloc_budget)
+        atexit.register(lambda: print(allocation_meter.report()))
+    if args.framebuffer:
+        import framebuffer  # Needs numpy, so only imported when asked for
+        frame_export = framebuffer.FramebufferWriter(screen, args.framebuffer_slots, args.framebuffer)
+        atexit.register(frame_export.close)  # Unlinks the shared memory too
+
 if __name__ == "__main__":
+    setup(build_parser().parse_args())
     main()
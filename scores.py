@@ -0,0 +1,168 @@
+import atexit
+import collections
+import os
+import sqlite3
+import threading
+import time
+
+# High scores and run history in a local SQLite database
+#
+# The game never touches the database itself. A background thread opens it
+# (lazily, the first time the store is used), loads the best scores and the
+# most recent runs into an in-memory cache, and from then on commits finished
+# runs in batches. The game records runs and reads the cache, neither of which
+# waits on the disk.
+#
+# The database is in WAL mode, so a commit is one sequential append to the
+# log, and other programs can read it while the game is running.
+
+TOP_SCORES = 10
+HISTORY = 50  # Recent runs kept in the cache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,  -- Unix time
+    score INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    seed INTEGER NOT NULL,
+    cause TEXT               -- Obstacle type that ended the run
+);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC);
+CREATE INDEX IF NOT EXISTS runs_finished ON runs (finished DESC);
+"""
+
+Run = collections.namedtuple('Run', 'finished score ticks seed cause')
+
+
+class ScoreStore:
+    def __init__(self, path, top=TOP_SCORES, history=HISTORY, batch_size=32, flush_interval=1.0):
+        self.path = path
+        self.top = top
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # Cache, shared with the writer thread while it loads
+        self.lock = threading.Lock()
+        self.high_scores = []  # Best first
+        self.history = collections.deque(maxlen=history)  # Most recent last
+        self.loaded = False
+
+        # Same as telemetry: the game appends, the writer pops
+        self.pending = collections.deque()
+        self.written = 0
+        self.error = None
+
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.stopping = False
+
+    def open(self):
+        # Start loading in the background; returns straight away
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='score-writer', daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+        return self
+
+    @property
+    def best(self):
+        # Best score on record, None until the cache is loaded
+        with self.lock:
+            if not self.loaded or not self.high_scores:
+                return None
+            return self.high_scores[0].score
+
+    def record_run(self, score, ticks, seed, cause=None):
+        # Called at game over. Returns True for a new high score (only known
+        # once the cache is loaded)
+        run = Run(time.time(), score, ticks, seed, cause)
+        with self.lock:
+            new_best = self.loaded and (not self.high_scores or score > self.high_scores[0].score)
+            self._cache(run)
+        self.pending.append(run)
+        self.open()
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        return new_best
+
+    def close(self):
+        if self.thread is None or self.stopping:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join()
+        atexit.unregister(self.close)
+
+    def _cache(self, run):
+        self.history.append(run)
+        if len(self.high_scores) < self.top or run.score > self.high_scores[-1].score:
+            self.high_scores.append(run)
+            self.high_scores.sort(key=lambda cached: -cached.score)
+            del self.high_scores[self.top:]
+
+    def _run(self):
+        connection = None
+        try:
+            connection = self._connect()
+            self._load(connection)
+        except (sqlite3.Error, OSError) as error:
+            # Keep playing without persistence (no database, or no directory
+            # it can be created in); the cache still holds this session's runs
+            self.error = error
+            print(f"Score store {self.path} unavailable: {error}")
+            if connection is not None:
+                connection.close()
+            connection = None
+        with self.lock:
+            self.loaded = True
+
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self._commit(connection)
+            if self.stopping:
+                self._commit(connection)
+                if connection is not None:
+                    connection.close()
+                return
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _load(self, connection):
+        columns = "finished, score, ticks, seed, cause"
+        best = connection.execute(
+            f"SELECT {columns} FROM runs ORDER BY score DESC LIMIT ?", (self.top,)).fetchall()
+        recent = connection.execute(
+            f"SELECT {columns} FROM runs ORDER BY finished DESC LIMIT ?", (self.history.maxlen,)).fetchall()
+        with self.lock:
+            # Runs recorded while loading aren't in the database yet
+            session = list(self.history)
+            self.history.clear()
+            self.history.extend(Run(*row) for row in reversed(recent))
+            self.high_scores = [Run(*row) for row in best]
+            for run in session:
+                self._cache(run)
+
+    def _commit(self, connection):
+        batch = []
+        while self.pending:
+            batch.append(self.pending.popleft())
+        if not batch or connection is None:
+            return
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO runs (finished, score, ticks, seed, cause) VALUES (?, ?, ?, ?, ?)", batch)
+            self.written += len(batch)
+        except sqlite3.Error as error:
+            self.error = error
+            print(f"Could not save {len(batch)} runs to {self.path}: {error}")
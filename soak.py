@@ -0,0 +1,266 @@
+import argparse
+import collections
+import gc
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+# Long-run soak test: drives the real game (main, game_loop, restarts and all)
+# headlessly for millions of frames with a scripted input policy, samples
+# memory, object counts and frame times at intervals, and fails if anything
+# keeps growing.
+#
+# The game runs uncapped: the soak clock stands in for runner_game.clock and
+# never sleeps. Every frame ends in a clock tick, which is where inputs are
+# posted, frame times are taken and samples are recorded.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+import frame_budget  # noqa: E402
+import runner_game  # noqa: E402
+
+WARMUP_SAMPLES = 2  # Samples ignored while caches and pools fill up
+RSS_TOLERANCE = 8 * 1024 * 1024  # Bytes
+OBJECT_TOLERANCE = 200  # Objects of any one type, or 5% of its count if more
+SURFACE_TOLERANCE = 20
+FRAME_TIME_DRIFT = 1.5  # Allowed growth of the p95 frame time
+
+
+class SoakFinished(Exception):
+    pass
+
+
+class ScriptedPolicy:
+    # Random but seeded key presses: jumps, short ducks, and SPACE on the game
+    # over screen to restart
+    def __init__(self, seed=0, jump_chance=0.03, duck_chance=0.01, duck_frames=20):
+        self.rng = random.Random(seed)
+        self.jump_chance = jump_chance
+        self.duck_chance = duck_chance
+        self.duck_frames = duck_frames
+        self.duck_release = None
+
+    def post_inputs(self, frame):
+        roll = self.rng.random()
+        if roll < self.jump_chance:
+            post_key(pygame.KEYDOWN, pygame.K_SPACE)
+        elif roll < self.jump_chance + self.duck_chance and self.duck_release is None:
+            post_key(pygame.KEYDOWN, pygame.K_DOWN)
+            self.duck_release = frame + self.duck_frames
+        if self.duck_release == frame:
+            post_key(pygame.KEYUP, pygame.K_DOWN)
+            self.duck_release = None
+
+
+def post_key(event_type, key):
+    pygame.event.post(pygame.event.Event(event_type, key=key))
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Peak rather than current, but it still shows growth
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def count_objects():
+    # Live GC-tracked objects by type name, and surfaces. Surfaces aren't
+    # tracked by the garbage collector, and neither are dicts and tuples that
+    # only hold untracked values (an int-keyed cache of surfaces), nor frozen
+    # objects (--gc-control). So instead of gc.get_objects() alone, walk
+    # everything reachable from it, the modules and the threads' frames. Frozen
+    # objects only C code refers to (atexit handlers, weakref registries) are
+    # missed, but they are all from setup. The freeze state is left alone, so
+    # sampling doesn't change what it measures
+    counts = collections.Counter()
+    surfaces = 0
+    roots = gc.get_objects()
+    roots += [object] + list(sys.modules.values())
+    for frame in sys._current_frames().values():
+        # Locals of every running function, the game loop's included
+        while frame is not None:
+            roots.append(frame.f_locals)
+            frame = frame.f_back
+    seen = set()
+    pending = roots
+    while pending:
+        found = []
+        for obj in pending:
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, pygame.Surface):
+                surfaces += 1
+            elif gc.is_tracked(obj):
+                counts[type(obj).__name__] += 1
+            found.extend(gc.get_referents(obj))
+            if isinstance(obj, type):
+                # Built-in types don't report their dict or subclasses as referents
+                found.extend(gc.get_referents(obj.__dict__))
+                found.extend(type.__subclasses__(obj))
+        pending = found
+    del roots, pending
+    return counts, surfaces
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Sample:
+    def __init__(self, frame, runs, frame_times):
+        gc.collect()
+        self.frame = frame
+        self.runs = runs
+        self.rss = rss_bytes()
+        self.objects, self.surfaces = count_objects()
+        worker = runner_game.chunk_worker
+        self.chunk_fallbacks = worker.fallbacks if worker is not None else 0
+        ordered = sorted(frame_times)
+        self.p50 = percentile(ordered, 0.50)
+        self.p95 = percentile(ordered, 0.95)
+        self.p99 = percentile(ordered, 0.99)
+
+    def report(self):
+        return (f"frame {self.frame:>9d}  runs {self.runs:>6d}  rss {self.rss / 2**20:7.1f} MB  "
+                f"objects {sum(self.objects.values()):>7d}  surfaces {self.surfaces:>5d}  "
+                f"frame ms p50 {self.p50 * 1000:5.2f} p95 {self.p95 * 1000:5.2f} "
+                f"p99 {self.p99 * 1000:5.2f}  chunk fallbacks {self.chunk_fallbacks}")
+
+
+def sustained_growth(values, tolerance):
+    # True if the series rises from quarter to quarter and ends more than
+    # tolerance above where it started; one-off spikes don't count
+    if len(values) < 4:
+        return False
+    size = len(values) / 4
+    medians = [statistics.median(values[int(i * size):int((i + 1) * size)]) for i in range(4)]
+    rising = all(later > earlier for earlier, later in zip(medians, medians[1:]))
+    return rising and medians[-1] - medians[0] > tolerance
+
+
+def check(samples):
+    # Reasons the soak failed, empty if it passed
+    samples = samples[WARMUP_SAMPLES:]
+    failures = []
+    if sustained_growth([s.rss for s in samples], RSS_TOLERANCE):
+        failures.append(f"RSS grew from {samples[0].rss / 2**20:.1f} MB "
+                        f"to {samples[-1].rss / 2**20:.1f} MB")
+    if sustained_growth([s.surfaces for s in samples], SURFACE_TOLERANCE):
+        failures.append(f"surfaces grew from {samples[0].surfaces} to {samples[-1].surfaces}")
+    for name in sorted(set().union(*(s.objects for s in samples))):
+        counts = [s.objects.get(name, 0) for s in samples]
+        if sustained_growth(counts, max(OBJECT_TOLERANCE, counts[0] * 0.05)):
+            failures.append(f"{name} objects grew from {counts[0]} to {counts[-1]}")
+    if len(samples) >= 4:
+        quarter = max(1, len(samples) // 4)
+        first = statistics.median(s.p95 for s in samples[:quarter])
+        last = statistics.median(s.p95 for s in samples[-quarter:])
+        if last > first * FRAME_TIME_DRIFT:
+            failures.append(f"p95 frame time drifted from {first * 1000:.2f} ms to {last * 1000:.2f} ms")
+    return failures
+
+
+class SoakClock:
+    # Replaces runner_game.clock for the soak
+    def __init__(self, frames, sample_every, policy, verbose=True):
+        self.frames = frames
+        self.sample_every = sample_every
+        self.policy = policy
+        self.verbose = verbose
+        self.frame = 0
+        self.runs = 0
+        self.samples = []
+        self.frame_times = []
+        self.last = time.perf_counter()
+
+    def tick(self, framerate=0):
+        now = time.perf_counter()
+        self.frame_times.append(now - self.last)
+        self.frame += 1
+        if self.frame % self.sample_every == 0:
+            sample = Sample(self.frame, self.runs, self.frame_times)
+            self.samples.append(sample)
+            self.frame_times = []
+            if self.verbose:
+                print(sample.report(), flush=True)
+        if self.frame >= self.frames:
+            raise SoakFinished
+        self.policy.post_inputs(self.frame)
+        # Sampling is slow; keep it out of the next frame's time and allocations
+        if runner_game.allocation_meter is not None:
+            runner_game.allocation_meter.skip()
+        self.last = time.perf_counter()
+        return 0
+
+    def get_fps(self):
+        return 0.0
+
+
+def soak(frames, sample_every, seed=0, verbose=True):
+    clock = SoakClock(frames, sample_every, ScriptedPolicy(seed), verbose)
+    game_loop = runner_game.game_loop
+
+    def counted_game_loop():
+        clock.runs += 1
+        return game_loop()
+
+    # Run the real main loop with the clock swapped out and SPACE already
+    # queued to leave the start screen
+    runner_game.clock = clock
+    runner_game.game_loop = counted_game_loop
+    random.seed(seed)
+    post_key(pygame.KEYDOWN, pygame.K_SPACE)
+    try:
+        runner_game.main()
+    except SoakFinished:
+        pass
+    return clock.samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test Cherry Runner headlessly")
+    parser.add_argument('--frames', type=int, default=1_000_000)
+    parser.add_argument('--sample-every', type=int, default=20_000, metavar='FRAMES')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gc-control', action='store_true',
+                        help="run with the game's --gc-control garbage collection mode")
+    parser.add_argument('--alloc-budget', type=int, metavar='BYTES',
+                        help="also fail if any frame allocates more than BYTES")
+    args = parser.parse_args()
+
+    if args.gc_control:
+        runner_game.gc_controller = frame_budget.GCController()
+    if args.alloc_budget is not None:
+        runner_game.allocation_meter = frame_budget.AllocationMeter(args.alloc_budget)
+
+    started = time.perf_counter()
+    samples = soak(args.frames, args.sample_every, args.seed)
+    elapsed = time.perf_counter() - started
+    print(f"{samples[-1].frame if samples else 0} frames, {samples[-1].runs if samples else 0} runs "
+          f"in {elapsed:.0f}s")
+    failures = check(samples)
+    meter = runner_game.allocation_meter
+    if meter is not None:
+        print(meter.report())
+        try:
+            meter.assert_within_budget()
+        except AssertionError as error:
+            failures.append(str(error))
+    for failure in failures:
+        print("FAIL:", failure)
+    if not failures:
+        print("PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import struct
+import threading
+
+import async_loop
+import telemetry
+
+# Live spectator feed: broadcasts per-tick game state to local TCP or Unix
+# socket clients.
+#
+# Messages are length-prefixed. The first message a client gets is a keyframe
+# with the full state; after that each tick is a delta against the one before.
+# Obstacle x positions travel as fixed point (1/16 px) so deltas are exact and
+# never drift. Each client has a small queue: when a slow client's queue is
+# full its frames are dropped and it is resynchronised with a keyframe, so the
+# game never waits on a client.
+
+KEYFRAME = 0
+DELTA = 1
+
+FIXED_POINT = 16  # Obstacle x units per pixel
+
+LENGTH = struct.Struct('<I')
+HEADER = struct.Struct('<BI')  # message type, tick
+# game speed, score, player y, player radius, ducking, game over
+SCALAR_FORMATS = ('<f', '<I', '<f', '<f', '<B', '<B')
+SCALARS = struct.Struct('<' + ''.join(f[1:] for f in SCALAR_FORMATS))
+SCALAR_FIELDS = [struct.Struct(f) for f in SCALAR_FORMATS]
+COUNT = struct.Struct('<B')
+OBSTACLE_COUNT = struct.Struct('<H')
+OBSTACLE = struct.Struct('<IBi')  # serial, kind, x
+SERIAL = struct.Struct('<I')
+MOVE = struct.Struct('<h')
+
+
+def capture(state):
+    # Copy the spectator-visible part of a GameState into plain values; cheap
+    # enough to call from the render thread every frame
+    player = state.player
+    return (state.tick,
+            (state.game_speed, state.score, player.y, player.radius,
+             int(player.is_ducking), int(state.game_over)),
+            [(obstacle.serial, obstacle.type_id, obstacle.x)
+             for obstacle in state.obstacles])
+
+
+class StateEncoder:
+    def __init__(self):
+        self.scalars = None
+        self.obstacles = {}  # serial -> (kind, fixed point x) as last sent
+        self.tick = 0
+
+    def encode(self, frame):
+        # Returns the delta message for this frame, or None when there is no
+        # previous frame to diff against; keyframe() then covers it
+        tick, scalars, obstacles = frame
+        obstacles = {serial: (kind, round(x * FIXED_POINT)) for serial, kind, x in obstacles}
+        delta = None if self.scalars is None else self._delta(tick, scalars, obstacles)
+        self.tick = tick
+        self.scalars = scalars
+        self.obstacles = obstacles
+        return delta
+
+    def keyframe(self):
+        # Full state of the last encoded frame
+        parts = [HEADER.pack(KEYFRAME, self.tick), SCALARS.pack(*self.scalars),
+                 OBSTACLE_COUNT.pack(len(self.obstacles))]
+        for serial in sorted(self.obstacles):
+            parts.append(OBSTACLE.pack(serial, *self.obstacles[serial]))
+        return frame_message(b''.join(parts))
+
+    def _delta(self, tick, scalars, obstacles):
+        # A new run: serials start again from 0, so the old state is no
+        # base for a delta
+        if tick < self.tick:
+            return None
+        mask = 0
+        changed = []
+        for bit, (old, new) in enumerate(zip(self.scalars, scalars)):
+            if old != new:
+                mask |= 1 << bit
+                changed.append(SCALAR_FIELDS[bit].pack(new))
+
+        # An obstacle whose kind changed is a different one under the same
+        # serial, so it is sent as removed and added again
+        previous = self.obstacles
+        same = {serial for serial, (kind, _) in obstacles.items()
+                if serial in previous and previous[serial][0] == kind}
+        removed = [serial for serial in sorted(previous) if serial not in same]
+        added = [serial for serial in sorted(obstacles) if serial not in same]
+        kept = sorted(same)
+        moves = [obstacles[serial][1] - previous[serial][1] for serial in kept]
+        if len(removed) > 255 or len(added) > 255 or any(not -32768 <= m <= 32767 for m in moves):
+            return None
+
+        parts = [HEADER.pack(DELTA, tick), COUNT.pack(mask)]
+        parts.extend(changed)
+        parts.append(COUNT.pack(len(removed)))
+        parts.extend(SERIAL.pack(serial) for serial in removed)
+        parts.append(COUNT.pack(len(added)))
+        parts.extend(OBSTACLE.pack(serial, *obstacles[serial]) for serial in added)
+        parts.extend(MOVE.pack(move) for move in moves)
+        return frame_message(b''.join(parts))
+
+
+class StateDecoder:
+    # Client side of StateEncoder: feed it message payloads, read the state back
+    def __init__(self):
+        self.tick = None
+        self.scalars = None
+        self.obstacles = {}  # serial -> (kind, fixed point x)
+        self.kinds = telemetry.load_obstacle_kinds()
+
+    @property
+    def synced(self):
+        return self.scalars is not None
+
+    def feed(self, payload):
+        kind, self.tick = HEADER.unpack_from(payload)
+        offset = HEADER.size
+        if kind == KEYFRAME:
+            self.scalars = SCALARS.unpack_from(payload, offset)
+            offset += SCALARS.size
+            (count,) = OBSTACLE_COUNT.unpack_from(payload, offset)
+            offset += OBSTACLE_COUNT.size
+            self.obstacles = {}
+            for _ in range(count):
+                serial, obstacle_kind, x = OBSTACLE.unpack_from(payload, offset)
+                offset += OBSTACLE.size
+                self.obstacles[serial] = (obstacle_kind, x)
+            return self.state()
+
+        if not self.synced:
+            raise ValueError("delta received before a keyframe")
+        (mask,) = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        scalars = list(self.scalars)
+        for bit, field in enumerate(SCALAR_FIELDS):
+            if mask & (1 << bit):
+                (scalars[bit],) = field.unpack_from(payload, offset)
+                offset += field.size
+        self.scalars = tuple(scalars)
+
+        (count,) = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            (serial,) = SERIAL.unpack_from(payload, offset)
+            offset += SERIAL.size
+            del self.obstacles[serial]
+        kept = sorted(self.obstacles)
+        (count,) = COUNT.unpack_from(payload, offset)
+        offset += COUNT.size
+        added = {}
+        for _ in range(count):
+            serial, obstacle_kind, x = OBSTACLE.unpack_from(payload, offset)
+            offset += OBSTACLE.size
+            added[serial] = (obstacle_kind, x)
+        for serial in kept:
+            (move,) = MOVE.unpack_from(payload, offset)
+            offset += MOVE.size
+            obstacle_kind, x = self.obstacles[serial]
+            self.obstacles[serial] = (obstacle_kind, x + move)
+        self.obstacles.update(added)
+        return self.state()
+
+    def state(self):
+        game_speed, score, player_y, radius, ducking, game_over = self.scalars
+        return {
+            'tick': self.tick,
+            'game_speed': game_speed,
+            'score': score,
+            'player_y': player_y,
+            'player_radius': radius,
+            'ducking': bool(ducking),
+            'game_over': bool(game_over),
+            'obstacles': [(serial, self.kinds[kind] if kind < len(self.kinds) else None,
+                           x / FIXED_POINT)
+                          for serial, (kind, x) in sorted(self.obstacles.items())],
+        }
+
+
+def frame_message(payload):
+    return LENGTH.pack(len(payload)) + payload
+
+
+async def read_message(reader):
+    # Read one message payload, or None at end of stream
+    try:
+        header = await reader.readexactly(LENGTH.size)
+        return await reader.readexactly(LENGTH.unpack(header)[0])
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class SpectatorClient:
+    # Per-connection queue; frames are dropped rather than queued without bound
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.needs_keyframe = True
+        self.dropped = 0
+
+    def offer(self, delta, encoder):
+        # Queue this tick's delta, or a keyframe if the client has missed
+        # anything; returns the message queued
+        if self.queue.full():
+            self.dropped += 1
+            self.needs_keyframe = True
+            return None
+        if self.needs_keyframe or delta is None:
+            message = encoder.keyframe()
+            self.needs_keyframe = False
+        else:
+            message = delta
+        self.queue.put_nowait(message)
+        return message
+
+    async def send_loop(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await async_loop.next_step()
+                self.writer.write(message)
+                await self.writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.writer.close()
+
+
+class SpectatorServer:
+    # Runs an asyncio event loop on a background thread; the game thread only
+    # hands over captured frames with publish(). attach() serves from an
+    # event loop the game thread runs itself instead (see async_loop)
+    def __init__(self, host='127.0.0.1', port=None, unix_path=None, client_queue_size=8):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.client_queue_size = client_queue_size
+        self.clients = set()
+        self.client_tasks = set()
+        self.encoder = StateEncoder()
+        self.frames_published = 0
+        self.bytes_sent = 0
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.servers = []
+        self.thread = threading.Thread(target=self._run, name='spectator-server', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def attach(self, loop):
+        # Listen on `loop` instead of starting the server thread. The loop
+        # only runs when its owner runs it, so that is when clients are served
+        self.loop.close()
+        self.loop = loop
+        self.thread = None
+        loop.run_until_complete(self._listen())
+        self.ready.set()
+        return self
+
+    def publish(self, state):
+        self.frames_published += 1
+        self.loop.call_soon_threadsafe(self.broadcast, capture(state))
+
+    def close(self):
+        if self.thread is None:
+            if not self.loop.is_closed():
+                self.loop.run_until_complete(self._shut_down())
+        elif self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+    @property
+    def dropped(self):
+        return sum(client.dropped for client in self.clients)
+
+    def broadcast(self, frame):
+        # Runs on the server's loop: encode once, fan out to every client
+        delta = self.encoder.encode(frame)
+        for client in self.clients:
+            message = client.offer(delta, self.encoder)
+            if message is not None:
+                self.bytes_sent += len(message)
+
+    async def _handle(self, reader, writer):
+        client = SpectatorClient(writer, self.client_queue_size)
+        self.clients.add(client)
+        self.client_tasks.add(asyncio.current_task())
+        try:
+            await client.send_loop()
+        finally:
+            self.clients.discard(client)
+            self.client_tasks.discard(asyncio.current_task())
+
+    async def _listen(self):
+        if self.port is not None:
+            self.servers.append(await asyncio.start_server(self._handle, self.host, self.port))
+            # Report the real port when an ephemeral one (0) was requested
+            self.port = self.servers[-1].sockets[0].getsockname()[1]
+        if self.unix_path is not None:
+            self.servers.append(await asyncio.start_unix_server(self._handle, self.unix_path))
+
+    async def _shut_down(self):
+        # Disconnect clients before the loop goes away
+        for server in self.servers:
+            server.close()
+        tasks = list(self.client_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._listen())
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self._shut_down())
+            self.loop.close()
+
+
+async def watch(host='127.0.0.1', port=None, unix_path=None):
+    # Minimal spectator: print the decoded state every second of play
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    decoder = StateDecoder()
+    while True:
+        payload = await read_message(reader)
+        if payload is None:
+            break
+        state = decoder.feed(payload)
+        if state['tick'] % 60 == 0:
+            obstacles = ", ".join(f"{kind}@{x:.0f}" for _, kind, x in state['obstacles'])
+            print(f"tick {state['tick']:6d}  score {state['score']:6d}  "
+                  f"speed {state['game_speed']:.1f}  y {state['player_y']:.0f}  [{obstacles}]")
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a Cherry Runner spectator feed")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help="connect to a Unix socket instead")
+    args = parser.parse_args()
+    try:
+        asyncio.run(watch(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import glob
+import json
+import os
+
+import pygame
+
+# On-disk cache of generated sprites: all sprites packed into one PNG plus a
+# JSON index of where each one sits. Loading costs a single image decode; the
+# sprites come back as subsurfaces sharing the atlas pixels.
+#
+# The index records a version string (a hash of the code and parameters that
+# drew the sprites). A cache with any other version is stale and gets rebuilt.
+
+MAX_ATLAS_WIDTH = 2048
+SPRITE_GAP = 1  # Transparent pixels between sprites
+
+
+def pack(surfaces, max_width=MAX_ATLAS_WIDTH):
+    # Shelf-pack surfaces, tallest first, into rows no wider than max_width.
+    # Returns the atlas surface and {key: (x, y, width, height)}
+    order = sorted(surfaces, key=lambda key: (-surfaces[key].get_height(), key))
+    index = {}
+    x = y = shelf_height = atlas_width = 0
+    for key in order:
+        width, height = surfaces[key].get_size()
+        if x and x + width > max_width:
+            y += shelf_height + SPRITE_GAP
+            x = shelf_height = 0
+        index[key] = (x, y, width, height)
+        x += width + SPRITE_GAP
+        shelf_height = max(shelf_height, height)
+        atlas_width = max(atlas_width, x)
+
+    atlas = pygame.Surface((max(1, atlas_width), max(1, y + shelf_height)), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    for key, (x, y, _, _) in index.items():
+        atlas.blit(surfaces[key], (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+    return atlas, index
+
+
+def index_path(directory, name):
+    return os.path.join(directory, name + '.json')
+
+
+def save(directory, name, version, surfaces):
+    atlas, index = pack(surfaces)
+    os.makedirs(directory, exist_ok=True)
+
+    # Write the image under a versioned name first and the index last, so a
+    # reader never sees an index pointing at a half-written image
+    image_name = f"{name}-{version}.png"
+    image_path = os.path.join(directory, image_name)
+    temp_image = image_path + '.tmp.png'
+    pygame.image.save(atlas, temp_image)
+    os.replace(temp_image, image_path)
+
+    temp_index = index_path(directory, name) + '.tmp'
+    with open(temp_index, 'w') as f:
+        json.dump({'version': version, 'image': image_name,
+                   'sprites': {key: list(rect) for key, rect in index.items()}}, f)
+    os.replace(temp_index, index_path(directory, name))
+
+    # Drop images left behind by older versions
+    for old in glob.glob(os.path.join(directory, f"{name}-*.png")):
+        if os.path.basename(old) != image_name:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return atlas, index
+
+
+def load(directory, name, version, convert=True):
+    # Returns {key: surface}, or None if the cache is missing, stale or
+    # unreadable. convert=False leaves matching the display format to the
+    # caller, for loading on another thread
+    try:
+        with open(index_path(directory, name)) as f:
+            index = json.load(f)
+        if index.get('version') != version:
+            return None
+        atlas = pygame.image.load(os.path.join(directory, index['image']))
+        if convert and pygame.display.get_surface() is not None:
+            # PNGs decode as RGBA bytes; blitting that to the screen converts
+            # every pixel on every blit, so match the display format once here
+            atlas = atlas.convert_alpha()
+        return {key: atlas.subsurface(rect) for key, rect in index['sprites'].items()}
+    except (OSError, ValueError, KeyError, pygame.error):
+        return None
+
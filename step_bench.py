@@ -0,0 +1,54 @@
+import argparse
+import os
+import time
+
+# Benchmarks GameState.step over several ticks at a time, tick by tick and
+# swept, to show from which stride the sweep pays for itself.
+#
+#   python3 step_bench.py [--strides 1,2,4,...] [--seeds N] [--ticks N]
+#
+# Both ways give the same result; a DuckBot decides at every step boundary
+# for both, and only the time spent in step() is counted.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import bots  # noqa: E402
+import runner_game  # noqa: E402
+
+
+def time_steps(stride, swept, seeds, max_ticks):
+    # Microseconds per simulated tick
+    elapsed = 0.0
+    ticks = 0
+    for seed in range(seeds):
+        state = runner_game.GameState(seed)
+        bot = bots.DuckBot(seed)
+        while not state.game_over and state.tick < max_ticks:
+            bot.act(state)
+            started = time.perf_counter()
+            state.step(stride, swept=swept)
+            elapsed += time.perf_counter() - started
+        ticks += state.tick
+    return elapsed / ticks * 1e6
+
+
+def bench(strides, seeds, max_ticks):
+    return [(stride, time_steps(stride, False, seeds, max_ticks), time_steps(stride, True, seeds, max_ticks))
+            for stride in strides]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tick-by-tick and swept GameState steps")
+    parser.add_argument('--strides', default='1,2,4,8,16,32,64,128')
+    parser.add_argument('--seeds', type=int, default=10)
+    parser.add_argument('--ticks', type=int, default=5000, help="ticks per run at most")
+    args = parser.parse_args()
+
+    strides = [int(stride) for stride in args.strides.split(',')]
+    print(f"{'stride':>6}  {'per tick us':>11}  {'swept us':>8}  {'speedup':>7}")
+    for stride, discrete, swept in bench(strides, args.seeds, args.ticks):
+        print(f"{stride:>6}  {discrete:11.2f}  {swept:8.2f}  {discrete / swept:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
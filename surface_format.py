@@ -0,0 +1,138 @@
+import collections
+import sys
+
+import pygame
+
+# Pixel formats of surfaces, and where they cost time in blits
+#
+# SDL copies and blends 32-bit pixels with dedicated loops only when source
+# and destination lay R, G and B out the same way. Any other pair goes through
+# its generic blitter, which unpacks and repacks every pixel. for_display()
+# converts a surface to the display's format once (keeping per-pixel alpha),
+# so the screen blits of everything the game caches take the fast loops
+# whatever the display's format is.
+#
+# BlitAudit is a debug mode (--blit-audit) that counts blits onto the screen
+# by source and destination format and reports each call site that blits
+# through the slow path. pygame's display surface can't be instrumented
+# directly, so the game draws into an audited back buffer in the display's
+# format and that is copied to the display before every flip.
+
+alpha_format = None  # Format convert_alpha() gives, made on first use
+
+
+def describe(surface):
+    # Format name in SDL's style, high bits first: ARGB8888, XRGB8888, RGB565
+    bits = surface.get_bitsize()
+    if bits <= 8:
+        return f"INDEX{bits}"
+    channels = sorted(((shift, 8 - loss, letter) for letter, mask, shift, loss
+                       in zip('RGBA', surface.get_masks(), surface.get_shifts(), surface.get_losses()) if mask),
+                      reverse=True)
+    letters, sizes = [], []
+    position = bits
+    for shift, size, letter in channels:
+        if shift + size < position:
+            letters.append('X')
+            sizes.append(position - shift - size)
+        letters.append(letter)
+        sizes.append(size)
+        position = shift
+    if position:
+        letters.append('X')
+        sizes.append(position)
+    return ''.join(letters) + ''.join(str(size) for size in sizes)
+
+
+def same_layout(source, destination):
+    # Alpha aside, are the two formats the same?
+    return (source.get_bitsize() == destination.get_bitsize()
+            and source.get_masks()[:3] == destination.get_masks()[:3])
+
+
+def for_display(surface):
+    # The surface in the display's format, converted once; convert_alpha()
+    # for surfaces with per-pixel alpha. Needs the display mode to be set
+    global alpha_format
+    if surface.get_flags() & pygame.SRCALPHA:
+        if alpha_format is None:
+            alpha_format = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+        if same_layout(surface, alpha_format) and surface.get_masks()[3] == alpha_format.get_masks()[3]:
+            return surface
+        return surface.convert_alpha()
+    if same_layout(surface, pygame.display.get_surface()):
+        return surface
+    return surface.convert()
+
+
+class BlitAudit:
+    def __init__(self):
+        self.pairs = collections.Counter()  # (source format, destination format): blits
+        self.slow = collections.Counter()  # (call site, source format, destination format): blits
+        self.blits = 0
+
+    def record(self, source, destination, caller):
+        self.blits += 1
+        source_format = describe(source)
+        alpha = source.get_alpha()
+        if source.get_flags() & pygame.SRCALPHA:
+            source_format += " per-pixel alpha"
+            if alpha is not None and alpha < 255:
+                source_format += " faded"
+        elif alpha is not None:
+            source_format += " surface alpha"
+        if source.get_colorkey() is not None:
+            source_format += " colorkey"
+        pair = (source_format, describe(destination))
+        self.pairs[pair] += 1
+        if not same_layout(source, destination):
+            site = f"{caller.f_code.co_filename}:{caller.f_lineno} in {caller.f_code.co_name}"
+            self.slow[(site,) + pair] += 1
+
+    def back_buffer(self, display):
+        # A surface to draw the frame into instead of `display`; flip() and
+        # update() copy it to the display first
+        buffer = AuditedSurface(display.get_size(), 0, display)
+        buffer.audit = self
+        flip, update = pygame.display.flip, pygame.display.update
+
+        def present():
+            display.blit(buffer, (0, 0))
+
+        def audited_flip():
+            present()
+            flip()
+
+        def audited_update(*args):
+            present()
+            update(*args)
+
+        pygame.display.flip = audited_flip
+        pygame.display.update = audited_update
+        return buffer
+
+    def report(self):
+        slow_blits = sum(self.slow.values())
+        lines = [f"blit audit: {self.blits} blits onto the screen, {slow_blits} through the slow path"]
+        for (source, destination), count in self.pairs.most_common():
+            lines.append(f"  {count:>9} {source} -> {destination}")
+        if self.slow:
+            lines.append("slow-path blits by call site:")
+            for (site, source, destination), count in self.slow.most_common():
+                lines.append(f"  {count:>9} {site}: {source} -> {destination}")
+        return "\n".join(lines)
+
+
+class AuditedSurface(pygame.Surface):
+    audit = None
+
+    def blit(self, source, *args, **kwargs):
+        self.audit.record(source, self, sys._getframe(1))
+        return super().blit(source, *args, **kwargs)
+
+    def blits(self, blit_sequence, *args, **kwargs):
+        blit_sequence = list(blit_sequence)
+        caller = sys._getframe(1)
+        for item in blit_sequence:
+            self.audit.record(item[0], self, caller)
+        return super().blits(blit_sequence, *args, **kwargs)
@@ -0,0 +1,178 @@
+import argparse
+import collections
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+
+# Difficulty sweep: plays thousands of seeded headless games with the
+# reference bots for every point of a grid of difficulty settings and sums
+# them up in one table.
+#
+# The games of each point are cut into fixed-size shards of seeds. Shards are
+# independent and only send back a few numbers per game, so a process pool
+# keeps every core busy and the sweep scales with the number of workers.
+#
+#   python3 sweep.py --set obstacle_frequency=1200,1500 --set speed_step=0.1,0.2
+#   python3 sweep.py --grid grid.json --games 5000 --csv results.csv
+#
+# A grid file is a JSON object of setting name to list of values. Values of
+# spawn_weights are objects of obstacle type to weight.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+DEFAULT_GAMES = 1000
+DEFAULT_SHARD = 50  # Games per task
+DEFAULT_MAX_SECONDS = 300  # Games still running after this count as survived
+DEFAULT_JITTER = 4  # Bot reaction jitter in ticks
+SCORE_PERCENTILES = (10, 50, 90, 99)
+
+
+def run_shard(settings, bot_name, jitter, seeds, max_ticks):
+    # Worker side: play one game per seed, return (ticks, score, death kind)
+    # per game, with kind None for games that reached max_ticks
+    import bots
+    import runner_game
+
+    results = []
+    for seed in seeds:
+        state = runner_game.GameState(seed).configure(**settings)
+        bots.play(state, bots.BOTS[bot_name](seed, jitter), max_ticks)
+        kind = state.hit_obstacle.type if state.game_over else None
+        results.append((state.tick, state.score, kind))
+    return results
+
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def build_grid(grid_file, assignments):
+    grid = {}
+    if grid_file:
+        with open(grid_file) as f:
+            grid.update(json.load(f))
+    for assignment in assignments:
+        name, _, values = assignment.partition('=')
+        grid[name] = [parse_value(value) for value in values.split(',')]
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(point, bot_name, results, kinds, fps):
+    ticks = sorted(result[0] for result in results)
+    scores = sorted(result[1] for result in results)
+    causes = collections.Counter(result[2] for result in results)
+    row = {'point': point, 'bot': bot_name, 'games': len(results),
+           'mean_seconds': sum(ticks) / len(ticks) / fps,
+           'median_seconds': percentile(ticks, 0.5) / fps}
+    for p in SCORE_PERCENTILES:
+        row[f"score_p{p}"] = percentile(scores, p / 100)
+    row['survived'] = causes[None] / len(results)
+    for kind in kinds:
+        row[f"death_{kind}"] = causes[kind] / len(results)
+    return row
+
+
+def format_settings(settings):
+    parts = []
+    for name, value in settings.items():
+        if isinstance(value, dict):
+            value = '/'.join(f"{k}:{v}" for k, v in value.items())
+        parts.append(f"{name}={value}")
+    return ' '.join(parts) or 'defaults'
+
+
+def print_table(rows, points, kinds):
+    columns = (['point', 'bot', 'games', 'mean_s', 'median_s']
+               + [f"p{p}" for p in SCORE_PERCENTILES] + ['alive'] + list(kinds))
+    print("  ".join(f"{c:>8}" for c in columns))
+    for row in rows:
+        values = ([row['point'], row['bot'], row['games'], f"{row['mean_seconds']:.1f}",
+                   f"{row['median_seconds']:.1f}"]
+                  + [row[f"score_p{p}"] for p in SCORE_PERCENTILES]
+                  + [f"{row['survived']:.1%}"] + [f"{row[f'death_{kind}']:.1%}" for kind in kinds])
+        print("  ".join(f"{v:>8}" for v in values))
+    print()
+    for index, settings in enumerate(points):
+        print(f"point {index}: {format_settings(settings)}")
+
+
+def sweep(points, bot_names, games, shard_size, max_ticks, jitter, workers):
+    # Returns {(point index, bot name): [per-game results]}
+    results = collections.defaultdict(list)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {}
+        for index, settings in enumerate(points):
+            for bot_name in bot_names:
+                for start in range(0, games, shard_size):
+                    seeds = range(start, min(games, start + shard_size))
+                    future = pool.submit(run_shard, settings, bot_name, jitter, seeds, max_ticks)
+                    futures[future] = (index, bot_name)
+        for future in concurrent.futures.as_completed(futures):
+            results[futures[future]].extend(future.result())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Cherry Runner difficulty settings headlessly")
+    parser.add_argument('--grid', metavar='FILE', help="JSON grid of setting values")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2',
+                        help="values for one setting (repeatable)")
+    parser.add_argument('--bots', default='jump,duck', help="comma-separated reference bots")
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES, help="seeded games per point and bot")
+    parser.add_argument('--shard', type=int, default=DEFAULT_SHARD, help="games per worker task")
+    parser.add_argument('--max-seconds', type=float, default=DEFAULT_MAX_SECONDS)
+    parser.add_argument('--jitter', type=int, default=DEFAULT_JITTER, help="bot reaction jitter in ticks")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--csv', metavar='PATH', help="also write the table as CSV")
+    args = parser.parse_args()
+
+    import bots
+    import runner_game
+
+    points = build_grid(args.grid, args.set)
+    bot_names = args.bots.split(',')
+    for name in bot_names:
+        if name not in bots.BOTS:
+            parser.error(f"unknown bot {name!r} (choose from {', '.join(bots.BOTS)})")
+    for settings in points:
+        try:
+            runner_game.GameState(0).configure(**settings)
+        except (TypeError, ValueError) as error:
+            parser.error(str(error))
+
+    started = time.perf_counter()
+    max_ticks = int(args.max_seconds * runner_game.FPS)
+    results = sweep(points, bot_names, args.games, args.shard, max_ticks, args.jitter, args.workers)
+    elapsed = time.perf_counter() - started
+
+    kinds = [kind.name for kind in runner_game.OBSTACLE_TYPES]
+    rows = [summarize(index, bot_name, results[index, bot_name], kinds, runner_game.FPS)
+            for index in range(len(points)) for bot_name in bot_names]
+    print_table(rows, points, kinds)
+    total_games = len(points) * len(bot_names) * args.games
+    print(f"\n{total_games} games in {elapsed:.1f}s on {args.workers} workers")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['settings'] + list(rows[0]))
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({'settings': format_settings(points[row['point']]), **row})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
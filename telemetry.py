@@ -0,0 +1,145 @@
+import atexit
+import collections
+import os
+import struct
+import threading
+import time
+
+# Gameplay telemetry: fixed-size binary records written by a background thread
+#
+# Every file starts with a 16 byte header followed by back-to-back records, so
+# a file can be read as a flat array of RECORD_SIZE byte rows.
+
+# Event codes
+EVENT_RUN_START = 0
+EVENT_SPAWN = 1
+EVENT_JUMP = 2
+EVENT_DUCK = 3
+EVENT_DEATH = 4
+
+# Death causes
+CAUSE_NONE = 0
+CAUSE_IMPACT = 1  # Ran into an obstacle
+CAUSE_HOLE = 2    # Fell into a hole
+
+# Obstacle kind names by type id. runner_game fills this from its
+# OBSTACLE_TYPES registry, so a new type needs no edit here
+OBSTACLE_KINDS = []
+KIND_NONE = 255
+
+# File layout
+MAGIC = b'CRTL'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQ')  # magic, version, record size, creation time (ms)
+# run, tick, event, kind, cause, pad, score, game speed, player y, player velocity, obstacle x
+RECORD = struct.Struct('<IIBBBBIffff')
+RECORD_SIZE = RECORD.size
+
+FILE_PREFIX = 'telemetry'
+FILE_SUFFIX = '.bin'
+
+
+def load_obstacle_kinds():
+    # For tools run without the game: importing it (with no window) builds
+    # the registry, which fills OBSTACLE_KINDS
+    if not OBSTACLE_KINDS:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import runner_game  # noqa: F401
+    return OBSTACLE_KINDS
+
+
+class TelemetryWriter:
+    def __init__(self, directory, max_file_bytes=16 * 1024 * 1024, buffer_size=8192,
+                 batch_size=512, flush_interval=0.5):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # The render thread only ever appends and the writer thread only ever
+        # pops, both of which are atomic on a deque, so no lock is needed
+        self.buffer = collections.deque()
+        self.dropped = 0
+        self.written = 0
+        self.files_written = 0
+
+        self.run_id = 0
+        self.session = time.strftime('%Y%m%d-%H%M%S')
+        self.file = None
+        self.file_bytes = 0
+        self.file_index = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def start_run(self):
+        self.run_id += 1
+        self.record(EVENT_RUN_START, 0, 0, 0.0)
+        return self.run_id
+
+    def record(self, event, tick, score, game_speed, player_y=0.0, player_velocity=0.0,
+               kind=KIND_NONE, cause=CAUSE_NONE, obstacle_x=0.0):
+        # Called from the render thread: never blocks, drops the record if the
+        # writer has fallen behind
+        if len(self.buffer) >= self.buffer_size:
+            self.dropped += 1
+            return False
+        self.buffer.append(RECORD.pack(self.run_id, tick, event, kind, cause, 0, score,
+                                       game_speed, player_y, player_velocity, obstacle_x))
+        if len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+        return True
+
+    def close(self):
+        if self.stopping:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self._drain()
+            if self.stopping:
+                # Pick up anything appended while the last batch was written
+                self._drain()
+                return
+
+    def _drain(self):
+        while self.buffer:
+            batch = []
+            while self.buffer and len(batch) < self.batch_size:
+                batch.append(self.buffer.popleft())
+            self._write(b''.join(batch))
+            self.written += len(batch)
+        if self.file:
+            self.file.flush()
+
+    def _write(self, data):
+        if self.file is None or self.file_bytes + len(data) > self.max_file_bytes:
+            self._rotate()
+        self.file.write(data)
+        self.file_bytes += len(data)
+
+    def _rotate(self):
+        if self.file:
+            self.file.close()
+        self.file_index += 1
+        name = f"{FILE_PREFIX}-{self.session}-{self.file_index:04d}{FILE_SUFFIX}"
+        self.file = open(os.path.join(self.directory, name), 'ab')
+        self.file_bytes = self.file.tell()
+        if self.file_bytes == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, int(time.time() * 1000)))
+            self.file_bytes = HEADER.size
+        self.files_written += 1
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import async_loop
+
+FRAMERATE = 60
+MARGIN = 0.002
+
+
+class SpinPacer:
+    # Stands in for FramePacer: spins until each frame is due, so the gaps
+    # the scheduler plans are the ones that really happen
+    strategy = 'busy'
+    deadline = None
+
+    def __init__(self):
+        self.last = None
+
+    def tick(self, framerate):
+        now = time.perf_counter()
+        if self.last is not None:
+            due = self.last + 1.0 / framerate
+            while now < due:
+                now = time.perf_counter()
+        self.last = now
+        return 0
+
+    def get_fps(self):
+        return 0.0
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def run(scheduler, task, max_frames=200):
+    for _ in range(max_frames):
+        if task.done():
+            break
+        scheduler.tick(FRAMERATE)
+    assert task.done()
+    return task.result()
+
+
+def test_steps_wait_for_time_left_in_the_gap():
+    scheduler = async_loop.FrameScheduler(SpinPacer(), MARGIN)
+
+    async def work():
+        # 40 ms of 1 ms steps: more than one gap holds
+        started = []
+        for _ in range(40):
+            await async_loop.next_step()
+            started.append((time.perf_counter(), scheduler.gap_end))
+            spin(0.001)
+        return started
+
+    try:
+        started = run(scheduler, scheduler.spawn(work()))
+        assert all(gap_end is not None and at < gap_end for at, gap_end in started)
+        assert scheduler.deferred >= 2
+        assert scheduler.pushed == 0
+    finally:
+        scheduler.close()
+
+
+def test_step_longer_than_the_gap_counts_as_pushed():
+    scheduler = async_loop.FrameScheduler(SpinPacer(), MARGIN)
+
+    async def work():
+        await async_loop.next_step()
+        spin(1.5 / FRAMERATE)
+
+    try:
+        run(scheduler, scheduler.spawn(work()))
+        scheduler.tick(FRAMERATE)
+        assert scheduler.pushed >= 1
+        assert scheduler.overslept == 0
+    finally:
+        scheduler.close()
+
+
+def test_next_step_outside_a_scheduler_just_yields():
+    async def work():
+        for _ in range(3):
+            await async_loop.next_step()
+        return True
+
+    assert asyncio.run(work())
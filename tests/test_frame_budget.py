@@ -0,0 +1,91 @@
+import gc
+import os
+import time
+
+import pytest
+
+import frame_budget
+import runner_game
+
+
+def test_prewarmer_retries_waiting_tasks():
+    ready_at = time.perf_counter() + 0.02
+    ran = []
+    tasks = [("wait", lambda: frame_budget.WAIT if time.perf_counter() < ready_at else ran.append("wait")),
+             ("after", lambda: ran.append("after"))]
+    prewarmer = frame_budget.Prewarmer(tasks)
+    assert not prewarmer.run(1.0)
+    assert ran == [] and prewarmer.done == 0
+    prewarmer.finish()
+    assert ran == ["wait", "after"] and prewarmer.progress == 1.0
+
+
+def test_sprite_caches_load_from_the_saved_atlas(tmp_path):
+    caches = (runner_game.obstacle_sprites, runner_game.petal_sprites,
+              runner_game.mountain_templates, runner_game.cloud_sprites)
+    for cache in caches:
+        cache.clear()
+    assert not runner_game.load_sprite_caches(str(tmp_path))
+    drawn = {id(cache): dict(cache) for cache in caches}
+
+    # The atlas is saved on a thread
+    deadline = time.perf_counter() + 10
+    while not os.path.exists(tmp_path / 'sprites.json') and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    for cache in caches:
+        cache.clear()
+    assert runner_game.load_sprite_caches(str(tmp_path))
+    for cache in caches:
+        assert cache.keys() == drawn[id(cache)].keys()
+        for key, sprite in cache.items():
+            assert sprite.get_size() == drawn[id(cache)][key].get_size()
+
+
+def test_allocation_meter_counts_frames_over_budget():
+    meter = frame_budget.AllocationMeter(budget_bytes=64 * 1024)
+    try:
+        meter.frame()  # Whatever the setup allocated
+        garbage = [bytes(1024) for _ in range(256)]  # About 256 KiB, freed before the frame ends
+        del garbage
+        assert meter.frame() > 64 * 1024
+        assert meter.frame() < 64 * 1024
+        assert meter.over_budget == 1 and meter.frames == 3
+        with pytest.raises(AssertionError):
+            meter.assert_within_budget()
+    finally:
+        meter.stop()
+
+
+def test_allocation_meter_within_budget():
+    meter = frame_budget.AllocationMeter(budget_bytes=64 * 1024)
+    try:
+        for _ in range(10):
+            small = [0] * 100
+            del small
+            meter.frame()
+        assert meter.over_budget == 0 and meter.worst <= 64 * 1024
+        meter.assert_within_budget()
+    finally:
+        meter.stop()
+
+
+def test_gc_controller_freezes_and_restores_the_collector():
+    enabled, thresholds = gc.isenabled(), gc.get_threshold()
+    controller = frame_budget.GCController(play_threshold=100)
+    try:
+        controller.freeze()
+        assert gc.get_freeze_count() > 0
+        controller.play_started()
+        assert not gc.isenabled()
+        garbage = [[] for _ in range(1000)]  # Young objects past the play threshold
+        controller.play_frame()
+        assert controller.play_collections == 1
+        del garbage
+        controller.idle_frame()
+        controller.idle_frame()
+        assert controller.idle_collections == 2
+    finally:
+        controller.stop()
+    assert gc.isenabled() == enabled
+    assert gc.get_threshold() == thresholds
+    assert gc.get_freeze_count() == 0
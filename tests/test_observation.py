@@ -0,0 +1,62 @@
+import pytest
+
+import bots
+import runner_game
+
+np = pytest.importorskip('numpy')
+observation = pytest.importorskip('observation')
+
+MAX_TICKS = 600
+
+
+def encode_run(seed, encoder):
+    # Step a run with a bot, encoding every tick one state at a time and
+    # keeping a snapshot of each state for the batch encoder
+    state = runner_game.GameState(seed)
+    bot = bots.DuckBot(seed)
+    rows = []
+    snapshots = []
+    out = encoder.empty()
+    while not state.game_over and state.tick < MAX_TICKS:
+        bot.act(state)
+        state.step()
+        rows.append(encoder.encode(state, out).tobytes())
+        snapshots.append(state.snapshot())
+    return rows, snapshots
+
+
+def restored(snapshot):
+    state = runner_game.GameState(snapshot[7])
+    state.restore(snapshot)
+    return state
+
+
+def test_encode_matches_encode_batch():
+    encoder = observation.ObservationEncoder()
+    for seed in range(5):
+        rows, snapshots = encode_run(seed, encoder)
+        assert rows
+        states = [restored(snapshot) for snapshot in snapshots]
+        batch = encoder.encode_batch(states, encoder.empty(len(states)))
+        assert [row.tobytes() for row in batch] == rows, f"seed {seed}"
+
+
+def test_same_seed_encodes_to_same_bits():
+    encoder = observation.ObservationEncoder()
+    assert encode_run(3, encoder)[0] == encode_run(3, encoder)[0]
+
+
+def test_nearest_obstacle_comes_first():
+    # Obstacles listed out of left-to-right order still encode nearest first
+    state = runner_game.GameState(0)
+    far = runner_game.Obstacle(state.game_speed, 0)
+    far.x = 600
+    near = runner_game.Obstacle(state.game_speed, 2)
+    near.x = 300
+    state.obstacles[:] = [far, near]
+    encoder = observation.ObservationEncoder(k=2)
+    out = encoder.encode(state, encoder.empty())
+    first = observation.PLAYER_VALUES
+    second = first + observation.OBSTACLE_VALUES
+    assert out[first + 1 + 2] == 1.0
+    assert out[second + 1 + 0] == 1.0
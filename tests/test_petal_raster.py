@@ -0,0 +1,57 @@
+import random
+
+import pygame
+import pytest
+
+import runner_game
+
+np = pytest.importorskip('numpy')
+
+BACKGROUND = (135, 206, 235)
+
+
+def falling_petals(seed, count, updates):
+    state = random.getstate()
+    random.seed(seed)
+    petals = [runner_game.CherryBlossom() for _ in range(count)]
+    for _ in range(updates):  # Moves them off whole pixels
+        for petal in petals:
+            petal.update()
+    random.setstate(state)
+    return petals
+
+
+def draw(petals, mode):
+    surface = pygame.Surface((runner_game.SCREEN_WIDTH, runner_game.SCREEN_HEIGHT), 0, 32)
+    surface.fill(BACKGROUND)
+    runner_game.draw_blossoms(petals, surface, mode)
+    return pygame.surfarray.array3d(surface).astype(np.int64)
+
+
+@pytest.mark.parametrize('updates', [0, 30])
+def test_raster_matches_blit(updates):
+    petals = falling_petals(7, 600, updates)
+    blit = draw(petals, runner_game.PETAL_BLIT)
+    raster = draw(petals, runner_game.PETAL_RASTER)
+    touched = (blit != BACKGROUND).any(axis=2)
+    assert touched.sum() > 10_000
+    # SDL's blender rounds each blit separately, the raster rounds once
+    assert np.abs(blit - raster).max() <= 2
+
+
+def test_auto_switches_at_threshold(monkeypatch):
+    drawn = []
+
+    class Rasterizer:
+        def draw_petals(self, surface, petals):
+            drawn.append(('raster', len(petals)))
+
+    monkeypatch.setattr(runner_game, 'get_petal_rasterizer', Rasterizer)
+    monkeypatch.setattr(runner_game.CherryBlossom, 'draw', lambda petal, surface: drawn.append('blit'))
+    surface = pygame.Surface((10, 10), 0, 32)
+    threshold = runner_game.PETAL_RASTER_THRESHOLD
+    runner_game.draw_blossoms(falling_petals(1, threshold - 1, 0), surface, runner_game.PETAL_AUTO)
+    assert drawn == ['blit'] * (threshold - 1)
+    drawn.clear()
+    runner_game.draw_blossoms(falling_petals(1, threshold, 0), surface, runner_game.PETAL_AUTO)
+    assert drawn == [('raster', threshold)]
@@ -0,0 +1,49 @@
+import pickle
+
+import pytest
+
+import bots
+import replay
+import runner_game
+
+
+def record(path, seed, max_ticks=2000):
+    state = runner_game.GameState(seed)
+    state.replay = replay.ReplayWriter(str(path), state, keyframe_interval=60)
+    bots.play(state, bots.DuckBot(seed, reaction_jitter=4), max_ticks)
+    state.replay.close(state)
+    return state
+
+
+def test_keyframes_restore_the_recorded_state(tmp_path):
+    path = tmp_path / 'run.crr'
+    played = record(path, 3)
+    recording = replay.Replay(str(path))
+    player = replay.ReplayPlayer(recording, runner_game.GameState(recording.seed))
+    player.seek(recording.end_tick)
+    assert player.state.snapshot() == played.snapshot()
+    for position in range(len(recording.index)):
+        snapshot, _ = recording.load_keyframe(position)
+        assert replay.pack_snapshot(snapshot) == recording.read_record(recording.index[position][1])[2]
+    recording.close()
+
+
+def test_snapshot_round_trip():
+    state = runner_game.GameState(5)
+    bots.play(state, bots.JumpBot(5), 400)
+    snapshot = state.snapshot()
+    assert replay.unpack_snapshot(replay.pack_snapshot(snapshot)) == snapshot
+
+
+@pytest.mark.parametrize('damage', [
+    lambda payload: payload[:-1],
+    lambda payload: payload + b'\0',
+    lambda payload: pickle.dumps(replay.unpack_snapshot(payload), protocol=4),  # Version 1 keyframe
+    lambda payload: payload[:40] + b'\2' + payload[41:],  # game over flag
+])
+def test_damaged_keyframes_are_rejected(damage):
+    state = runner_game.GameState(5)
+    bots.play(state, bots.JumpBot(5), 100)
+    payload = replay.pack_snapshot(state.snapshot())
+    with pytest.raises(ValueError):
+        replay.unpack_snapshot(damage(payload))
@@ -0,0 +1,85 @@
+import sqlite3
+import time
+
+import scores
+
+
+def wait_loaded(store):
+    deadline = time.monotonic() + 10
+    while not store.loaded and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.loaded
+
+
+def saved_scores(path):
+    connection = sqlite3.connect(path)
+    try:
+        return sorted(score for (score,) in connection.execute("SELECT score FROM runs"))
+    finally:
+        connection.close()
+
+
+def test_runs_are_saved_and_loaded_back(tmp_path):
+    path = str(tmp_path / 'sub' / 'scores.sqlite3')
+    store = scores.ScoreStore(path, top=3, history=4).open()
+    wait_loaded(store)
+    for score in (5, 50, 20, 40, 10):
+        store.record_run(score, score * 3, 1, 'bee')
+    store.close()
+    assert store.written == 5 and store.error is None
+    assert saved_scores(path) == [5, 10, 20, 40, 50]
+
+    store = scores.ScoreStore(path, top=3, history=4).open()
+    wait_loaded(store)
+    assert store.best == 50
+    assert [run.score for run in store.high_scores] == [50, 40, 20]
+    assert [run.score for run in store.history] == [50, 20, 40, 10]  # Oldest first
+    assert store.record_run(60, 1, 2)
+    assert not store.record_run(30, 1, 3)
+    store.close()
+
+
+def test_runs_recorded_while_loading_are_merged(tmp_path):
+    path = str(tmp_path / 'scores.sqlite3')
+    store = scores.ScoreStore(path, top=3)
+    connection = store._connect()
+    connection.executemany("INSERT INTO runs (finished, score, ticks, seed, cause) VALUES (?, ?, ?, ?, ?)",
+                           [(1.0, 30, 1, 1, None), (2.0, 10, 1, 1, None)])
+    connection.commit()
+    # Played before the database was read: cached, not yet committed
+    session = scores.Run(3.0, 20, 1, 1, None)
+    store._cache(session)
+    store._load(connection)
+    assert [run.score for run in store.high_scores] == [30, 20, 10]
+    assert [run.score for run in store.history] == [30, 10, 20]
+    connection.close()
+
+
+def test_runs_are_committed_in_batches(tmp_path):
+    path = str(tmp_path / 'scores.sqlite3')
+    store = scores.ScoreStore(path, batch_size=3, flush_interval=60).open()
+    wait_loaded(store)
+    store.record_run(1, 1, 1)
+    store.record_run(2, 1, 1)
+    time.sleep(0.1)
+    assert store.written == 0  # Below the batch size, and the interval is a minute away
+    store.record_run(3, 1, 1)
+    deadline = time.monotonic() + 10
+    while store.written < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store.written == 3
+    store.close()
+    assert saved_scores(path) == [1, 2, 3]
+
+
+def test_unusable_path_still_loads(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    store = scores.ScoreStore(str(blocker / 'scores.sqlite3')).open()
+    wait_loaded(store)
+    assert isinstance(store.error, OSError)
+    assert store.best is None
+    assert store.record_run(7, 1, 1)  # Still reported from this session's cache
+    assert store.best == 7
+    store.close()
+    assert not store.pending
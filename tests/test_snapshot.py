@@ -0,0 +1,41 @@
+import pytest
+
+import bots
+import runner_game
+
+
+def play(state, ticks):
+    # Deterministic inputs: a bot without jitter decides from the state alone
+    bot = bots.DuckBot()
+    snapshots = []
+    for _ in range(ticks):
+        if state.game_over:
+            break
+        bot.act(state)
+        state.step()
+        snapshots.append(state.snapshot())
+    return snapshots
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_restored_state_plays_on_identically(seed):
+    original = runner_game.GameState(seed)
+    play(original, 200 + 50 * seed)
+    snapshot = original.snapshot()
+
+    restored = runner_game.GameState()
+    restored.restore(snapshot)
+    assert restored.snapshot() == snapshot
+    assert play(restored, 600) == play(original, 600)
+
+
+def test_restore_rewinds_in_place():
+    state = runner_game.GameState(3)
+    play(state, 120)
+    snapshot = state.snapshot()
+    obstacles = state.obstacles
+    ahead = play(state, 300)
+    state.restore(snapshot)
+    assert state.obstacles is obstacles  # The list others hold stays in sync
+    assert state.snapshot() == snapshot
+    assert play(state, 300) == ahead
@@ -0,0 +1,26 @@
+import gc
+
+import pygame
+
+import soak
+
+
+def test_counts_surfaces_in_untracked_containers():
+    _, before = soak.count_objects()
+    leak = {number: pygame.Surface((2, 2)) for number in range(500)}
+    assert not gc.is_tracked(leak)  # Only ints and surfaces, so the collector doesn't see it
+    _, after = soak.count_objects()
+    assert after - before == 500
+    del leak
+
+
+def test_sampling_leaves_frozen_objects_alone():
+    frozen = [object() for _ in range(100)]
+    gc.freeze()
+    try:
+        count = gc.get_freeze_count()
+        soak.count_objects()
+        assert gc.get_freeze_count() == count
+    finally:
+        gc.unfreeze()
+    del frozen
@@ -0,0 +1,42 @@
+import bots
+import runner_game
+import spectator
+
+
+def send(encoder, decoder, frame):
+    # Encode a frame the way SpectatorServer does and decode it on the client
+    message = encoder.encode(frame)
+    if message is None:
+        message = encoder.keyframe()
+    return decoder.feed(message[spectator.LENGTH.size:])
+
+
+def test_round_trip_across_restarts():
+    encoder = spectator.StateEncoder()
+    decoder = spectator.StateDecoder()
+    for seed in range(10):
+        # Every run starts again from tick 0 and serial 0. Some are cut short
+        # so the next one reuses serials still on screen
+        state = runner_game.GameState(seed)
+        bot = bots.JumpBot(seed)
+        max_ticks = 40 if seed % 2 else 2000
+        while not state.game_over and state.tick < max_ticks:
+            bot.act(state)
+            state.step()
+            frame = spectator.capture(state)
+            decoded = send(encoder, decoder, frame)
+            assert decoded['tick'] == state.tick
+            assert decoded['score'] == state.score
+            assert decoder.obstacles == encoder.obstacles
+            assert [(serial, kind) for serial, kind, _ in decoded['obstacles']] == \
+                [(obstacle.serial, obstacle.type) for obstacle in state.obstacles]
+
+
+def test_kind_change_under_same_serial():
+    encoder = spectator.StateEncoder()
+    decoder = spectator.StateDecoder()
+    scalars = (5.0, 0, 325.0, 25.0, 0, 0)
+    send(encoder, decoder, (10, scalars, [(0, 1, 700.0)]))
+    decoded = send(encoder, decoder, (11, scalars, [(0, 2, 695.0)]))
+    assert decoder.obstacles == {0: (2, 695 * spectator.FIXED_POINT)}
+    assert decoded['obstacles'] == [(0, runner_game.OBSTACLE_TYPES[2].name, 695.0)]
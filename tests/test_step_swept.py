@@ -0,0 +1,43 @@
+import pytest
+
+import bots
+import runner_game
+
+MAX_TICKS = 3000
+
+
+def play_both(seed, stride, bot_class):
+    # Step one run per tick and one `stride` ticks at a time with a sweep,
+    # with the same bot deciding for both, and compare them after every step
+    discrete = runner_game.GameState(seed)
+    swept = runner_game.GameState(seed)
+    discrete_bot = bot_class(seed, reaction_jitter=seed % 6)
+    swept_bot = bot_class(seed, reaction_jitter=seed % 6)
+    while not discrete.game_over and discrete.tick < MAX_TICKS:
+        discrete_bot.act(discrete)
+        swept_bot.act(swept)
+        discrete.step(stride, swept=False)
+        swept.step(stride, swept=True)
+        assert swept.snapshot() == discrete.snapshot(), f"seed {seed} stride {stride} tick {discrete.tick}"
+    assert swept.game_over == discrete.game_over
+
+
+@pytest.mark.parametrize('stride', [1, 2, 4, 8])
+@pytest.mark.parametrize('bot_class', [bots.JumpBot, bots.DuckBot])
+def test_swept_matches_discrete(stride, bot_class):
+    for seed in range(40):
+        play_both(seed, stride, bot_class)
+
+
+@pytest.mark.parametrize('stride', [1, 4])
+def test_swept_matches_discrete_precise(monkeypatch, stride):
+    monkeypatch.setattr(runner_game, 'PRECISE_COLLISION', True)
+    for seed in range(15):
+        play_both(seed, stride, bots.DuckBot)
+
+
+def test_strict_bound_excludes_its_root():
+    # a + b * t > 0 only holds after t = 0.5, so a span ending there is empty
+    assert runner_game.linear_interval(-1, 2, 0.0, 0.5) is None
+    assert runner_game.linear_interval(-1, 2, 0.0, 0.5, strict=False) == (0.5, 0.5, False, False)
+    assert runner_game.linear_interval(-1, 2, 0.0, 1.0) == (0.5, 1.0, True, False)